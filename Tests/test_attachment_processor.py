@@ -0,0 +1,167 @@
+import asyncio
+
+import pytest
+
+import src.attachment_processor as attachment_processor
+from src.attachment_processor import MEDIA_GROUP_MAX_ITEMS, deliver_attachments
+
+
+@pytest.fixture(autouse=True)
+def fresh_pipeline(monkeypatch):
+    """Semaphores are bound to the loop they are first used in."""
+    monkeypatch.setattr(attachment_processor, "_download_semaphore", None)
+    monkeypatch.setattr(attachment_processor, "_upload_semaphore", None)
+
+
+def _attachments(*names):
+    return [{"filename": name} for name in names]
+
+
+async def _download(attachment):
+    # Перші файли завантажуються найдовше: порядок завершення зворотний
+    name = attachment["filename"]
+    await asyncio.sleep(0.01 * (10 - int(name.split(".")[0][1:])))
+    if name.startswith("x"):
+        return None
+    return name
+
+
+def _photo_key(attachment, payload):
+    return "photo" if payload.endswith(".jpg") else None
+
+
+def test_files_are_sent_in_original_order():
+    sent = []
+
+    async def send(attachment, payload):
+        sent.append(payload)
+        return True
+
+    attachments = _attachments("f1.pdf", "f2.pdf", "f3.pdf", "f4.pdf")
+    summary = asyncio.run(deliver_attachments("1", attachments, _download, send))
+
+    assert sent == ["f1.pdf", "f2.pdf", "f3.pdf", "f4.pdf"]
+    assert summary["sent"] == 4
+    assert summary["failed"] == 0
+
+
+def test_failed_download_is_skipped_without_reordering():
+    sent = []
+
+    async def send(attachment, payload):
+        sent.append(payload)
+        return True
+
+    attachments = _attachments("f1.pdf", "x2.pdf", "f3.pdf")
+    summary = asyncio.run(deliver_attachments("1", attachments, _download, send))
+
+    assert sent == ["f1.pdf", "f3.pdf"]
+    assert summary["failed"] == 1
+
+
+def test_adjacent_files_with_same_key_are_grouped():
+    calls = []
+
+    async def send(attachment, payload):
+        calls.append(payload)
+        return True
+
+    async def send_group(items):
+        calls.append([payload for _, payload in items])
+        return len(items)
+
+    attachments = _attachments(
+        "f1.jpg", "f2.jpg", "f3.pdf", "f4.jpg", "f5.jpg", "f6.jpg"
+    )
+    summary = asyncio.run(
+        deliver_attachments(
+            "1",
+            attachments,
+            _download,
+            send,
+            group_key=_photo_key,
+            send_group=send_group,
+        )
+    )
+
+    assert calls == [["f1.jpg", "f2.jpg"], "f3.pdf", ["f4.jpg", "f5.jpg", "f6.jpg"]]
+    assert summary["groups"] == 2
+    assert summary["sent"] == 6
+
+
+def test_single_file_of_a_group_is_sent_alone():
+    calls = []
+
+    async def send(attachment, payload):
+        calls.append(payload)
+        return True
+
+    async def send_group(items):
+        calls.append([payload for _, payload in items])
+        return len(items)
+
+    attachments = _attachments("f1.pdf", "f2.jpg", "f3.pdf")
+    asyncio.run(
+        deliver_attachments(
+            "1",
+            attachments,
+            _download,
+            send,
+            group_key=_photo_key,
+            send_group=send_group,
+        )
+    )
+
+    assert calls == ["f1.pdf", "f2.jpg", "f3.pdf"]
+
+
+def test_groups_are_split_at_media_group_limit():
+    groups = []
+
+    async def send(attachment, payload):
+        groups.append([payload])
+        return True
+
+    async def send_group(items):
+        groups.append([payload for _, payload in items])
+        return len(items)
+
+    async def download(attachment):
+        return attachment["filename"]
+
+    count = MEDIA_GROUP_MAX_ITEMS + 3
+    attachments = _attachments(*(f"p{idx}.jpg" for idx in range(count)))
+    asyncio.run(
+        deliver_attachments(
+            "1",
+            attachments,
+            download,
+            send,
+            group_key=_photo_key,
+            send_group=send_group,
+        )
+    )
+
+    assert [len(group) for group in groups] == [MEDIA_GROUP_MAX_ITEMS, 3]
+    assert [name for group in groups for name in group] == [
+        f"p{idx}.jpg" for idx in range(count)
+    ]
+
+
+def test_batches_to_same_chat_do_not_interleave():
+    sent = []
+
+    async def send(attachment, payload):
+        await asyncio.sleep(0)
+        sent.append(payload)
+        return True
+
+    async def scenario():
+        await asyncio.gather(
+            deliver_attachments("1", _attachments("f1.pdf", "f2.pdf"), _download, send),
+            deliver_attachments("1", _attachments("f3.pdf", "f4.pdf"), _download, send),
+        )
+
+    asyncio.run(scenario())
+
+    assert sent == ["f1.pdf", "f2.pdf", "f3.pdf", "f4.pdf"]
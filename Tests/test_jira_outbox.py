@@ -0,0 +1,150 @@
+import asyncio
+
+import pytest
+
+import src.jira_outbox as jira_outbox
+import src.services as services
+from src.jira_outbox import KIND_COMMENT, KIND_CREATE_ISSUE, JiraOutbox
+
+
+@pytest.fixture
+def outbox_paths(tmp_path):
+    return {"path": str(tmp_path / "outbox.db"), "files_dir": str(tmp_path / "files")}
+
+
+@pytest.fixture
+def silent_notify(monkeypatch):
+    sent = []
+
+    async def notify(telegram_id, text):
+        sent.append((telegram_id, text))
+
+    async def set_task(telegram_id, issue_key):
+        return None
+
+    monkeypatch.setattr(jira_outbox, "_notify", notify)
+    monkeypatch.setattr("src.user_state_service.aset_user_current_task", set_task)
+    return sent
+
+
+def test_direct_create_sends_idempotency_property(monkeypatch):
+    posted = []
+
+    async def validate(fields):
+        return True
+
+    async def make_request(method, url, json=None, **kwargs):
+        posted.append(json)
+        return {"key": "EMF-1"}
+
+    async def verify(issue_key):
+        return None
+
+    monkeypatch.setattr(services, "_validate_with_create_meta", validate)
+    monkeypatch.setattr(services, "_make_request", make_request)
+    monkeypatch.setattr(services, "_verify_created_issue", verify)
+    payload = {"fields": {"project": {"key": "EMF"}, "issuetype": {}, "summary": "s"}}
+
+    assert asyncio.run(services.create_jira_issue(payload, "k1")) == "EMF-1"
+    assert posted[0]["properties"] == [
+        {"key": services.OUTBOX_PROPERTY_KEY, "value": {"id": "k1"}}
+    ]
+
+
+def test_issue_found_by_key_is_not_created_again(monkeypatch, silent_notify):
+    created = []
+
+    async def find(telegram_id, key):
+        return "EMF-1" if key == "k1" else None
+
+    async def create(fields, idempotency_key=None):
+        created.append(idempotency_key)
+        return "EMF-2"
+
+    async def update_payload(entry):
+        return None
+
+    monkeypatch.setattr(jira_outbox, "find_issue_by_idempotency_key", find)
+    monkeypatch.setattr(jira_outbox, "create_jira_issue", create)
+    outbox = JiraOutbox(path=":memory:")
+    monkeypatch.setattr(outbox, "update_payload", update_payload)
+
+    # Перша спроба черги після невдалої прямої: задачу вже створено
+    entry = {
+        "idempotency_key": "k1",
+        "telegram_id": "42",
+        "payload": {"fields": {"fields": {}}},
+        "file_path": None,
+        "attempts": 0,
+    }
+    asyncio.run(jira_outbox._deliver_issue(outbox, entry))
+
+    assert created == []
+    assert entry["payload"]["issue_key"] == "EMF-1"
+    assert outbox.stats["deduplicated"] == 1
+
+
+def test_slow_ordering_key_does_not_block_others(outbox_paths):
+    async def scenario():
+        outbox = JiraOutbox(**outbox_paths, concurrency=4)
+        release = asyncio.Event()
+        delivered = []
+
+        async def deliver(_outbox, entry):
+            issue_key = entry["payload"]["issue_key"]
+            if issue_key == "SLOW-1":
+                await release.wait()
+            delivered.append(issue_key)
+
+        outbox._handlers[KIND_COMMENT] = deliver
+        await outbox.open()
+        try:
+            await outbox.enqueue_comment("SLOW-1", "a")
+            await outbox.enqueue_comment("FAST-1", "b")
+            for _ in range(100):
+                if delivered:
+                    break
+                await asyncio.sleep(0.01)
+            assert delivered == ["FAST-1"]
+
+            # Новий запис швидкої задачі не чекає на повільну
+            await outbox.enqueue_comment("FAST-1", "c")
+            for _ in range(100):
+                if len(delivered) == 2:
+                    break
+                await asyncio.sleep(0.01)
+            assert delivered == ["FAST-1", "FAST-1"]
+
+            release.set()
+            for _ in range(100):
+                if len(delivered) == 3:
+                    break
+                await asyncio.sleep(0.01)
+            assert delivered[-1] == "SLOW-1"
+        finally:
+            await outbox.close()
+
+    asyncio.run(scenario())
+
+
+def test_queued_issue_keeps_key_of_direct_attempt(outbox_paths):
+    async def scenario():
+        outbox = JiraOutbox(**outbox_paths)
+        delivered = asyncio.Queue()
+
+        async def deliver(_outbox, entry):
+            await delivered.put(entry)
+
+        outbox._handlers[KIND_CREATE_ISSUE] = deliver
+        await outbox.open()
+        try:
+            key = await outbox.enqueue_issue({"fields": {}}, "42", idempotency_key="k1")
+            entry = await asyncio.wait_for(delivered.get(), timeout=5)
+        finally:
+            await outbox.close()
+        return key, entry
+
+    key, entry = asyncio.run(scenario())
+    assert key == "k1"
+    assert entry["idempotency_key"] == "k1"
+    assert entry["ordering_key"] == "create:42"
@@ -0,0 +1,88 @@
+import pytest
+
+from src.user_state_service import clear_user_current_task_if, get_user_current_task
+
+
+@pytest.fixture
+def write_behind_manager(isolate_user_state_manager, monkeypatch):
+    manager = isolate_user_state_manager
+    manager.cache_size = 1
+    manager.flush_delay = 60
+    # Записуємо на диск лише явним flush(), без фонового потоку
+    monkeypatch.setattr(manager, "_schedule_flush", lambda: None)
+    return manager
+
+
+def test_record_is_not_evicted_while_being_written(write_behind_manager, monkeypatch):
+    manager = write_behind_manager
+    backend = manager.backend
+    write_many = backend.write_many
+    seen_during_write = {}
+
+    def slow_write_many(records):
+        # Інший користувач витісняє кеш, поки запис ще не на диску
+        manager.load_user_state(2)
+        seen_during_write.update(manager.load_user_state(1))
+        write_many(records)
+
+    monkeypatch.setattr(backend, "write_many", slow_write_many)
+    manager.save_user_state(1, {"step": "new"})
+
+    assert manager.flush() == 1
+    assert seen_during_write == {"step": "new"}
+    assert manager.get_stats()["dirty"] == 0
+
+
+def test_change_made_during_flush_stays_dirty(write_behind_manager, monkeypatch):
+    manager = write_behind_manager
+    backend = manager.backend
+    write_many = backend.write_many
+
+    def write_many_with_concurrent_update(records):
+        manager.save_user_state(1, {"step": "newer"})
+        write_many(records)
+
+    monkeypatch.setattr(backend, "write_many", write_many_with_concurrent_update)
+    manager.save_user_state(1, {"step": "new"})
+    manager.flush()
+
+    monkeypatch.setattr(backend, "write_many", write_many)
+    assert manager.get_stats()["dirty"] == 1
+    assert manager.flush() == 1
+    assert backend.read(1)["state"] == {"step": "newer"}
+
+
+def test_failed_flush_keeps_records_pending(write_behind_manager, monkeypatch):
+    manager = write_behind_manager
+    backend = manager.backend
+    write_many = backend.write_many
+
+    def failing_write_many(records):
+        manager.load_user_state(2)
+        raise OSError("disk full")
+
+    monkeypatch.setattr(backend, "write_many", failing_write_many)
+    manager.save_user_state(1, {"step": "new"})
+
+    assert manager.flush() == 0
+    assert manager.load_user_state(1) == {"step": "new"}
+
+    monkeypatch.setattr(backend, "write_many", write_many)
+    assert manager.flush() == 1
+    assert backend.read(1)["state"] == {"step": "new"}
+
+
+def test_finished_task_is_not_cleared_after_user_switched_task(
+    isolate_user_state_manager,
+):
+    manager = isolate_user_state_manager
+    manager.save_user_state(
+        1, {"type": "user_profile", "bot_state": {"current_task_key": "EMF-2"}}
+    )
+
+    # Фонова перевірка знайшла виконаною попередню задачу EMF-1
+    assert not clear_user_current_task_if(1, "EMF-1")
+    assert get_user_current_task(1) == "EMF-2"
+
+    assert clear_user_current_task_if(1, "EMF-2")
+    assert get_user_current_task(1) == ""
@@ -0,0 +1,96 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+from src.webhook_spool import WebhookSpool
+
+
+@pytest.fixture
+def spool_path(tmp_path):
+    return str(tmp_path / "webhook_spool.db")
+
+
+def _attempts(path):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT id, attempts FROM webhook_events"))
+
+
+async def _spool_with_events(path, count):
+    """Журнал з count незавершеними подіями попереднього запуску"""
+    previous = WebhookSpool(path=path, flush_interval=0)
+    await previous.open()
+    for idx in range(count):
+        await previous.append("comment_created", f"EMF-{idx}", {"n": idx})
+    await previous.close()
+
+    spool = WebhookSpool(path=path, flush_interval=0)
+    await spool.open()
+    return spool
+
+
+def test_attempts_counted_only_for_loaded_events(spool_path):
+    async def scenario():
+        spool = await _spool_with_events(spool_path, 5)
+        try:
+            events = await spool.load_pending(2)
+        finally:
+            await spool.close()
+        return events
+
+    events = asyncio.run(scenario())
+
+    assert [event["data"]["n"] for event in events] == [0, 1]
+    assert sorted(_attempts(spool_path).values()) == [0, 0, 0, 1, 1]
+
+
+def test_released_events_are_replayed_next_without_extra_attempt(spool_path):
+    async def scenario():
+        spool = await _spool_with_events(spool_path, 3)
+        try:
+            events = await spool.load_pending(3)
+            # Черга прийняла лише першу подію
+            await spool.release(events[1:])
+            assert spool.has_replay_backlog
+            retried = await spool.load_pending(10)
+            assert await spool.load_pending(10) == []
+            assert not spool.has_replay_backlog
+        finally:
+            await spool.close()
+        return retried
+
+    retried = asyncio.run(scenario())
+
+    assert [event["data"]["n"] for event in retried] == [1, 2]
+    assert sorted(_attempts(spool_path).values()) == [1, 1, 1]
+
+
+def test_events_of_current_run_are_not_replayed(spool_path):
+    async def scenario():
+        spool = await _spool_with_events(spool_path, 1)
+        try:
+            await spool.append("comment_created", "EMF-9", {"n": 9})
+            events = await spool.load_pending(10)
+        finally:
+            await spool.close()
+        return events
+
+    events = asyncio.run(scenario())
+
+    # Нова подія вже в черзі обробки - журнал не відтворює її вдруге
+    assert [event["data"]["n"] for event in events] == [0]
+
+
+def test_no_capacity_loads_nothing(spool_path):
+    async def scenario():
+        spool = await _spool_with_events(spool_path, 2)
+        try:
+            return await spool.load_pending(0), spool.has_replay_backlog
+        finally:
+            await spool.close()
+
+    events, backlog = asyncio.run(scenario())
+
+    assert events == []
+    assert backlog
+    assert sorted(_attempts(spool_path).values()) == [0, 0]
@@ -13,6 +13,18 @@ TELEGRAM_TOKEN: str = os.getenv("TELEGRAM_BOT_TOKEN") or ""
 # Telegram bot token
 TELEGRAM_BOT_TOKEN = TELEGRAM_TOKEN
 
+# Telegram Bot API HTTP client (спільний пул для вихідних повідомлень)
+TELEGRAM_HTTP_MAX_CONNECTIONS: int = int(os.getenv("TELEGRAM_HTTP_MAX_CONNECTIONS", 20))
+TELEGRAM_HTTP_MAX_KEEPALIVE: int = int(os.getenv("TELEGRAM_HTTP_MAX_KEEPALIVE", 10))
+TELEGRAM_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("TELEGRAM_HTTP_KEEPALIVE_EXPIRY", 60))
+TELEGRAM_TIMEOUT_MESSAGE: float = float(os.getenv("TELEGRAM_TIMEOUT_MESSAGE", 15))
+# Темп відправок у Telegram: загальний і на один чат (повідомлень/с), скільки
+# повідомлень чат може отримати підряд і скільки разів повторювати після 429
+TELEGRAM_RATE_LIMIT_PER_SECOND: float = float(os.getenv("TELEGRAM_RATE_LIMIT_PER_SECOND", 30))
+TELEGRAM_CHAT_RATE_LIMIT_PER_SECOND: float = float(os.getenv("TELEGRAM_CHAT_RATE_LIMIT_PER_SECOND", 1))
+TELEGRAM_CHAT_RATE_LIMIT_BURST: int = int(os.getenv("TELEGRAM_CHAT_RATE_LIMIT_BURST", 3))
+TELEGRAM_RATE_LIMIT_MAX_RETRIES: int = int(os.getenv("TELEGRAM_RATE_LIMIT_MAX_RETRIES", 3))
+
 # Jira
 JIRA_BASE_URL: str = os.getenv("JIRA_DOMAIN") or ""  # наприклад https://euromix.atlassian.net
 JIRA_EMAIL: str = os.getenv("JIRA_EMAIL") or ""
@@ -22,6 +34,53 @@ JIRA_ISSUE_TYPE: str = os.getenv("JIRA_ISSUE_TYPE") or ""
 JIRA_REPORTER_ACCOUNT_ID: str = os.getenv("JIRA_REPORTER_ACCOUNT_ID") or ""
 JIRA_DOMAIN: str = os.getenv("JIRA_DOMAIN") or ""
 
+# Jira HTTP client (спільний пул з'єднань)
+JIRA_HTTP_MAX_CONNECTIONS: int = int(os.getenv("JIRA_HTTP_MAX_CONNECTIONS", 20))
+JIRA_HTTP_MAX_KEEPALIVE: int = int(os.getenv("JIRA_HTTP_MAX_KEEPALIVE", 10))
+JIRA_HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("JIRA_HTTP_KEEPALIVE_EXPIRY", 30))
+JIRA_HTTP2_ENABLED: bool = os.getenv("JIRA_HTTP2_ENABLED", "false").lower() == "true"
+# Таймаути за типом операції (секунди)
+JIRA_TIMEOUT_CONNECT: float = float(os.getenv("JIRA_TIMEOUT_CONNECT", 5))
+JIRA_TIMEOUT_API: float = float(os.getenv("JIRA_TIMEOUT_API", 10))
+JIRA_TIMEOUT_UPLOAD: float = float(os.getenv("JIRA_TIMEOUT_UPLOAD", 60))
+JIRA_TIMEOUT_DOWNLOAD: float = float(os.getenv("JIRA_TIMEOUT_DOWNLOAD", 90))
+# Обмеження темпу запитів до Jira Cloud (token bucket)
+JIRA_RATE_LIMIT_PER_SECOND: float = float(os.getenv("JIRA_RATE_LIMIT_PER_SECOND", 10))
+JIRA_RATE_LIMIT_BURST: int = int(os.getenv("JIRA_RATE_LIMIT_BURST", 20))
+JIRA_RATE_LIMIT_MAX_RETRIES: int = int(os.getenv("JIRA_RATE_LIMIT_MAX_RETRIES", 4))
+# Запобіжник (circuit breaker): частка помилок/повільних запитів у вікні,
+# після якої запити до Jira відхиляються одразу, та пауза до пробного запиту
+JIRA_BREAKER_FAILURE_RATIO: float = float(os.getenv("JIRA_BREAKER_FAILURE_RATIO", 0.5))
+JIRA_BREAKER_MIN_REQUESTS: int = int(os.getenv("JIRA_BREAKER_MIN_REQUESTS", 5))
+JIRA_BREAKER_WINDOW: int = int(os.getenv("JIRA_BREAKER_WINDOW", 20))
+JIRA_BREAKER_SLOW_CALL_SECONDS: float = float(os.getenv("JIRA_BREAKER_SLOW_CALL_SECONDS", 8))
+JIRA_BREAKER_COOLDOWN: float = float(os.getenv("JIRA_BREAKER_COOLDOWN", 30))
+# Час життя кешу статусів задач (оновлюється вебхуками, TTL - запобіжник)
+ISSUE_CACHE_TTL: float = float(os.getenv("ISSUE_CACHE_TTL", 300))
+# Час життя кешу "задача -> Telegram ID" (значення не змінюється після створення)
+ISSUE_OWNER_CACHE_TTL: float = float(os.getenv("ISSUE_OWNER_CACHE_TTL", 86400))
+# За скільки днів показувати завершені задачі разом з відкритими
+ISSUE_DONE_LOOKBACK_DAYS: int = int(os.getenv("ISSUE_DONE_LOOKBACK_DAYS", 30))
+# Фонова звірка статусів поточних задач користувачів з Jira (секунди)
+ISSUE_STATUS_REFRESH_ENABLED: bool = os.getenv("ISSUE_STATUS_REFRESH_ENABLED", "true").lower() == "true"
+ISSUE_STATUS_REFRESH_INTERVAL: float = float(os.getenv("ISSUE_STATUS_REFRESH_INTERVAL", 300))
+# Перевірка створеної задачі: "trust" - довіряємо ключу з відповіді POST,
+# "async-verify" - GET у фоні з алертом у лог, "sync-verify" - GET до відповіді
+JIRA_CREATE_CONSISTENCY: str = os.getenv("JIRA_CREATE_CONSISTENCY", "async-verify").lower()
+# Як часто перечитувати метадані екрану створення задач (createmeta), секунди
+JIRA_CREATEMETA_TTL: float = float(os.getenv("JIRA_CREATEMETA_TTL", 3600))
+# Черга записів у Jira на диску (коментарі, файли, нові задачі доставляються у фоні)
+JIRA_OUTBOX_ENABLED: bool = os.getenv("JIRA_OUTBOX_ENABLED", "true").lower() == "true"
+_jira_outbox_path = os.getenv("JIRA_OUTBOX_PATH", "data/jira_outbox.db")
+if not os.path.isabs(_jira_outbox_path):
+    _jira_outbox_path = str(Path(__file__).parent.parent / _jira_outbox_path)
+JIRA_OUTBOX_PATH: str = _jira_outbox_path
+JIRA_OUTBOX_FILES_DIR: str = os.path.join(os.path.dirname(JIRA_OUTBOX_PATH), "jira_outbox_files")
+JIRA_OUTBOX_CONCURRENCY: int = int(os.getenv("JIRA_OUTBOX_CONCURRENCY", 4))
+JIRA_OUTBOX_RETRY_BASE: float = float(os.getenv("JIRA_OUTBOX_RETRY_BASE", 5))
+JIRA_OUTBOX_RETRY_MAX: float = float(os.getenv("JIRA_OUTBOX_RETRY_MAX", 600))
+JIRA_OUTBOX_MAX_AGE_HOURS: float = float(os.getenv("JIRA_OUTBOX_MAX_AGE_HOURS", 24))
+
 # Webhook (якщо використовуємо)
 WEBHOOK_URL: str | None = os.getenv("WEBHOOK_URL", None)
 WEBHOOK_HOST: str = os.getenv("WEBHOOK_HOST", "0.0.0.0")
@@ -40,6 +99,56 @@ WEBHOOK_IP_WHITELIST_ENABLED: bool = os.getenv("WEBHOOK_IP_WHITELIST_ENABLED", "
 # Додаткові IP для whitelist (через кому)
 WEBHOOK_IP_WHITELIST_CUSTOM: str = os.getenv("WEBHOOK_IP_WHITELIST_CUSTOM", "")
 
+# Webhook processing queue (подія підтверджується одразу, обробляється у фоні)
+WEBHOOK_WORKERS: int = int(os.getenv("WEBHOOK_WORKERS", 4))
+WEBHOOK_QUEUE_MAX_SIZE: int = int(os.getenv("WEBHOOK_QUEUE_MAX_SIZE", 500))
+WEBHOOK_QUEUE_RETRY_AFTER: int = int(os.getenv("WEBHOOK_QUEUE_RETRY_AFTER", 30))
+
+# Журнал прийнятих вебхуків на диску (відтворення після перезапуску)
+WEBHOOK_SPOOL_ENABLED: bool = os.getenv("WEBHOOK_SPOOL_ENABLED", "true").lower() == "true"
+_webhook_spool_path = os.getenv("WEBHOOK_SPOOL_PATH", "data/webhook_spool.db")
+if not os.path.isabs(_webhook_spool_path):
+    _webhook_spool_path = str(Path(__file__).parent.parent / _webhook_spool_path)
+WEBHOOK_SPOOL_PATH: str = _webhook_spool_path
+WEBHOOK_SPOOL_FLUSH_INTERVAL: float = float(os.getenv("WEBHOOK_SPOOL_FLUSH_INTERVAL", 0.02))
+WEBHOOK_SPOOL_RETENTION_HOURS: float = float(os.getenv("WEBHOOK_SPOOL_RETENTION_HOURS", 24))
+WEBHOOK_SPOOL_MAX_REPLAYS: int = int(os.getenv("WEBHOOK_SPOOL_MAX_REPLAYS", 3))
+
+# Пересилання вкладень Jira -> Telegram: файл потоково пишеться у тимчасовий файл
+# на диску, а не в пам'ять. Порожній ATTACHMENT_SPOOL_DIR - системна папка temp
+_attachment_spool_dir = os.getenv("ATTACHMENT_SPOOL_DIR", "")
+if _attachment_spool_dir and not os.path.isabs(_attachment_spool_dir):
+    _attachment_spool_dir = str(Path(__file__).parent.parent / _attachment_spool_dir)
+ATTACHMENT_SPOOL_DIR: str = _attachment_spool_dir
+# Більші файли не завантажуються (ліміт Telegram Bot API на відправку - 50 MB)
+ATTACHMENT_MAX_SIZE_MB: float = float(os.getenv("ATTACHMENT_MAX_SIZE_MB", 50))
+# Скільки вкладень одночасно завантажується з Jira і відправляється в Telegram
+# (в межах одного чату файли все одно йдуть по черзі)
+ATTACHMENT_DOWNLOAD_CONCURRENCY: int = int(os.getenv("ATTACHMENT_DOWNLOAD_CONCURRENCY", 4))
+ATTACHMENT_UPLOAD_CONCURRENCY: int = int(os.getenv("ATTACHMENT_UPLOAD_CONCURRENCY", 4))
+# Фото/відео та документи з одного коментаря відправляються альбомами (до 10 файлів)
+ATTACHMENT_MEDIA_GROUPS_ENABLED: bool = os.getenv("ATTACHMENT_MEDIA_GROUPS_ENABLED", "true").lower() == "true"
+# Кеш Telegram file_id: повторно відправлені вкладення не завантажуються заново
+TELEGRAM_FILE_CACHE_ENABLED: bool = os.getenv("TELEGRAM_FILE_CACHE_ENABLED", "true").lower() == "true"
+_telegram_file_cache_path = os.getenv("TELEGRAM_FILE_CACHE_PATH", "data/telegram_file_cache.db")
+if not os.path.isabs(_telegram_file_cache_path):
+    _telegram_file_cache_path = str(Path(__file__).parent.parent / _telegram_file_cache_path)
+TELEGRAM_FILE_CACHE_PATH: str = _telegram_file_cache_path
+# Записи, які не використовувались довше, видаляються при старті
+TELEGRAM_FILE_CACHE_MAX_AGE_DAYS: float = float(os.getenv("TELEGRAM_FILE_CACHE_MAX_AGE_DAYS", 180))
+
+# Сховище станів користувачів: "sqlite" (WAL, за замовчуванням) або "json"
+# (файл на користувача). Порожній USER_STATE_DB_PATH - user_states.db у папці станів
+USER_STATE_BACKEND: str = os.getenv("USER_STATE_BACKEND", "sqlite").lower()
+_user_state_db_path = os.getenv("USER_STATE_DB_PATH", "")
+if _user_state_db_path and not os.path.isabs(_user_state_db_path):
+    _user_state_db_path = str(Path(__file__).parent.parent / _user_state_db_path)
+USER_STATE_DB_PATH: str = _user_state_db_path
+# Кеш станів у пам'яті: кількість користувачів і затримка фонового запису
+# змін на диск (0 - записувати одразу)
+USER_STATE_CACHE_SIZE: int = int(os.getenv("USER_STATE_CACHE_SIZE", 5000))
+USER_STATE_FLUSH_DELAY: float = float(os.getenv("USER_STATE_FLUSH_DELAY", 0.5))
+
 # Google Sheets
 _google_creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH") or ""
 if _google_creds_path and not os.path.isabs(_google_creds_path):
@@ -51,5 +160,14 @@ else:
 
 GOOGLE_SHEET_USERS_ID: str = os.getenv("GOOGLE_SHEET_USERS_ID", os.getenv("GOOGLE_SHEET_users_ID")) or ""
 
+# Google Sheets: пул потоків для синхронного gspread, щоб не блокувати event loop
+GOOGLE_SHEETS_MAX_WORKERS: int = int(os.getenv("GOOGLE_SHEETS_MAX_WORKERS", 4))
+GOOGLE_SHEETS_MAX_CONCURRENCY: int = int(os.getenv("GOOGLE_SHEETS_MAX_CONCURRENCY", 4))
+GOOGLE_SHEETS_TIMEOUT: float = float(os.getenv("GOOGLE_SHEETS_TIMEOUT", 20))
+# Знімок таблиці користувачів у пам'яті: планове оновлення та мінімальний
+# інтервал повторного завантаження при промаху (секунди)
+GOOGLE_SHEETS_DIRECTORY_TTL: float = float(os.getenv("GOOGLE_SHEETS_DIRECTORY_TTL", 300))
+GOOGLE_SHEETS_DIRECTORY_MISS_REFRESH: float = float(os.getenv("GOOGLE_SHEETS_DIRECTORY_MISS_REFRESH", 30))
+
 # Mapping file
 FIELDS_MAPPING_FILE: str = os.getenv("FIELDS_MAPPING_FILE", "fields_mapping.yaml")
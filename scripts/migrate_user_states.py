@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Одноразова міграція станів користувачів з файлів user_{id}.json у SQLite.
+JSON-файли не видаляються, тож повернутися до USER_STATE_BACKEND=json можна
+в будь-який момент.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# Додаємо шлях до модулів проекту
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from src.user_state_service import (  # noqa: E402
+    SQLiteStateBackend,
+    migrate_json_states,
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Перенесення станів користувачів з JSON-файлів у SQLite"
+    )
+    parser.add_argument(
+        "--source",
+        default="/home/Bot1/user_states",
+        help="Папка з файлами user_{id}.json",
+    )
+    parser.add_argument(
+        "--db",
+        default=None,
+        help="Шлях до бази SQLite (за замовчуванням <source>/user_states.db)",
+    )
+    parser.add_argument(
+        "--overwrite",
+        action="store_true",
+        help="Перезаписати користувачів, які вже є в базі",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if not os.path.isdir(args.source):
+        print(f"❌ Папку {args.source} не знайдено")
+        return 1
+
+    db_path = args.db or os.path.join(args.source, "user_states.db")
+    backend = SQLiteStateBackend(db_path)
+    try:
+        migrated, skipped = migrate_json_states(
+            args.source, backend, overwrite=args.overwrite
+        )
+    finally:
+        backend.close()
+
+    print(f"✅ Перенесено: {migrated}, пропущено: {skipped}, база: {db_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
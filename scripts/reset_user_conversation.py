@@ -52,31 +52,26 @@ async def reset_user_conversation_state(user_id: str):
         else:
             print(f"ℹ️  Дані користувача {user_id} не знайдені в bot memory")
             
-        # Перевіряємо та очищаємо персистентний файл стану
-        import os
-        user_state_file = f"/home/Bot1/user_states/user_{user_id}.json"
-        
-        if os.path.exists(user_state_file):
-            print(f"📁 Знайдено персистентний файл стану: {user_state_file}")
-            
-            # Читаємо вміст файлу
-            try:
-                with open(user_state_file, 'r', encoding='utf-8') as f:
-                    import json
-                    state_data = json.load(f)
-                    print(f"📋 Вміст персистентного файлу:")
-                    print(f"  registration_step: {state_data.get('state', {}).get('registration_step', 'N/A')}")
-                    print(f"  type: {state_data.get('state', {}).get('type', 'N/A')}")
-                    print(f"  last_updated: {state_data.get('last_updated', 'N/A')}")
-                    
-                    # Видаляємо файл
-                    os.remove(user_state_file)
-                    print(f"✅ Персистентний файл видалено")
-                    
-            except Exception as e:
-                print(f"❌ Помилка при роботі з персистентним файлом: {e}")
+        # Перевіряємо та очищаємо збережений стан через менеджер станів:
+        # залежно від USER_STATE_BACKEND він у user_states.db або у файлі JSON
+        from src.user_state_service import user_state_manager
+
+        location = user_state_manager.backend.location
+        record = user_state_manager.get_user_info(int(user_id))
+        if record:
+            state_data = record.get('state', {})
+            print(f"📁 Знайдено збережений стан у {location}:")
+            print(f"  registration_step: {state_data.get('registration_step', 'N/A')}")
+            print(f"  type: {state_data.get('type', 'N/A')}")
+            print(f"  last_updated: {record.get('last_updated', 'N/A')}")
+
+            if user_state_manager.delete_user_state(int(user_id)):
+                print("✅ Збережений стан видалено")
+                print("⚠️  Якщо бот запущений, перезапустіть його: стан кешується в пам'яті")
+            else:
+                print("❌ Не вдалося видалити збережений стан")
         else:
-            print(f"ℹ️  Персистентний файл стану не знайдено")
+            print(f"ℹ️  Збережений стан користувача не знайдено у {location}")
     
     except Exception as e:
         print(f"❌ Помилка: {e}")
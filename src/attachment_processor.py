@@ -1,15 +1,226 @@
 """
 Інтегратор: приклад використання утиліт із jira_attachment_utils для обробки webhook-подій.
+Також містить конвеєр доставки вкладень у Telegram: файли завантажуються з Jira
+паралельно, а відправляються в чат у початковому порядку, тож завантаження
+наступного файлу перекривається з відправкою попереднього.
 """
 
 import asyncio
 import logging
 import re
+import time
+import weakref
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from config.config import (
+    ATTACHMENT_DOWNLOAD_CONCURRENCY,
+    ATTACHMENT_UPLOAD_CONCURRENCY,
+)
 from .jira_attachment_utils import build_attachment_urls, download_file_from_jira
 
 # Ініціалізуємо логування
 logger = logging.getLogger(__name__)
 
+# Telegram приймає в sendMediaGroup від 2 до 10 файлів
+MEDIA_GROUP_MAX_ITEMS = 10
+
+# Спільні для всіх чатів обмеження паралельних завантажень з Jira і відправок у Telegram
+_download_semaphore: Optional[asyncio.Semaphore] = None
+_upload_semaphore: Optional[asyncio.Semaphore] = None
+# Блокування на чат: пакети вкладень в один чат не перемішуються між собою
+_chat_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = (
+    weakref.WeakValueDictionary()
+)
+_pipeline_stats: Dict[str, float] = {
+    "batches": 0,
+    "groups": 0,
+    "files": 0,
+    "sent": 0,
+    "failed": 0,
+    "active_batches": 0,
+    "last_batch_seconds": 0.0,
+}
+
+
+def _get_semaphores() -> Tuple[asyncio.Semaphore, asyncio.Semaphore]:
+    global _download_semaphore, _upload_semaphore
+    if _download_semaphore is None:
+        _download_semaphore = asyncio.Semaphore(ATTACHMENT_DOWNLOAD_CONCURRENCY)
+    if _upload_semaphore is None:
+        _upload_semaphore = asyncio.Semaphore(ATTACHMENT_UPLOAD_CONCURRENCY)
+    return _download_semaphore, _upload_semaphore
+
+
+def _get_chat_lock(chat_id: str) -> asyncio.Lock:
+    lock = _chat_locks.get(chat_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _chat_locks[chat_id] = lock
+    return lock
+
+
+def _release_payload(payload: Any) -> None:
+    """Закриває результат завантаження (тимчасовий файл), якщо це файл"""
+    close = getattr(payload, "close", None)
+    if callable(close):
+        try:
+            close()
+        except Exception as e:
+            logger.debug(f"Не вдалося закрити тимчасовий файл вкладення: {e}")
+
+
+async def deliver_attachments(
+    chat_id: str,
+    attachments: List[Dict[str, Any]],
+    download: Callable[[Dict[str, Any]], Awaitable[Any]],
+    send: Callable[[Dict[str, Any], Any], Awaitable[bool]],
+    label: str = "",
+    group_key: Optional[Callable[[Dict[str, Any], Any], Optional[str]]] = None,
+    send_group: Optional[
+        Callable[[List[Tuple[Dict[str, Any], Any]]], Awaitable[int]]
+    ] = None,
+) -> Dict[str, Any]:
+    """
+    Конвеєр доставки пакету вкладень в один чат.
+    Завантаження йдуть паралельно (не більше ATTACHMENT_DOWNLOAD_CONCURRENCY на
+    весь бот), відправки - строго по черзі в порядку списку; паралельно
+    відправляються лише файли різних чатів (до ATTACHMENT_UPLOAD_CONCURRENCY).
+    Якщо задано group_key і send_group, сусідні вкладення з однаковим ключем
+    групи відправляються одним запитом (до MEDIA_GROUP_MAX_ITEMS файлів).
+
+    Args:
+        chat_id: ID чату в Telegram
+        attachments: Вкладення в порядку, в якому вони мають з'явитися в чаті
+        download: Корутина download(attachment) -> вміст або None при помилці
+        send: Корутина send(attachment, вміст) -> True якщо відправлено
+        label: Підпис пакету для логів (наприклад, ключ задачі)
+        group_key: group_key(attachment, вміст) -> ключ групи або None, якщо
+            файл відправляється окремо
+        send_group: Корутина send_group([(attachment, вміст), ...]) -> кількість
+            відправлених файлів
+
+    Returns:
+        Dict[str, Any]: Підсумок пакету - total, sent, failed, groups, seconds
+    """
+    started = time.monotonic()
+    download_semaphore, upload_semaphore = _get_semaphores()
+    summary: Dict[str, Any] = {
+        "total": len(attachments),
+        "sent": 0,
+        "failed": 0,
+        "groups": 0,
+        "seconds": 0.0,
+    }
+    if not attachments:
+        return summary
+
+    async def fetch(attachment: Dict[str, Any]) -> Any:
+        async with download_semaphore:
+            return await download(attachment)
+
+    async def send_one(attachment: Dict[str, Any], payload: Any) -> None:
+        name = attachment.get("filename") or attachment.get("name") or "?"
+        try:
+            async with upload_semaphore:
+                sent = await send(attachment, payload)
+            if sent:
+                summary["sent"] += 1
+                logger.info(f"✅ Вкладення надіслано: {name}")
+            else:
+                summary["failed"] += 1
+                logger.error(f"❌ Не вдалося надіслати вкладення {name}")
+        except Exception as e:
+            summary["failed"] += 1
+            logger.error(f"❌ Помилка доставки вкладення {name}: {e}", exc_info=True)
+        finally:
+            _release_payload(payload)
+
+    group: List[Tuple[Dict[str, Any], Any]] = []
+
+    async def flush_group() -> None:
+        items = list(group)
+        group.clear()
+        if len(items) == 1:
+            await send_one(*items[0])
+            return
+        try:
+            async with upload_semaphore:
+                sent = await send_group(items)
+            summary["groups"] += 1
+            logger.info(f"✅ Групу з {len(items)} вкладень надіслано ({sent} файлів)")
+        except Exception as e:
+            sent = 0
+            logger.error(f"❌ Помилка відправки групи вкладень: {e}", exc_info=True)
+        finally:
+            for _, payload in items:
+                _release_payload(payload)
+        summary["sent"] += sent
+        summary["failed"] += len(items) - sent
+
+    downloads = [asyncio.create_task(fetch(att)) for att in attachments]
+    _pipeline_stats["active_batches"] += 1
+    try:
+        async with _get_chat_lock(str(chat_id)):
+            current_key: Optional[str] = None
+            for attachment, task in zip(attachments, downloads):
+                name = attachment.get("filename") or attachment.get("name") or "?"
+                try:
+                    payload = await task
+                except Exception as e:
+                    payload = None
+                    logger.error(
+                        f"❌ Помилка завантаження вкладення {name}: {e}", exc_info=True
+                    )
+                if payload is None:
+                    logger.error(f"❌ Не вдалося завантажити вкладення {name}")
+                    summary["failed"] += 1
+                    continue
+
+                key = None
+                if group_key is not None and send_group is not None:
+                    key = group_key(attachment, payload)
+                if group and (
+                    key != current_key or len(group) >= MEDIA_GROUP_MAX_ITEMS
+                ):
+                    await flush_group()
+                if key is None:
+                    await send_one(attachment, payload)
+                else:
+                    group.append((attachment, payload))
+                    current_key = key
+            if group:
+                await flush_group()
+    finally:
+        _pipeline_stats["active_batches"] -= 1
+        # Якщо пакет перервано - зупиняємо завантаження і прибираємо їх файли
+        for task in downloads:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled() and task.exception() is None:
+                _release_payload(task.result())
+
+    summary["seconds"] = round(time.monotonic() - started, 3)
+    _pipeline_stats["batches"] += 1
+    _pipeline_stats["groups"] += summary["groups"]
+    _pipeline_stats["files"] += summary["total"]
+    _pipeline_stats["sent"] += summary["sent"]
+    _pipeline_stats["failed"] += summary["failed"]
+    _pipeline_stats["last_batch_seconds"] = summary["seconds"]
+    logger.info(
+        f"🏁 Вкладення {label or chat_id}: надіслано {summary['sent']}/{summary['total']}, "
+        f"груп {summary['groups']}, помилок {summary['failed']}, {summary['seconds']:.1f} с"
+    )
+    return summary
+
+
+def get_attachment_pipeline_stats() -> Dict[str, Any]:
+    """Стан конвеєра доставки вкладень для status endpoint"""
+    return {
+        "download_concurrency": ATTACHMENT_DOWNLOAD_CONCURRENCY,
+        "upload_concurrency": ATTACHMENT_UPLOAD_CONCURRENCY,
+        **_pipeline_stats,
+    }
+
 
 async def process_attachments_for_issue(
     jira_domain: str, attachments: list[dict], issue_key: str, send_file_cb
@@ -17,6 +228,8 @@ async def process_attachments_for_issue(
     """
     Приходить список вкладень із Jira і callback для відправки у Telegram.
     Для кожного вкладення формуємо URL, скачиваємо file_bytes і передаємо в callback.
+    Файли завантажуються паралельно через deliver_attachments, callback
+    викликається по черзі в порядку списку.
 
     Args:
         jira_domain: домен Jira
@@ -37,12 +250,9 @@ async def process_attachments_for_issue(
     from .jira_attachment_utils import get_issue_attachments_by_filename
 
     total = len(attachments)
-    success = 0
-    errors = 0
-
     logger.info(f"Processing {total} attachment(s) for issue {issue_key}")
 
-    for idx, att in enumerate(attachments, 1):
+    async def download(att: dict) -> Optional[Tuple[str, str, bytes]]:
         # Extract attachment ID from multiple possible locations
         att_id = str(att.get("id", ""))
         if not att_id and "self" in att:
@@ -56,8 +266,6 @@ async def process_attachments_for_issue(
         mime_type = att.get("mimeType", "") or att.get("contentType", "")
         content_url = att.get("content", "") or att.get("self", "")
 
-        logger.info(f"Processing attachment {idx}/{total}: {name} (ID: {att_id})")
-
         # Спеціальна обробка для вкладень без ID (inline зображення)
         if not att_id:
             logger.info(f"Вкладення без ID, шукаємо через API задачі: {name}")
@@ -72,52 +280,39 @@ async def process_attachments_for_issue(
             else:
                 logger.warning(f"Не вдалося знайти вкладення {name} через API")
 
-        # Формуємо все можливі URL
-        urls = build_attachment_urls(jira_domain, att_id, name, content_url)
-
         # Визначаємо тип файлу, якщо не було надано
         if not mime_type:
             mime_type = _infer_mime_type(name)
 
-        try:
-            logger.info(f"Attempting to download attachment: {name}")
-            file_bytes = await download_file_from_jira(urls)
-
-            if not file_bytes:
-                logger.error(f"Download returned empty content for {name}")
-                errors += 1
-                continue
-
-            # Викликаємо callback для відправки в Telegram
-            logger.info(
-                f"Sending attachment {name} ({len(file_bytes)} bytes) to Telegram"
-            )
-            await send_file_cb(
-                {
-                    "chat_id": att.get("chat_id", ""),
-                    "file_name": name,
-                    "file_bytes": file_bytes,
-                    "mime_type": mime_type,
-                    "issue_key": issue_key,
-                }
-            )
-
-            success += 1
-            logger.info(f"Successfully processed attachment {name}")
-
-            # Невелика пауза між відправкою файлів
-            if idx < total:
-                await asyncio.sleep(1)
-
-        except Exception as e:
-            logger.error(f"Error processing attachment {name}: {str(e)}", exc_info=True)
-            errors += 1
-            continue
+        # Формуємо все можливі URL
+        urls = build_attachment_urls(jira_domain, att_id, name, content_url)
+        logger.info(f"Attempting to download attachment: {name}")
+        file_bytes = await download_file_from_jira(urls)
+        if not file_bytes:
+            logger.error(f"Download returned empty content for {name}")
+            return None
+        return name, mime_type, file_bytes
+
+    async def send(att: dict, downloaded: Tuple[str, str, bytes]) -> bool:
+        name, mime_type, file_bytes = downloaded
+        # Викликаємо callback для відправки в Telegram
+        logger.info(f"Sending attachment {name} ({len(file_bytes)} bytes) to Telegram")
+        await send_file_cb(
+            {
+                "chat_id": att.get("chat_id", ""),
+                "file_name": name,
+                "file_bytes": file_bytes,
+                "mime_type": mime_type,
+                "issue_key": issue_key,
+            }
+        )
+        return True
 
-    logger.info(
-        f"Attachment processing complete for {issue_key}: {success} successful, {errors} failed"
+    chat_id = attachments[0].get("chat_id", "") if attachments else ""
+    summary = await deliver_attachments(
+        chat_id, attachments, download, send, label=issue_key
     )
-    return success, errors
+    return summary["sent"], summary["failed"]
 
 
 def _infer_mime_type(filename: str) -> str:
@@ -1,9 +1,16 @@
 # field_mapping.py
 
+import json
+import logging
 import os
 from pathlib import Path
+from types import MappingProxyType
 import yaml
-from typing import Dict
+from typing import Any, Dict, Mapping, Tuple
+
+from src.constants import JIRA_FIELD_MAPPINGS
+
+logger = logging.getLogger(__name__)
 
 
 def load_field_mapping() -> Dict[str, str]:
@@ -35,5 +42,183 @@ def load_field_mapping() -> Dict[str, str]:
         raise yaml.YAMLError(f"Invalid YAML format in {mapping_file}: {str(e)}")
 
 
-# Завантажуємо мапінг при імпорті
+def load_field_values() -> Dict[str, Dict[str, Any]]:
+    """
+    Завантажує допустимі значення select-полів Jira з config/field_values.json.
+
+    Returns:
+        Dict[str, Dict[str, Any]]: {field_id: {назва: {"id": ..., "name": ...}}}
+        (порожній словник, якщо файлу немає)
+    """
+    values_path = Path(__file__).parent.parent / "config" / "field_values.json"
+    if not values_path.exists():
+        return {}
+    with values_path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("field_values.json must contain a dictionary")
+    return data
+
+
+# Типи перетворення значень поля
+RULE_TEXT = "text"  # рядок
+RULE_OPTIONAL_TEXT = "optional_text"  # рядок, порожній пропускається
+RULE_ADF = "adf"  # Atlassian Document Format
+RULE_OPTION = "option"  # select-поле: {"id": ...} або {"name": ...}
+RULE_RAW = "raw"  # значення як є
+
+# Поля, тип яких не випливає з мапінгу
+_TEXT_FIELDS = ("summary", "customfield_10145")  # Summary, Telegram ID
+_OPTIONAL_TEXT_FIELDS = ("customfield_10146",)  # Telegram @username
+_ADF_FIELDS = ("description",)
+
+DEFAULT_PROJECT_KEY = "SD"
+
+
+class FieldPlan:
+    """
+    Заздалегідь скомпільований план формування payload задачі Jira.
+    Всі таблиці (тип кожного поля, назва -> ID для select-полів, допустимі ID)
+    будуються один раз при старті, тож формування задачі - один прохід
+    по змінних бота з O(1) пошуком для кожного поля.
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[str, Tuple[str, str]],
+        nested: Mapping[str, Tuple[str, str]],
+        option_ids: Mapping[str, Mapping[str, str]],
+    ):
+        # var_name -> (тип, поле Jira)
+        self.rules = MappingProxyType(dict(rules))
+        # var_name -> (parent, child) для полів виду "parent.child"
+        self.nested = MappingProxyType(dict(nested))
+        # поле Jira -> {назва значення: id}
+        self.option_ids = MappingProxyType(
+            {field: MappingProxyType(dict(ids)) for field, ids in option_ids.items()}
+        )
+        self.valid_ids = MappingProxyType(
+            {field: frozenset(ids.values()) for field, ids in option_ids.items()}
+        )
+
+    def option_value(self, jira_field: str, value: Any) -> Any:
+        """Приводить значення select-поля до формату Jira ({"id"} якщо відомо)"""
+        option_ids = self.option_ids.get(jira_field, {})
+        if isinstance(value, dict):
+            if "id" in value:
+                option_id = str(value["id"])
+                if option_id not in self.valid_ids.get(jira_field, ()):
+                    logger.warning(
+                        f"⚠️ ID '{option_id}' для поля {jira_field} не знайдено серед допустимих значень"
+                    )
+                return {"id": option_id}
+            if "name" not in value:
+                logger.warning(f"Field {jira_field} has invalid format: {value}")
+                return value
+            value = value["name"]
+
+        text = str(value)
+        option_id = option_ids.get(text)
+        if option_id is not None:
+            return {"id": option_id}
+        if text.isdigit():
+            return {"id": text}
+        logger.warning(f"⚠️ Ім'я '{text}' для поля {jira_field} не знайдено в маппінгу!")
+        return {"name": text}
+
+    def normalize_options(self, fields: Dict[str, Any]) -> None:
+        """Приводить select-поля вже сформованого payload до формату Jira"""
+        for jira_field in self.option_ids:
+            if jira_field in fields:
+                fields[jira_field] = self.option_value(jira_field, fields[jira_field])
+
+    def build(self, bot_vars: Mapping[str, Any]) -> Dict[str, Any]:
+        """Формує поля задачі Jira з bot_vars за один прохід"""
+        fields: Dict[str, Any] = {}
+        for var_name, value in bot_vars.items():
+            if value is None:
+                continue
+            path = self.nested.get(var_name)
+            if path is not None:
+                parent, child = path
+                fields.setdefault(parent, {})[child] = value
+                continue
+            rule = self.rules.get(var_name)
+            if rule is None:
+                continue
+            kind, jira_field = rule
+            if kind == RULE_TEXT:
+                fields[jira_field] = str(value)
+            elif kind == RULE_OPTIONAL_TEXT:
+                if str(value).strip():
+                    fields[jira_field] = str(value)
+            elif kind == RULE_ADF:
+                fields[jira_field] = {
+                    "version": 1,
+                    "type": "doc",
+                    "content": [
+                        {
+                            "type": "paragraph",
+                            "content": [{"type": "text", "text": str(value)}],
+                        }
+                    ],
+                }
+            elif kind == RULE_OPTION:
+                fields[jira_field] = self.option_value(jira_field, value)
+            else:
+                fields[jira_field] = value
+
+        fields.setdefault("project", {"key": DEFAULT_PROJECT_KEY})
+        return fields
+
+
+def compile_field_plan(
+    field_map: Mapping[str, str],
+    option_tables: Mapping[str, Mapping[str, Any]],
+) -> FieldPlan:
+    """
+    Компілює план з мапінгу змінних бота на поля Jira та таблиць значень
+    select-полів ({field_id: {назва: {"id": ..., "name": ...}}}).
+    """
+    option_ids: Dict[str, Dict[str, str]] = {}
+    for jira_field, table in option_tables.items():
+        ids = option_ids.setdefault(jira_field, {})
+        for name, entry in table.items():
+            ids[name] = str(entry["id"])
+            # Значення можна передати і за назвою з самого запису
+            ids.setdefault(entry.get("name", name), str(entry["id"]))
+
+    rules: Dict[str, Tuple[str, str]] = {}
+    nested: Dict[str, Tuple[str, str]] = {}
+    for var_name, jira_field in field_map.items():
+        if not jira_field:
+            continue
+        if "." in jira_field:
+            parent, child = jira_field.split(".", 1)
+            nested[var_name] = (parent, child)
+        elif jira_field in option_ids:
+            rules[var_name] = (RULE_OPTION, jira_field)
+        elif jira_field in _TEXT_FIELDS:
+            rules[var_name] = (RULE_TEXT, jira_field)
+        elif jira_field in _OPTIONAL_TEXT_FIELDS:
+            rules[var_name] = (RULE_OPTIONAL_TEXT, jira_field)
+        elif jira_field in _ADF_FIELDS:
+            rules[var_name] = (RULE_ADF, jira_field)
+        else:
+            rules[var_name] = (RULE_RAW, jira_field)
+    return FieldPlan(rules, nested, option_ids)
+
+
+def _load_field_plan() -> FieldPlan:
+    # Значення з constants.py доповнюються/перевизначаються config/field_values.json
+    option_tables: Dict[str, Dict[str, Any]] = {
+        field: dict(table) for field, table in JIRA_FIELD_MAPPINGS.items()
+    }
+    for field, table in load_field_values().items():
+        option_tables.setdefault(field, {}).update(table)
+    return compile_field_plan(FIELD_MAP, option_tables)
+
+
+# Завантажуємо мапінг і компілюємо план при імпорті
 FIELD_MAP = load_field_mapping()
+FIELD_PLAN = _load_field_plan()
@@ -1,7 +1,12 @@
 # google_sheets_service.py
 
+import asyncio
+import logging
 import re
-from typing import Optional, Tuple, Dict, List, Union
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple, Dict, List, Union
 from functools import wraps
 
 from gspread.auth import service_account
@@ -9,7 +14,17 @@ from gspread.client import Client
 from google.oauth2.service_account import Credentials
 from gspread.exceptions import APIError, SpreadsheetNotFound
 
-from config.config import GOOGLE_CREDENTIALS_PATH, GOOGLE_SHEET_USERS_ID
+from config.config import (
+    GOOGLE_CREDENTIALS_PATH,
+    GOOGLE_SHEET_USERS_ID,
+    GOOGLE_SHEETS_MAX_WORKERS,
+    GOOGLE_SHEETS_MAX_CONCURRENCY,
+    GOOGLE_SHEETS_TIMEOUT,
+    GOOGLE_SHEETS_DIRECTORY_TTL,
+    GOOGLE_SHEETS_DIRECTORY_MISS_REFRESH,
+)
+
+logger = logging.getLogger(__name__)
 
 
 class GoogleSheetsError(Exception):
@@ -77,6 +92,129 @@ def _normalize_phone(phone: str) -> str:
     return re.sub(r"\D", "", phone)
 
 
+def _normalize_telegram_id(telegram_id: Any) -> str:
+    """Нормалізує Telegram ID: видаляє пробіли і апострофи"""
+    return str(telegram_id).strip().replace("'", "")
+
+
+class UsersDirectory:
+    """
+    Індексований знімок таблиці користувачів у пам'яті.
+
+    Таблиця завантажується один раз і зберігається у хеш-індексах за
+    нормалізованим телефоном та telegram_id (разом з номером рядка), тому
+    пошук не звертається до мережі. Знімок перезавантажується за розкладом
+    (refresh_interval), а записи бота оновлюють індекси одразу після запису.
+    Викликається з потоків пулу Google Sheets, тому всі операції під lock.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = GOOGLE_SHEETS_DIRECTORY_TTL,
+        miss_refresh_interval: float = GOOGLE_SHEETS_DIRECTORY_MISS_REFRESH,
+    ):
+        self.refresh_interval = refresh_interval
+        self.miss_refresh_interval = miss_refresh_interval
+        self._lock = threading.RLock()
+        self._rows: Dict[int, Dict[str, Union[int, float, str]]] = {}
+        self._by_phone: Dict[str, int] = {}
+        self._by_telegram_id: Dict[str, int] = {}
+        self._loaded_at: float = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded_at > 0
+
+    def _age(self) -> float:
+        return time.monotonic() - self._loaded_at
+
+    def _index_row(self, row: int, record: Dict[str, Union[int, float, str]]) -> None:
+        """Додає рядок в індекси (перший збіг має пріоритет, як і при скануванні)"""
+        self._rows[row] = record
+        phone = _normalize_phone(str(record.get("mobile_number", "")))
+        if phone:
+            self._by_phone.setdefault(phone, row)
+        telegram_id = _normalize_telegram_id(record.get("telegram_id", ""))
+        if telegram_id:
+            self._by_telegram_id.setdefault(telegram_id, row)
+
+    def refresh(self) -> None:
+        """Повністю перезавантажує знімок таблиці"""
+        records = _sheet.get_all_records()
+        with self._lock:
+            self._rows = {}
+            self._by_phone = {}
+            self._by_telegram_id = {}
+            for idx, record in enumerate(records, start=2):
+                self._index_row(idx, record)
+            self._loaded_at = time.monotonic()
+        logger.info(f"Довідник користувачів оновлено: {len(records)} записів")
+
+    def ensure_fresh(self) -> None:
+        """Перезавантажує знімок, якщо він ще не завантажений або застарів"""
+        if not self.loaded or self._age() > self.refresh_interval:
+            self.refresh()
+
+    def _lookup(
+        self, index: Dict[str, int], key: str
+    ) -> Optional[Tuple[Dict[str, Union[int, float, str]], int]]:
+        with self._lock:
+            row = index.get(key)
+            if row is None:
+                return None
+            # Повертаємо копію, щоб зміни викликаючого коду не псували індекс
+            return dict(self._rows[row]), row
+
+    def _find(
+        self, index_name: str, key: str
+    ) -> Optional[Tuple[Dict[str, Union[int, float, str]], int]]:
+        self.ensure_fresh()
+        result = self._lookup(getattr(self, index_name), key)
+        if result is None and self._age() > self.miss_refresh_interval:
+            # Запис міг з'явитися в таблиці вручну після останнього оновлення
+            self.refresh()
+            result = self._lookup(getattr(self, index_name), key)
+        return result
+
+    def find_by_phone(
+        self, normalized_phone: str
+    ) -> Optional[Tuple[Dict[str, Union[int, float, str]], int]]:
+        """Пошук за нормалізованим номером телефону"""
+        return self._find("_by_phone", normalized_phone)
+
+    def find_by_telegram_id(
+        self, normalized_id: str
+    ) -> Optional[Tuple[Dict[str, Union[int, float, str]], int]]:
+        """Пошук за нормалізованим Telegram ID"""
+        return self._find("_by_telegram_id", normalized_id)
+
+    def apply_update(self, row: int, values: Dict[str, str]) -> None:
+        """Оновлює рядок в індексах після запису в таблицю"""
+        with self._lock:
+            if not self.loaded or row not in self._rows:
+                return
+            record = self._rows[row]
+            old_telegram_id = _normalize_telegram_id(record.get("telegram_id", ""))
+            record.update(values)
+            new_telegram_id = _normalize_telegram_id(record.get("telegram_id", ""))
+            if old_telegram_id != new_telegram_id:
+                if self._by_telegram_id.get(old_telegram_id) == row:
+                    del self._by_telegram_id[old_telegram_id]
+                if new_telegram_id:
+                    self._by_telegram_id[new_telegram_id] = row
+
+    def apply_append(self, row: int, record: Dict[str, str]) -> None:
+        """Додає новий рядок в індекси після append"""
+        with self._lock:
+            if not self.loaded:
+                return
+            self._index_row(row, {col: record.get(col, "") for col in _HEADERS})
+
+
+# Глобальний довідник користувачів
+users_directory = UsersDirectory()
+
+
 @handle_google_api_errors
 def find_user_by_phone(
     phone: str,
@@ -102,11 +240,7 @@ def find_user_by_phone(
         raise ValueError("Phone number must contain at least one digit")
 
     try:
-        all_records = _sheet.get_all_records()
-        for idx, record in enumerate(all_records, start=2):
-            if _normalize_phone(str(record.get("mobile_number", ""))) == norm:
-                return record, idx
-        return None
+        return users_directory.find_by_phone(norm)
     except Exception as e:
         raise GoogleSheetsError(f"Error searching for user: {str(e)}")
 
@@ -132,18 +266,12 @@ def find_user_by_telegram_id(
         raise ValueError("Telegram ID cannot be empty")
 
     # Нормалізуємо ID: видаляємо пробіли і апострофи
-    normalized_id = str(telegram_id).strip().replace("'", "")
+    normalized_id = _normalize_telegram_id(telegram_id)
     if not normalized_id:
         raise ValueError("Telegram ID must contain at least one character")
 
     try:
-        all_records = _sheet.get_all_records()
-        for idx, record in enumerate(all_records, start=2):
-            # Normalize stored telegram_id by removing apostrophes
-            stored_id = str(record.get("telegram_id", "")).strip().replace("'", "")
-            if stored_id and stored_id == normalized_id:
-                return record, idx
-        return None
+        return users_directory.find_by_telegram_id(normalized_id)
     except Exception as e:
         raise GoogleSheetsError(f"Error searching for user: {str(e)}")
 
@@ -188,6 +316,10 @@ def update_user_telegram(row: int, telegram_id: str, telegram_username: str) ->
 
     if batch_updates:
         _sheet.batch_update(batch_updates)
+        updated_values = {"telegram_id": normalized_telegram_id}
+        if telegram_username:
+            updated_values["telegram_username"] = telegram_username
+        users_directory.apply_update(row, updated_values)
 
 
 @handle_google_api_errors
@@ -225,8 +357,22 @@ def add_new_user(record: Dict[str, str]) -> int:
 
     # Формуємо рядок у порядку _HEADERS
     row = [record.get(col, "") for col in _HEADERS]
-    _sheet.append_row(row)
-    return len(_sheet.get_all_values())
+    response = _sheet.append_row(row)
+    row_num = _row_from_append_response(response)
+    if row_num is None:
+        row_num = len(_sheet.get_all_values())
+    users_directory.apply_append(row_num, record)
+    return row_num
+
+
+def _row_from_append_response(response: Any) -> Optional[int]:
+    """Визначає номер доданого рядка з відповіді append (напр. 'Sheet1!A15:K15')"""
+    try:
+        updated_range = response["updates"]["updatedRange"]
+        match = re.search(r"![A-Z]+(\d+)", updated_range)
+        return int(match.group(1)) if match else None
+    except (KeyError, TypeError):
+        return None
 
 
 @handle_google_api_errors
@@ -241,3 +387,94 @@ def get_all_headers() -> List[str]:
         GoogleSheetsError: При помилках з API
     """
     return _HEADERS.copy()
+
+
+# --- Асинхронний фасад ---
+# gspread синхронний, тому всі виклики з async коду виконуються в окремому
+# обмеженому пулі потоків. Семафор обмежує кількість одночасних запитів до API,
+# а таймаут не дає обробнику чекати на Google Sheets нескінченно.
+
+_sheets_executor = ThreadPoolExecutor(
+    max_workers=GOOGLE_SHEETS_MAX_WORKERS, thread_name_prefix="gsheets"
+)
+_sheets_semaphore = asyncio.Semaphore(GOOGLE_SHEETS_MAX_CONCURRENCY)
+
+
+async def _run_sheets_call(
+    func: Callable[..., Any], *args: Any, timeout: Optional[float] = None
+) -> Any:
+    """
+    Виконує синхронну функцію Google Sheets у пулі потоків.
+
+    Args:
+        func: Синхронна функція цього модуля
+        *args: Аргументи функції
+        timeout: Таймаут у секундах (за замовчуванням GOOGLE_SHEETS_TIMEOUT)
+
+    Returns:
+        Any: Результат функції
+
+    Raises:
+        GoogleSheetsError: При помилках з API або перевищенні таймауту
+    """
+    request_timeout = GOOGLE_SHEETS_TIMEOUT if timeout is None else timeout
+    loop = asyncio.get_running_loop()
+    try:
+        async with _sheets_semaphore:
+            return await asyncio.wait_for(
+                loop.run_in_executor(_sheets_executor, func, *args),
+                timeout=request_timeout,
+            )
+    except asyncio.TimeoutError:
+        # Потік завершить запит самостійно, але обробник більше не чекає
+        logger.error(
+            f"Google Sheets: {func.__name__} не відповів за {request_timeout} с"
+        )
+        raise GoogleSheetsError(
+            f"Google Sheets timeout after {request_timeout}s in {func.__name__}"
+        )
+
+
+async def afind_user_by_phone(
+    phone: str, timeout: Optional[float] = None
+) -> Optional[Tuple[Dict[str, Union[int, float, str]], int]]:
+    """Асинхронна версія find_user_by_phone"""
+    return await _run_sheets_call(find_user_by_phone, phone, timeout=timeout)
+
+
+async def afind_user_by_telegram_id(
+    telegram_id: str, timeout: Optional[float] = None
+) -> Optional[Tuple[Dict[str, Union[int, float, str]], int]]:
+    """Асинхронна версія find_user_by_telegram_id"""
+    return await _run_sheets_call(
+        find_user_by_telegram_id, telegram_id, timeout=timeout
+    )
+
+
+async def aupdate_user_telegram(
+    row: int,
+    telegram_id: str,
+    telegram_username: str,
+    timeout: Optional[float] = None,
+) -> None:
+    """Асинхронна версія update_user_telegram"""
+    await _run_sheets_call(
+        update_user_telegram, row, telegram_id, telegram_username, timeout=timeout
+    )
+
+
+async def aadd_new_user(
+    record: Dict[str, str], timeout: Optional[float] = None
+) -> int:
+    """Асинхронна версія add_new_user"""
+    return await _run_sheets_call(add_new_user, record, timeout=timeout)
+
+
+async def arefresh_users_directory(timeout: Optional[float] = None) -> None:
+    """Планове оновлення довідника користувачів у пулі потоків"""
+    await _run_sheets_call(users_directory.refresh, timeout=timeout)
+
+
+def shutdown_sheets_executor() -> None:
+    """Зупиняє пул потоків Google Sheets при завершенні роботи"""
+    _sheets_executor.shutdown(wait=False, cancel_futures=True)
@@ -2,6 +2,8 @@
 
 import logging
 import re
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
 
 from telegram import Update, ReplyKeyboardRemove, ReplyKeyboardMarkup
 from telegram.ext import (
@@ -15,42 +17,41 @@ from telegram.ext import (
 )
 
 from src.google_sheets_service import (
-    find_user_by_phone,
-    find_user_by_telegram_id,
-    update_user_telegram,
+    afind_user_by_phone,
+    afind_user_by_telegram_id,
+    aupdate_user_telegram,
 )
 from src.user_management_service import user_manager
 from src.user_state_service import (
-    save_registration_state,
-    load_registration_state,
-    complete_registration,
+    asave_registration_state,
+    aload_registration_state,
+    acomplete_registration,
     BotState,
-    get_user_bot_state,
-    set_user_bot_state,
-    complete_user_registration_and_set_state,
-    set_user_current_task,
-    clear_user_current_task,
-    get_user_current_task,
+    aget_user_bot_state,
+    aset_user_bot_state,
+    acomplete_user_registration_and_set_state,
+    aset_user_current_task,
+    aclear_user_current_task,
+    aget_user_current_task,
 )
 from src.services import (
     create_jira_issue,
     find_open_issues,
-    find_done_issues,
+    find_user_issues,
     add_comment_to_jira,
     add_comment_with_file_reference_to_jira,
     JiraApiError,
+    JiraUnavailableError,
     attach_file_to_jira,
     get_issue_status,
     get_full_issue_info,
+    is_retryable_jira_error,
 )
+from src.jira_outbox import get_jira_outbox
 from src.constants import (
     DIVISIONS,
     DEPARTMENTS,
     SERVICES,
-    DIVISION_ID_MAPPINGS,
-    DEPARTMENT_ID_MAPPINGS,
-    SERVICE_ID_MAPPINGS,
-    JIRA_FIELD_IDS,
 )
 from src.keyboards import (
     main_menu_markup,
@@ -66,6 +67,101 @@ SERVICE, DESCRIPTION, CONFIRM, FULL_NAME, MOBILE_NUMBER, DIVISION, DEPARTMENT =
 # Ініціалізуємо логер
 logger = logging.getLogger(__name__)
 
+# Відповідь, коли запобіжник Jira розімкнено: не чекаємо таймаутів
+JIRA_UNAVAILABLE_MESSAGE = (
+    "⚠️ Jira тимчасово недоступна. Спробуйте, будь ласка, через кілька хвилин."
+)
+# Відповідь, коли задачу збережено в черзі записів до відновлення Jira
+ISSUE_QUEUED_MESSAGE = (
+    "📮 *Заявку прийнято.*\n\n"
+    "Jira зараз відповідає із затримкою, тому задачу буде створено автоматично, "
+    "щойно вона стане доступна. Номер задачі надійде окремим повідомленням."
+)
+
+
+async def submit_comment_to_jira(
+    issue_key: str, text: str, author_name: Optional[str], telegram_id: Any
+) -> None:
+    """Коментар іде через чергу записів (доставка у фоні), якщо її ввімкнено"""
+    outbox = get_jira_outbox()
+    if outbox is None:
+        await add_comment_to_jira(issue_key, text, author_name)
+        return
+    await outbox.enqueue_comment(issue_key, text, author_name, str(telegram_id))
+
+
+async def submit_file_to_jira(
+    issue_key: str,
+    comment: str,
+    author_name: Optional[str],
+    filename: str,
+    content: bytes,
+    telegram_id: Any,
+) -> None:
+    """Файл з коментарем-посиланням іде через чергу записів, якщо її ввімкнено"""
+    outbox = get_jira_outbox()
+    if outbox is None:
+        await add_comment_with_file_reference_to_jira(
+            issue_key, comment, author_name, filename, content
+        )
+        return
+    await outbox.enqueue_file_comment(
+        issue_key, filename, content, comment, author_name, str(telegram_id)
+    )
+
+
+async def create_issue_or_enqueue(
+    payload: Dict[str, Any],
+    telegram_id: Any,
+    load_attachment: Optional[Callable[[], Awaitable[Tuple[str, bytes]]]] = None,
+) -> Optional[str]:
+    """
+    Створює задачу в Jira. Якщо Jira недоступна або не відповідає, задача
+    ставиться в чергу записів і функція повертає None.
+
+    Args:
+        payload: Payload задачі (build_jira_payload)
+        telegram_id: Telegram ID автора (отримає номер задачі повідомленням)
+        load_attachment: Завантажує файл для черги (прикріпиться після створення)
+    """
+    # Той самий ключ іде і в пряму спробу, і в чергу: якщо Jira створила
+    # задачу, але відповідь не дійшла, черга знайде її замість дубля
+    idempotency_key = uuid.uuid4().hex
+    try:
+        return await create_jira_issue(payload, idempotency_key)
+    except JiraApiError as e:
+        outbox = get_jira_outbox()
+        if outbox is None or not is_retryable_jira_error(e):
+            raise
+        logger.warning(f"Задачу для {telegram_id} поставлено в чергу: {e}")
+
+    filename, content = None, None
+    if load_attachment is not None:
+        try:
+            filename, content = await load_attachment()
+        except Exception as e:
+            logger.error(f"Не вдалося завантажити файл для задачі в черзі: {e}")
+    await outbox.enqueue_issue(
+        payload, str(telegram_id), filename, content, idempotency_key=idempotency_key
+    )
+    return None
+
+
+def attached_photo_loader(
+    context: ContextTypes.DEFAULT_TYPE,
+) -> Optional[Callable[[], Awaitable[Tuple[str, bytes]]]]:
+    """Завантажувач фото, прикладеного до опису задачі (None - фото немає)"""
+    photo_data = context.user_data.get("attached_photo")
+    if not photo_data:
+        return None
+
+    async def load() -> Tuple[str, bytes]:
+        file = await context.bot.get_file(photo_data["file_id"])
+        filename = f"photo_{photo_data.get('file_unique_id', 'unknown')}.jpg"
+        return filename, bytes(await file.download_as_bytearray())
+
+    return load
+
 
 # Глобальна функція для валідації номера телефону
 def validate_phone_format(phone: str) -> tuple[bool, str]:
@@ -230,7 +326,7 @@ async def main_message_dispatcher(update: Update, context: ContextTypes.DEFAULT_
         return
 
     telegram_id = update.message.from_user.id
-    user_state = get_user_bot_state(telegram_id)
+    user_state = await aget_user_bot_state(telegram_id)
 
     logger.info(
         f"🔄 ДИСПЕТЧЕР: користувач {telegram_id}, стан: {user_state}, повідомлення: '{update.message.text[:50] if update.message.text else 'Non-text'}'"  # noqa: E501
@@ -302,7 +398,7 @@ async def main_message_dispatcher(update: Update, context: ContextTypes.DEFAULT_
 
     # 3. Стан авторизований з задачею - обробляємо коментарі до задачі
     elif user_state == BotState.AUTHORIZED_WITH_TASK:
-        current_task = get_user_current_task(telegram_id)
+        current_task = await aget_user_current_task(telegram_id)
         logger.info(f"📝 Користувач {telegram_id} має відкриту задачу {current_task}")
 
         # Перевіряємо чи це не кнопка меню
@@ -435,42 +531,25 @@ async def handle_inline_issue_description(
             bot_vars["account_id"] = JIRA_REPORTER_ACCOUNT_ID
 
         # Використовуємо функції з сервісів
-        from src.services import build_jira_payload, create_jira_issue
-        from src.constants import (
-            DIVISION_ID_MAPPINGS,
-            DEPARTMENT_ID_MAPPINGS,
-            SERVICE_ID_MAPPINGS,
-        )
-
-        if "division" in bot_vars and bot_vars["division"] in DIVISION_ID_MAPPINGS:
-            field_id = JIRA_FIELD_IDS["division"]
-            bot_vars[field_id] = {
-                "id": DIVISION_ID_MAPPINGS[bot_vars["division"]]["id"]
-            }
-
-        if (
-            "department" in bot_vars
-            and bot_vars["department"] in DEPARTMENT_ID_MAPPINGS
-        ):
-            field_id = JIRA_FIELD_IDS["department"]
-            bot_vars[field_id] = {
-                "id": DEPARTMENT_ID_MAPPINGS[bot_vars["department"]]["id"]
-            }
-
-        if "service" in bot_vars and bot_vars["service"] in SERVICE_ID_MAPPINGS:
-            field_id = JIRA_FIELD_IDS["service"]
-            bot_vars[field_id] = {"id": SERVICE_ID_MAPPINGS[bot_vars["service"]]["id"]}
+        from src.services import build_jira_payload
 
         payload = build_jira_payload(bot_vars)
 
-        # Створюємо задачу в JIRA
-        issue_key = await create_jira_issue(payload)
+        # Створюємо задачу в JIRA (якщо Jira недоступна - задача піде в чергу)
+        issue_key = await create_issue_or_enqueue(payload, telegram_id)
+        if issue_key is None:
+            context.user_data.clear()
+            context.user_data["telegram_id"] = str(telegram_id)
+            await update.message.reply_text(
+                ISSUE_QUEUED_MESSAGE, reply_markup=main_menu_markup, parse_mode="Markdown"
+            )
+            raise ApplicationHandlerStop
 
         # Встановлюємо активну задачу
         context.user_data["active_task"] = issue_key
 
         # Оновлюємо стан користувача
-        set_user_current_task(telegram_id, issue_key)
+        await aset_user_current_task(telegram_id, issue_key)
         logger.info(
             f"🔄 Стан користувача {telegram_id} змінено на AUTHORIZED_WITH_TASK з задачею {issue_key}"
         )
@@ -489,6 +568,8 @@ async def handle_inline_issue_description(
             parse_mode="Markdown",
         )
 
+    except ApplicationHandlerStop:
+        raise
     except Exception as e:
         logger.error(f"Помилка при створенні задачі через inline опис: {e}")
         await update.message.reply_text(
@@ -528,10 +609,10 @@ async def handle_task_comment(
             )
 
             # Очищаємо поточну задачу користувача
-            clear_user_current_task(telegram_id)
+            await aclear_user_current_task(telegram_id)
 
             # Оновлюємо стан користувача на AUTHORIZED_NO_TASKS
-            set_user_bot_state(telegram_id, BotState.AUTHORIZED_NO_TASKS)
+            await aset_user_bot_state(telegram_id, BotState.AUTHORIZED_NO_TASKS)
 
             # Екрануємо спеціальні символи для MarkdownV2
             task_key_escaped = task_key.replace("-", "\\-")
@@ -545,6 +626,13 @@ async def handle_task_comment(
             )
             return
 
+    except JiraUnavailableError as e:
+        if get_jira_outbox() is None:
+            logger.warning(f"Jira недоступна, коментар до {task_key} не додано: {e}")
+            await update.message.reply_text(JIRA_UNAVAILABLE_MESSAGE)
+            return
+        # Статус невідомий, але коментар буде доставлено з черги
+        logger.warning(f"Jira недоступна, статус {task_key} не перевірено: {e}")
     except Exception as e:
         logger.error(f"Помилка перевірки статусу задачі {task_key}: {e}")
         await update.message.reply_text("❌ Помилка перевірки статусу задачі")
@@ -552,9 +640,9 @@ async def handle_task_comment(
 
     # Отримуємо дані користувача
     try:
-        from src.user_state_service import load_user_profile
+        from src.user_state_service import aload_user_profile
 
-        user_profile = load_user_profile(telegram_id)
+        user_profile = await aload_user_profile(telegram_id)
         if not user_profile:
             await update.message.reply_text(
                 "❌ Помилка: профіль користувача не знайдено"
@@ -634,10 +722,15 @@ async def text_comment_handler(
 
     try:
         # Додаємо коментар до Jira
-        await add_comment_to_jira(task_key, text, author_name)
+        await submit_comment_to_jira(
+            task_key, text, author_name, update.effective_user.id
+        )
         # Підтвердження користувачу (webhook не спрацює для коментарів від бота)
         await update.message.reply_text(f"✅ Коментар додано до задачі {task_key}")
 
+    except JiraUnavailableError as e:
+        logger.warning(f"Jira недоступна, коментар до {task_key} не додано: {e}")
+        await update.message.reply_text(JIRA_UNAVAILABLE_MESSAGE)
     except Exception as e:
         logger.error(f"Помилка додавання текстового коментаря до {task_key}: {e}")
         await update.message.reply_text("❌ Помилка додавання коментаря")
@@ -704,10 +797,10 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         ):
             try:
                 # Знаходимо рядок для оновлення
-                res = find_user_by_telegram_id(user_id)
+                res = await afind_user_by_telegram_id(user_id)
                 if res:
                     _, row = res
-                    update_user_telegram(row, user_id, tg_username)
+                    await aupdate_user_telegram(row, user_id, tg_username)
                     user_data["telegram_username"] = tg_username
             except Exception as e:
                 logger.warning(f"Не вдалось оновити username в Google Sheets: {e}")
@@ -722,7 +815,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         }.get(source, "")
 
         # Перевіряємо чи є відкрита задача
-        current_task = get_user_current_task(int(user_id))
+        current_task = await aget_user_current_task(int(user_id))
         task_info = ""
         if current_task:
             task_info = f"\n\n📋 *У вас є відкрита задача:* `{current_task}`\n💬 _Спочатку дочекайтесь її вирішення або додайте коментар до існуючої._"  # noqa: E501
@@ -785,7 +878,7 @@ async def global_contact_handler(update: Update, context: ContextTypes.DEFAULT_T
         context.user_data["profile"] = user_data
 
         # Показуємо успішну авторизацію з повною інформацією про користувача
-        cache_info = user_manager.get_user_cache_info(telegram_id)
+        cache_info = await user_manager.get_user_cache_info(telegram_id)
         sync_status = (
             "🔄 *Синхронізовано з Google Sheets*"
             if cache_info.get("sync_status")
@@ -826,7 +919,9 @@ async def global_contact_handler(update: Update, context: ContextTypes.DEFAULT_T
         context.user_data["registration_step"] = "name"
 
         # Зберігаємо стан реєстрації у файл
-        save_registration_state(telegram_id, context.user_data["registration"], "name")
+        await asave_registration_state(
+            telegram_id, context.user_data["registration"], "name"
+        )
 
         logger.info("Почато розширену реєстрацію нового користувача")
 
@@ -862,7 +957,7 @@ async def contact_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     logger.info("ConversationHandler: отримано номер телефону")
 
     # Шукаємо користувача в Google Sheets
-    res = find_user_by_phone(phone)
+    res = await afind_user_by_phone(phone)
     if res:
         record, row = res
         # Оновлюємо telegram_id та username
@@ -870,7 +965,7 @@ async def contact_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         tg_username = update.effective_user.username or ""
 
         # Оновлюємо дані в таблиці
-        update_user_telegram(row, tg_id, tg_username)
+        await aupdate_user_telegram(row, tg_id, tg_username)
 
         # Зберігаємо профіль
         record["telegram_id"] = tg_id.strip().replace("'", "")
@@ -918,7 +1013,9 @@ async def contact_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # Зберігаємо стан реєстрації у файл
         telegram_id = int(update.effective_user.id)
-        save_registration_state(telegram_id, context.user_data["registration"], "name")
+        await asave_registration_state(
+            telegram_id, context.user_data["registration"], "name"
+        )
 
         # ЗАВЕРШУЄМО ConversationHandler і переходимо до розширеної реєстрації
         logger.info(
@@ -942,7 +1039,7 @@ async def global_registration_handler(
     # Спробуємо завантажити стан з файлу, якщо його немає в context
     registration_step = context.user_data.get("registration_step")
     if not registration_step:
-        saved_state = load_registration_state(telegram_id)
+        saved_state = await aload_registration_state(telegram_id)
         if (
             saved_state
             and saved_state.get("state", {}).get("type") != "registration_completed"
@@ -968,7 +1065,7 @@ async def global_registration_handler(
         ):
             # Реєстрацію завершено, очищаємо файл і пропускаємо
             logger.info("Реєстрацію користувача вже завершено, очищаємо стан")
-            complete_registration(telegram_id)
+            await acomplete_registration(telegram_id)
             raise ApplicationHandlerStop()
         else:
             # Перевіряємо чи є файл стану - якщо немає, то користувач не в процесі реєстрації
@@ -1023,7 +1120,7 @@ async def global_registration_handler(
         context.user_data["registration_step"] = "division"
 
         # Зберігаємо стан у файл
-        save_registration_state(
+        await asave_registration_state(
             telegram_id, context.user_data["registration"], "division"
         )
 
@@ -1059,7 +1156,7 @@ async def global_registration_handler(
         context.user_data["registration_step"] = "department"
 
         # Зберігаємо стан у файл
-        save_registration_state(
+        await asave_registration_state(
             telegram_id, context.user_data["registration"], "department"
         )
 
@@ -1100,7 +1197,7 @@ async def global_registration_handler(
         context.user_data["registration_step"] = "confirm"
 
         # Зберігаємо стан у файл
-        save_registration_state(
+        await asave_registration_state(
             telegram_id, context.user_data["registration"], "confirm"
         )
 
@@ -1172,7 +1269,7 @@ async def global_registration_handler(
             context.user_data["registration_step"] = "name"
 
             # Зберігаємо початковий стан
-            save_registration_state(
+            await asave_registration_state(
                 telegram_id, context.user_data["registration"], "name"
             )
 
@@ -1206,7 +1303,7 @@ async def global_registration_handler(
                 # Очищаємо неповні дані
                 context.user_data.pop("registration", None)
                 context.user_data.pop("registration_step", None)
-                complete_registration(telegram_id)
+                await acomplete_registration(telegram_id)
                 return
 
             # Зберігаємо користувача через гібридний сервіс
@@ -1234,7 +1331,7 @@ async def global_registration_handler(
                     context.user_data.pop("registration_step", None)
 
                     # Позначаємо реєстрацію як завершену та встановлюємо стан AUTHORIZED_NO_TASKS
-                    complete_user_registration_and_set_state(telegram_id)
+                    await acomplete_user_registration_and_set_state(telegram_id)
 
                     # Показуємо успішне завершення реєстрації з повною інформацією
                     success_message = (
@@ -1493,8 +1590,7 @@ async def update_issues_status(update: Update, context: ContextTypes.DEFAULT_TYP
         active_task = context.user_data.get("active_task")
 
         # Отримуємо список активних та виконаних задач
-        open_issues = await find_open_issues(tg_id)
-        done_issues = await find_done_issues(tg_id)
+        open_issues, done_issues = await find_user_issues(tg_id)
 
         # Инициализируем переменную
         active_task_is_done = False
@@ -1512,8 +1608,8 @@ async def update_issues_status(update: Update, context: ContextTypes.DEFAULT_TYP
                 )
 
                 # Очищаємо поточну задачу користувача та оновлюємо стан
-                clear_user_current_task(int(tg_id))
-                set_user_bot_state(int(tg_id), BotState.AUTHORIZED_NO_TASKS)
+                await aclear_user_current_task(int(tg_id))
+                await aset_user_bot_state(int(tg_id), BotState.AUTHORIZED_NO_TASKS)
 
                 # Надсилаємо два повідомлення для гарантованої зміни клавіатури
                 await update.message.reply_text(
@@ -1729,10 +1825,10 @@ async def comment_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
 
             # Очищаємо поточну задачу користувача
-            clear_user_current_task(int(tg_id))
+            await aclear_user_current_task(int(tg_id))
 
             # Оновлюємо стан користувача на AUTHORIZED_NO_TASKS
-            set_user_bot_state(int(tg_id), BotState.AUTHORIZED_NO_TASKS)
+            await aset_user_bot_state(int(tg_id), BotState.AUTHORIZED_NO_TASKS)
 
             await update.message.reply_text(
                 f"❌ Задача *{key}* вже завершена (статус: _{status_name}_)\\.\n"
@@ -1743,6 +1839,15 @@ async def comment_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
 
+    except JiraUnavailableError as e:
+        if get_jira_outbox() is None:
+            logger.warning(f"Jira недоступна, задачу {key} не оновлено: {e}")
+            await update.message.reply_text(
+                JIRA_UNAVAILABLE_MESSAGE, reply_markup=main_menu_markup
+            )
+            return
+        # Статус невідомий, але запис буде доставлено з черги
+        logger.warning(f"Jira недоступна, статус {key} не перевірено: {e}")
     except Exception as e:
         logger.error(f"Помилка перевірки статусу задачі {key}: {e}")
         await update.message.reply_text("❌ Помилка перевірки статусу задачі")
@@ -1773,9 +1878,9 @@ async def comment_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not author_name:
             try:
                 tg_id = str(update.effective_user.id)
-                from src.google_sheets_service import find_user_by_telegram_id
+                from src.google_sheets_service import afind_user_by_telegram_id
 
-                user_record = find_user_by_telegram_id(tg_id)
+                user_record = await afind_user_by_telegram_id(tg_id)
                 if user_record and user_record[0]:
                     full_name = user_record[0].get("full_name")
                     author_name = str(full_name) if full_name is not None else None
@@ -1786,7 +1891,7 @@ async def comment_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         logger.info(
             f"Додавання коментаря до задачі {key} від {author_name or 'невідомого користувача'}: '{text[:20]}...'"
         )
-        await add_comment_to_jira(key, text, author_name)
+        await submit_comment_to_jira(key, text, author_name, tg_id)
 
         # Додаємо повідомлення до кешу, щоб уникнути дублікатів при отриманні вебхуку
         from src.jira_webhooks2 import add_message_to_cache
@@ -1813,7 +1918,7 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обробляє будь-яке вкладення і прикріплює до активної задачі"""
     # Отримуємо поточну задачу з bot_state
     telegram_id = update.message.from_user.id
-    key = get_user_current_task(telegram_id)
+    key = await aget_user_current_task(telegram_id)
 
     # Якщо не знайдено в bot_state, перевіряємо старий спосіб (для сумісності)
     if not key:
@@ -1845,10 +1950,10 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
             # Очищаємо поточну задачу користувача
             telegram_id = update.message.from_user.id
-            clear_user_current_task(telegram_id)
+            await aclear_user_current_task(telegram_id)
 
             # Оновлюємо стан користувача на AUTHORIZED_NO_TASKS
-            set_user_bot_state(telegram_id, BotState.AUTHORIZED_NO_TASKS)
+            await aset_user_bot_state(telegram_id, BotState.AUTHORIZED_NO_TASKS)
 
             await update.message.reply_text(
                 f"❌ Задача *{key}* вже завершена (статус: _{status_name}_)\\.\n"
@@ -1859,6 +1964,15 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
             )
             return
 
+    except JiraUnavailableError as e:
+        if get_jira_outbox() is None:
+            logger.warning(f"Jira недоступна, задачу {key} не оновлено: {e}")
+            await update.message.reply_text(
+                JIRA_UNAVAILABLE_MESSAGE, reply_markup=main_menu_markup
+            )
+            return
+        # Статус невідомий, але запис буде доставлено з черги
+        logger.warning(f"Jira недоступна, статус {key} не перевірено: {e}")
     except Exception as e:
         logger.error(f"Помилка перевірки статусу задачі {key}: {e}")
         await update.message.reply_text("❌ Помилка перевірки статусу задачі")
@@ -1867,7 +1981,8 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Перевірка на наявність файлу
     if update.message.document:
         file = update.message.document
-        filename = file.file_name
+        # Telegram може не передати назву документа
+        filename = file.file_name or f"document_{file.file_unique_id}"
     elif update.message.photo:
         file = update.message.photo[-1]
         filename = f"photo_{file.file_unique_id}.jpg"
@@ -1906,10 +2021,10 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Якщо ПІБ все ще не знайдено, спробуємо отримати з Google Sheets
         if not author_name:
             try:
-                from src.google_sheets_service import find_user_by_telegram_id
+                from src.google_sheets_service import afind_user_by_telegram_id
 
                 user_id = str(update.effective_user.id)
-                user_record = find_user_by_telegram_id(user_id)
+                user_record = await afind_user_by_telegram_id(user_id)
                 if user_record and user_record[0]:
                     author_name = user_record[0].get("full_name")
                     logger.info(
@@ -1928,7 +2043,9 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         # Якщо є підпис до файлу - спочатку додаємо коментар з текстом
         if caption and caption.strip():
-            await add_comment_to_jira(key, caption.strip(), author_name_str)
+            await submit_comment_to_jira(
+                key, caption.strip(), author_name_str, telegram_id
+            )
             logger.info(f"Коментар з текстом від {author_name_str} додано до {key}")
 
             # Додаємо до кешу (simplified without tech support header)
@@ -1941,8 +2058,8 @@ async def file_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         file_comment = (
             ""  # Порожній текст, але заголовок автора буде додано автоматично
         )
-        await add_comment_with_file_reference_to_jira(
-            key, file_comment, author_name_str, filename, bytes(file_bytes)
+        await submit_file_to_jira(
+            key, file_comment, author_name_str, filename, bytes(file_bytes), telegram_id
         )
         logger.info(
             f"Коментар з файлом та посиланням від {author_name_str} додано до {key}"
@@ -2100,10 +2217,10 @@ async def create_issue_start(update: Update, context: ContextTypes.DEFAULT_TYPE)
     # Завантажуємо профіль користувача якщо він не в контексті
     profile = context.user_data.get("profile")
     if not profile:
-        from src.user_state_service import load_user_profile
+        from src.user_state_service import aload_user_profile
 
         tg_id = update.effective_user.id
-        profile = load_user_profile(tg_id)
+        profile = await aload_user_profile(tg_id)
         if profile:
             context.user_data["profile"] = profile
 
@@ -2562,42 +2679,25 @@ async def create_issue_automatically(
 
         # Використовуємо функцію build_jira_payload
         from src.services import build_jira_payload
-        from src.constants import (
-            DIVISION_ID_MAPPINGS,
-            DEPARTMENT_ID_MAPPINGS,
-            SERVICE_ID_MAPPINGS,
-        )
-
-        if "division" in bot_vars and bot_vars["division"] in DIVISION_ID_MAPPINGS:
-            field_id = JIRA_FIELD_IDS["division"]
-            bot_vars[field_id] = {
-                "id": DIVISION_ID_MAPPINGS[bot_vars["division"]]["id"]
-            }
-
-        if (
-            "department" in bot_vars
-            and bot_vars["department"] in DEPARTMENT_ID_MAPPINGS
-        ):
-            field_id = JIRA_FIELD_IDS["department"]
-            bot_vars[field_id] = {
-                "id": DEPARTMENT_ID_MAPPINGS[bot_vars["department"]]["id"]
-            }
-
-        if "service" in bot_vars and bot_vars["service"] in SERVICE_ID_MAPPINGS:
-            field_id = JIRA_FIELD_IDS["service"]
-            bot_vars[field_id] = {"id": SERVICE_ID_MAPPINGS[bot_vars["service"]]["id"]}
 
         payload = build_jira_payload(bot_vars)
 
-        # Створюємо задачу в JIRA
-        issue_key = await create_jira_issue(payload)
+        # Створюємо задачу в JIRA (якщо Jira недоступна - задача піде в чергу)
+        telegram_id = update.effective_user.id
+        issue_key = await create_issue_or_enqueue(payload, telegram_id)
+        if issue_key is None:
+            context.user_data.clear()
+            context.user_data["telegram_id"] = str(telegram_id)
+            await update.message.reply_text(
+                ISSUE_QUEUED_MESSAGE, reply_markup=main_menu_markup, parse_mode="Markdown"
+            )
+            return
 
         # Встановлюємо активну задачу
         context.user_data["active_task"] = issue_key
 
         # Оновлюємо стан користувача - тепер у нього є відкрита задача
-        telegram_id = update.effective_user.id
-        set_user_current_task(telegram_id, issue_key)
+        await aset_user_current_task(telegram_id, issue_key)
         logger.info(
             f"🔄 Стан користувача {telegram_id} змінено на AUTHORIZED_WITH_TASK з задачею {issue_key}"
         )
@@ -2726,41 +2826,6 @@ async def description_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
         # Використовуємо функцію build_jira_payload замість ручного створення payload
         from src.services import build_jira_payload
 
-        # Преобразуем значения полей, используя маппинги ID (відновлено з confirm_callback)
-        from src.constants import (
-            DIVISION_ID_MAPPINGS,
-            DEPARTMENT_ID_MAPPINGS,
-            SERVICE_ID_MAPPINGS,
-        )
-
-        if "division" in bot_vars and bot_vars["division"] in DIVISION_ID_MAPPINGS:
-            field_id = JIRA_FIELD_IDS["division"]
-            bot_vars[field_id] = {
-                "id": DIVISION_ID_MAPPINGS[bot_vars["division"]]["id"]
-            }
-            logger.info(
-                f"Додано маппінг для division: {bot_vars['division']} -> {bot_vars[field_id]}"
-            )
-
-        if (
-            "department" in bot_vars
-            and bot_vars["department"] in DEPARTMENT_ID_MAPPINGS
-        ):
-            field_id = JIRA_FIELD_IDS["department"]
-            bot_vars[field_id] = {
-                "id": DEPARTMENT_ID_MAPPINGS[bot_vars["department"]]["id"]
-            }
-            logger.info(
-                f"Додано маппінг для department: {bot_vars['department']} -> {bot_vars[field_id]}"
-            )
-
-        if "service" in bot_vars and bot_vars["service"] in SERVICE_ID_MAPPINGS:
-            field_id = JIRA_FIELD_IDS["service"]
-            bot_vars[field_id] = {"id": SERVICE_ID_MAPPINGS[bot_vars["service"]]["id"]}
-            logger.info(
-                f"Додано маппінг для service: {bot_vars['service']} -> {bot_vars[field_id]}"
-            )
-
         payload = build_jira_payload(bot_vars)
 
         # Логування для діагностики telegram_id
@@ -2771,15 +2836,33 @@ async def description_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
             f"🔍 Payload fields містить telegram_id: {'telegram_id' in str(payload)}"
         )
 
-        # Створюємо задачу в JIRA
-        issue_key = await create_jira_issue(payload)
+        # Створюємо задачу в JIRA (якщо Jira недоступна - задача піде в чергу)
+        telegram_id = update.effective_user.id
+        issue_key = await create_issue_or_enqueue(
+            payload, telegram_id, attached_photo_loader(context)
+        )
+        if issue_key is None:
+            for key in (
+                "full_name",
+                "mobile_number",
+                "division",
+                "department",
+                "service",
+                "description",
+                "attached_photo",
+                "in_conversation",
+            ):
+                context.user_data.pop(key, None)
+            await update.message.reply_text(
+                ISSUE_QUEUED_MESSAGE, reply_markup=main_menu_markup, parse_mode="Markdown"
+            )
+            return ConversationHandler.END
 
         # Встановлюємо активну задачу (відновлено з confirm_callback)
         context.user_data["active_task"] = issue_key
 
         # Оновлюємо стан користувача - тепер у нього є відкрита задача
-        telegram_id = update.effective_user.id
-        set_user_current_task(telegram_id, issue_key)
+        await aset_user_current_task(telegram_id, issue_key)
         logger.info(
             f"🔄 Стан користувача {telegram_id} змінено на AUTHORIZED_WITH_TASK з задачею {issue_key}"
         )
@@ -2936,30 +3019,6 @@ async def confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Используем функцию build_jira_payload вместо ручного создания payload
     from services import build_jira_payload
 
-    # Преобразуем значения полей, используя маппинги ID
-    if "division" in bot_vars and bot_vars["division"] in DIVISION_ID_MAPPINGS:
-        field_id = JIRA_FIELD_IDS["division"]
-        bot_vars[field_id] = {"id": DIVISION_ID_MAPPINGS[bot_vars["division"]]["id"]}
-        logger.info(
-            f"Использую маппинг для division: {bot_vars['division']} -> {bot_vars[field_id]}"
-        )
-
-    if "department" in bot_vars and bot_vars["department"] in DEPARTMENT_ID_MAPPINGS:
-        field_id = JIRA_FIELD_IDS["department"]
-        bot_vars[field_id] = {
-            "id": DEPARTMENT_ID_MAPPINGS[bot_vars["department"]]["id"]
-        }
-        logger.info(
-            f"Использую маппинг для department: {bot_vars['department']} -> {bot_vars[field_id]}"
-        )
-
-    if "service" in bot_vars and bot_vars["service"] in SERVICE_ID_MAPPINGS:
-        field_id = JIRA_FIELD_IDS["service"]
-        bot_vars[field_id] = {"id": SERVICE_ID_MAPPINGS[bot_vars["service"]]["id"]}
-        logger.info(
-            f"Использую маппинг для service: {bot_vars['service']} -> {bot_vars[field_id]}"
-        )
-
     payload = build_jira_payload(bot_vars)
 
     try:
@@ -2992,64 +3051,73 @@ async def confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             return ConversationHandler.END
 
         # Використовуємо правильно сформований payload
-        issue_key = await create_jira_issue(payload)
-        # Встановлюємо активну задачу
-        context.user_data["active_task"] = issue_key
-
-        # Оновлюємо стан користувача - тепер у нього є відкрита задача
+        # (якщо Jira недоступна - задача разом з фото піде в чергу)
         telegram_id = query.from_user.id
-        set_user_current_task(telegram_id, issue_key)
-        logger.info(
-            f"🔄 Стан користувача {telegram_id} змінено на AUTHORIZED_WITH_TASK з задачею {issue_key}"
+        issue_key = await create_issue_or_enqueue(
+            payload, telegram_id, attached_photo_loader(context)
         )
-
-        # Перевіряємо, чи є прикріплене фото
-        attached_photo = context.user_data.get("attached_photo")
-        if attached_photo:
-            try:
-                # Завантажуємо і прикріплюємо фото до задачі
-                from telegram import Bot
-
-                bot = Bot(token=context.bot.token)
-                file = await bot.get_file(attached_photo["file_id"])
-                filename = f"photo_{attached_photo['file_unique_id']}.jpg"
-
-                # Завантажуємо файл у пам'ять
-                file_data = await file.download_as_bytearray()
-
-                # Прикріплюємо до Jira (конвертуємо bytearray в bytes)
-                await attach_file_to_jira(issue_key, filename, bytes(file_data))
-
-                # Очищаємо дані про фото
-                del context.user_data["attached_photo"]
-
-                # ВИДАЛЕНО: Дублювання з webhook повідомленням про створення задачі
-                # await query.message.reply_text(
-                #     f"✅ Задача створена: *{issue_key}*\n"
-                #     f"📸 Фото успішно прикріплено до задачі!\n"
-                #     f"_Тепер ви можете додати коментар або прикріпити інші файли._",
-                #     reply_markup=issues_view_markup,
-                #     parse_mode="Markdown"
-                # )
-            except Exception as e:
-                logger.error(
-                    f"Помилка прикріплення фото до задачі {issue_key}: {str(e)}"
-                )
-                # ВИДАЛЕНО: Дублювання з webhook повідомленням про створення задачі
-                # await query.message.reply_text(
-                #     f"✅ Задача створена: *{issue_key}*\n"
-                #     f"❌ Помилка прикріплення фото: _{str(e)}_\n"
-                #     f"_Ви можете спробувати прикріпити фото знову через коментарі._",
-                #     reply_markup=issues_view_markup,
-                #     parse_mode="Markdown"
-                # )
+        if issue_key is None:
+            context.user_data.pop("attached_photo", None)
+            await query.message.reply_text(
+                ISSUE_QUEUED_MESSAGE, reply_markup=main_menu_markup, parse_mode="Markdown"
+            )
         else:
-            # ЗАКОМЕНТОВАНО: Дублювання з webhook повідомленням
-            # # Змінюємо клавіатуру на issues_view_markup для відображення кнопок оновлення статусу
-            # await query.message.reply_text(f"✅ Задача створена: *{issue_key}*\n_Тепер ви можете додати коментар або прикріпити файл._",  # noqa: E501
-            #                             reply_markup=issues_view_markup,
-            #                             parse_mode="Markdown")
-            pass  # Webhook вже надішле повідомлення про створення задачі
+            # Встановлюємо активну задачу
+            context.user_data["active_task"] = issue_key
+
+            # Оновлюємо стан користувача - тепер у нього є відкрита задача
+            await aset_user_current_task(telegram_id, issue_key)
+            logger.info(
+                f"🔄 Стан користувача {telegram_id} змінено на AUTHORIZED_WITH_TASK з задачею {issue_key}"
+            )
+
+            # Перевіряємо, чи є прикріплене фото
+            attached_photo = context.user_data.get("attached_photo")
+            if attached_photo:
+                try:
+                    # Завантажуємо і прикріплюємо фото до задачі
+                    from telegram import Bot
+
+                    bot = Bot(token=context.bot.token)
+                    file = await bot.get_file(attached_photo["file_id"])
+                    filename = f"photo_{attached_photo['file_unique_id']}.jpg"
+
+                    # Завантажуємо файл у пам'ять
+                    file_data = await file.download_as_bytearray()
+
+                    # Прикріплюємо до Jira (конвертуємо bytearray в bytes)
+                    await attach_file_to_jira(issue_key, filename, bytes(file_data))
+
+                    # Очищаємо дані про фото
+                    del context.user_data["attached_photo"]
+
+                    # ВИДАЛЕНО: Дублювання з webhook повідомленням про створення задачі
+                    # await query.message.reply_text(
+                    #     f"✅ Задача створена: *{issue_key}*\n"
+                    #     f"📸 Фото успішно прикріплено до задачі!\n"
+                    #     f"_Тепер ви можете додати коментар або прикріпити інші файли._",
+                    #     reply_markup=issues_view_markup,
+                    #     parse_mode="Markdown"
+                    # )
+                except Exception as e:
+                    logger.error(
+                        f"Помилка прикріплення фото до задачі {issue_key}: {str(e)}"
+                    )
+                    # ВИДАЛЕНО: Дублювання з webhook повідомленням про створення задачі
+                    # await query.message.reply_text(
+                    #     f"✅ Задача створена: *{issue_key}*\n"
+                    #     f"❌ Помилка прикріплення фото: _{str(e)}_\n"
+                    #     f"_Ви можете спробувати прикріпити фото знову через коментарі._",
+                    #     reply_markup=issues_view_markup,
+                    #     parse_mode="Markdown"
+                    # )
+            else:
+                # ЗАКОМЕНТОВАНО: Дублювання з webhook повідомленням
+                # # Змінюємо клавіатуру на issues_view_markup для відображення кнопок оновлення статусу
+                # await query.message.reply_text(f"✅ Задача створена: *{issue_key}*\n_Тепер ви можете додати коментар або прикріпити файл._",  # noqa: E501
+                #                             reply_markup=issues_view_markup,
+                #                             parse_mode="Markdown")
+                pass  # Webhook вже надішле повідомлення про створення задачі
 
         # Очищаємо флаг conversation після успішного створення
         context.user_data.pop("in_conversation", None)
@@ -3112,9 +3180,9 @@ async def confirm_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
             }
 
             if new_user_data["full_name"] and new_user_data["telegram_id"]:
-                from src.google_sheets_service import add_new_user
+                from src.google_sheets_service import aadd_new_user
 
-                row_num = add_new_user(new_user_data)
+                row_num = await aadd_new_user(new_user_data)
                 logger.info(
                     f"Новий користувач автоматично додано в Google Sheets: рядок {row_num}"
                 )
@@ -3239,7 +3307,7 @@ async def sync_cache_handler(update: Update, context: ContextTypes.DEFAULT_TYPE)
     )
 
     try:
-        result = user_manager.sync_pending_users()
+        result = await user_manager.sync_pending_users()
 
         sync_message = (
             f"✅ *Синхронізація завершена!*\n\n"
@@ -3269,7 +3337,7 @@ async def cache_status_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     telegram_id = int(update.effective_user.id)
 
     try:
-        cache_info = user_manager.get_user_cache_info(telegram_id)
+        cache_info = await user_manager.get_user_cache_info(telegram_id)
 
         if cache_info.get("cached"):
             status_message = (
@@ -3306,9 +3374,7 @@ async def reset_registration_handler(
     context.user_data.pop("registration_step", None)
 
     # Видаляємо файл стану
-    from src.user_state_service import complete_registration
-
-    complete_registration(telegram_id)
+    await acomplete_registration(telegram_id)
 
     await update.message.reply_text(
         "🔄 *Реєстрацію скинуто.*\n\n"
@@ -0,0 +1,189 @@
+"""
+Фонове оновлення статусів поточних задач користувачів.
+Раз на ISSUE_STATUS_REFRESH_INTERVAL секунд поточні задачі всіх користувачів
+(bot_state.current_task_key) перевіряються пакетним JQL-пошуком, локальні
+стани узгоджуються з Jira, а сповіщення надсилається лише про справжню зміну
+статусу. Так користувач дізнається і про зміни, вебхук яких Jira не доставила.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, Optional
+
+from config.config import (
+    ISSUE_STATUS_REFRESH_ENABLED,
+    ISSUE_STATUS_REFRESH_INTERVAL,
+)
+from src.services import JiraApiError, find_issues_for_users
+from src.user_state_service import (
+    aclear_user_current_task_if,
+    alist_users_with_current_task,
+    aset_user_task_status,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class IssueStatusRefresher:
+    """Періодично звіряє статуси поточних задач з Jira і сповіщає про зміни"""
+
+    def __init__(self, interval: float = ISSUE_STATUS_REFRESH_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+        self.stats: Dict[str, Any] = {
+            "runs": 0,
+            "errors": 0,
+            "tasks_checked": 0,
+            "changes": 0,
+            "notified": 0,
+            "closed": 0,
+            "last_run_seconds": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(
+                self._refresh_loop(), name="issue-status-refresher"
+            )
+            logger.info(
+                f"Фонове оновлення статусів задач запущено (кожні {self.interval:.0f} с)"
+            )
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.refresh_once()
+            except Exception as e:
+                self.stats["errors"] += 1
+                logger.error(f"Помилка фонового оновлення статусів: {e}", exc_info=True)
+
+    async def refresh_once(self) -> int:
+        """
+        Звіряє поточні задачі всіх користувачів з Jira.
+
+        Returns:
+            int: Кількість задач, стан яких змінився
+        """
+        started = time.monotonic()
+        active_tasks = await alist_users_with_current_task()
+        if not active_tasks:
+            return 0
+
+        try:
+            user_issues = await find_issues_for_users(
+                [str(telegram_id) for telegram_id in active_tasks]
+            )
+        except JiraApiError as e:
+            self.stats["errors"] += 1
+            logger.warning(f"Фонове оновлення статусів пропущено: {e}")
+            return 0
+
+        changes = 0
+        for telegram_id, task in active_tasks.items():
+            issues = user_issues.get(str(telegram_id), {})
+            task_key = task["task_key"]
+            for bucket in ("open", "done"):
+                issue = next(
+                    (i for i in issues.get(bucket, []) if i["key"] == task_key), None
+                )
+                if issue is not None:
+                    self.stats["tasks_checked"] += 1
+                    if await self._reconcile(
+                        telegram_id, task_key, task["status"], issue, bucket == "done"
+                    ):
+                        changes += 1
+                    break
+
+        self.stats["runs"] += 1
+        self.stats["changes"] += changes
+        self.stats["last_run_seconds"] = round(time.monotonic() - started, 3)
+        if changes:
+            logger.info(f"🔄 Фонове оновлення: змінився стан {changes} задач")
+        return changes
+
+    async def _reconcile(
+        self,
+        telegram_id: int,
+        task_key: str,
+        known_status: Optional[str],
+        issue: Dict[str, str],
+        is_done: bool,
+    ) -> bool:
+        """Оновлює локальний стан і сповіщає користувача, якщо статус змінився"""
+        status = issue["status"]
+        if known_status is not None and known_status != status:
+            await self._notify(telegram_id, task_key, status)
+        elif not is_done:
+            if known_status is None:
+                # Перше спостереження: запам'ятовуємо статус без сповіщення
+                await aset_user_task_status(telegram_id, task_key, status)
+            return False
+
+        if is_done:
+            # Виконана задача більше не поточна (якщо користувач не встиг
+            # створити нову, поки йшов пошук у Jira)
+            if await aclear_user_current_task_if(telegram_id, task_key):
+                self.stats["closed"] += 1
+        else:
+            await aset_user_task_status(telegram_id, task_key, status)
+        return True
+
+    async def _notify(self, telegram_id: int, task_key: str, status: str) -> None:
+        from src.jira_webhooks2 import (
+            add_message_to_cache,
+            format_status_message,
+            is_duplicate_message,
+            send_telegram_message,
+        )
+
+        message = format_status_message(task_key, status)
+        # Вебхук про цю зміну міг прийти щойно - не дублюємо сповіщення
+        if is_duplicate_message(task_key, message):
+            return
+        add_message_to_cache(task_key, message)
+        if await send_telegram_message(str(telegram_id), message):
+            self.stats["notified"] += 1
+
+    async def close(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        logger.info("Фонове оновлення статусів задач зупинено")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан фонового оновлення для status endpoint"""
+        return {"interval": self.interval, **self.stats}
+
+
+# Глобальний екземпляр фонового оновлення
+_issue_status_refresher: Optional[IssueStatusRefresher] = None
+
+
+def get_issue_status_refresher() -> Optional[IssueStatusRefresher]:
+    """Повертає запущене фонове оновлення або None, якщо його вимкнено"""
+    return _issue_status_refresher
+
+
+async def start_issue_status_refresher() -> None:
+    """Запускає фонове оновлення статусів при старті бота"""
+    global _issue_status_refresher
+    if not ISSUE_STATUS_REFRESH_ENABLED or _issue_status_refresher is not None:
+        return
+    _issue_status_refresher = IssueStatusRefresher()
+    await _issue_status_refresher.start()
+
+
+async def close_issue_status_refresher() -> None:
+    """Зупиняє фонове оновлення при завершенні роботи"""
+    global _issue_status_refresher
+    if _issue_status_refresher is not None:
+        await _issue_status_refresher.close()
+        _issue_status_refresher = None
@@ -4,47 +4,114 @@
 """
 
 import asyncio
+import hashlib
 import logging
+import os
+import tempfile
 import httpx
-from typing import Optional
+from typing import BinaryIO, Optional
 from urllib.parse import quote
 
+from config.config import ATTACHMENT_SPOOL_DIR
+from src.jira_client import (
+    get_jira_client,
+    OPERATION_DOWNLOAD,
+    PRIORITY_BACKGROUND,
+)
+
 # Ініціалізуємо логування
 logger = logging.getLogger(__name__)
 
 
-async def download_file_from_jira(
-    urls: list[str], max_retries: int = 3, timeout: int = 90
-) -> bytes:
+# Розмір частини, якою тіло відповіді Jira переноситься у тимчасовий файл
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class AttachmentTooLargeError(RuntimeError):
+    """Вкладення більше за дозволений розмір - завантаження перервано"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Файл завеликий: {size} байт (ліміт {limit} байт)")
+        self.size = size
+        self.limit = limit
+
+
+class SpooledAttachment:
+    """Вкладення, завантажене у тимчасовий файл: файл, розмір і SHA-256 вмісту"""
+
+    def __init__(self, file: BinaryIO, size: int, sha256: str):
+        self.file = file
+        self.size = size
+        self.sha256 = sha256
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self) -> "SpooledAttachment":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def _open_spool() -> BinaryIO:
+    """Анонімний тимчасовий файл: зникає з диска після close() або падіння процесу"""
+    if ATTACHMENT_SPOOL_DIR:
+        os.makedirs(ATTACHMENT_SPOOL_DIR, exist_ok=True)
+    return tempfile.TemporaryFile(dir=ATTACHMENT_SPOOL_DIR or None)
+
+
+async def download_file_to_spool(
+    urls: list[str],
+    max_retries: int = 3,
+    timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None,
+) -> SpooledAttachment:
     """
-    Спробувати скачати байти файлу по переліку можливих URL із retry та повернути байти.
+    Потоково скачати файл по переліку можливих URL у тимчасовий файл на диску.
+    Тіло відповіді не тримається в пам'яті цілком, тож споживання RAM не залежить
+    від розміру вкладення, а файл можна відправити повторно (seek(0)).
     urls: список candidate URL у порядку пріоритету.
     max_retries: скільки разів спробувати кожен URL.
-    timeout: таймаут HTTP запиту в секундах.
+    timeout: таймаут HTTP запиту в секундах (None - таймаут завантаження з пулу Jira).
+    max_bytes: максимальний розмір файлу (None - без обмеження).
+
+    Returns:
+        SpooledAttachment: Тимчасовий файл (на початку), його розмір і SHA-256;
+        закрити його - обов'язок викликача (краще через with)
+
+    Raises:
+        AttachmentTooLargeError: Якщо файл більший за max_bytes
+        RuntimeError: Якщо файл не вдалося скачати з жодного URL
     """
-    from config.config import JIRA_EMAIL, JIRA_API_TOKEN
-
-    # Use basic auth credentials
-    auth = httpx.BasicAuth(JIRA_EMAIL, JIRA_API_TOKEN)
-
-    async with httpx.AsyncClient(
-        timeout=timeout, auth=auth, follow_redirects=True, trust_env=True
-    ) as client:
-        for url in urls:
-            # Видаляємо подвійні префікси
-            clean = url.replace("https://", "").replace("http://", "")
-            full = f"https://{clean}"
-            logger.info(f"Trying to download from URL: {full}")
-
-            for attempt in range(1, max_retries + 1):
-                try:
-                    logger.debug(
-                        f"Download attempt {attempt}/{max_retries} for URL: {full}"
-                    )
-                    resp = await client.get(
-                        full,
-                        headers={"Accept": "*/*", "User-Agent": "JiraWebhookBot/1.0"},
-                    )
+    jira_client = get_jira_client()
+    request_timeout = (
+        httpx.Timeout(timeout)
+        if timeout is not None
+        else jira_client.timeout_for(OPERATION_DOWNLOAD)
+    )
+
+    for url in urls:
+        # Видаляємо подвійні префікси
+        clean = url.replace("https://", "").replace("http://", "")
+        full = f"https://{clean}"
+        logger.info(f"Trying to download from URL: {full}")
+
+        for attempt in range(1, max_retries + 1):
+            spool = _open_spool()
+            downloaded = False
+            try:
+                logger.debug(
+                    f"Download attempt {attempt}/{max_retries} for URL: {full}"
+                )
+                async with jira_client.stream(
+                    "GET",
+                    full,
+                    timeout=request_timeout,
+                    follow_redirects=True,
+                    headers={"Accept": "*/*", "User-Agent": "JiraWebhookBot/1.0"},
+                    priority=PRIORITY_BACKGROUND,
+                ) as resp:
                     resp.raise_for_status()
 
                     # Check content type to make sure it's not an HTML error page
@@ -60,58 +127,95 @@ async def download_file_from_jira(
                         await asyncio.sleep(1)
                         continue
 
-                    content = resp.content
-                    if not content:
-                        logger.warning("Received empty file content")
-                        if attempt == max_retries:
-                            break
-                        await asyncio.sleep(1)
-                        continue
-
-                    # Double check for small content that might be an error message
-                    if len(content) < 100:  # If content is suspiciously small
-                        logger.warning(
-                            f"Downloaded content is suspiciously small ({len(content)} bytes)"
-                        )
-                        try:
-                            error_text = content.decode("utf-8")
-                            if (
-                                "error" in error_text.lower()
-                                or "unauthorized" in error_text.lower()
-                            ):
-                                logger.warning(
-                                    f"Received error message instead of file: {error_text}"
-                                )
-                                if attempt == max_retries:
-                                    break
-                                await asyncio.sleep(1)
-                                continue
-                        except UnicodeDecodeError:
-                            # If we can't decode as text, it's probably binary data which is fine
-                            pass
-
-                    logger.info(f"Successfully downloaded {len(content)} bytes")
-                    return content
-
-                except httpx.HTTPError as e:
-                    logger.warning(
-                        f"HTTP error while downloading from {full}: {str(e)}"
-                    )
+                    # Завеликий файл відкидаємо ще до завантаження тіла
+                    declared = resp.headers.get("content-length", "")
+                    if max_bytes and declared.isdigit() and int(declared) > max_bytes:
+                        raise AttachmentTooLargeError(int(declared), max_bytes)
+
+                    size = 0
+                    digest = hashlib.sha256()
+                    async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if max_bytes and size > max_bytes:
+                            raise AttachmentTooLargeError(size, max_bytes)
+                        spool.write(chunk)
+                        digest.update(chunk)
+
+                if not size:
+                    logger.warning("Received empty file content")
                     if attempt == max_retries:
                         break
                     await asyncio.sleep(1)
+                    continue
 
-                except Exception as e:
+                # Double check for small content that might be an error message
+                if size < 100:  # If content is suspiciously small
                     logger.warning(
-                        f"Unexpected error downloading from {full}: {str(e)}"
+                        f"Downloaded content is suspiciously small ({size} bytes)"
                     )
-                    if attempt == max_retries:
-                        break
-                    await asyncio.sleep(1)
+                    spool.seek(0)
+                    try:
+                        error_text = spool.read().decode("utf-8")
+                        if (
+                            "error" in error_text.lower()
+                            or "unauthorized" in error_text.lower()
+                        ):
+                            logger.warning(
+                                f"Received error message instead of file: {error_text}"
+                            )
+                            if attempt == max_retries:
+                                break
+                            await asyncio.sleep(1)
+                            continue
+                    except UnicodeDecodeError:
+                        # If we can't decode as text, it's probably binary data which is fine
+                        pass
+
+                logger.info(f"Successfully downloaded {size} bytes")
+                spool.seek(0)
+                downloaded = True
+                return SpooledAttachment(spool, size, digest.hexdigest())
+
+            except AttachmentTooLargeError:
+                raise
+
+            except httpx.HTTPError as e:
+                logger.warning(
+                    f"HTTP error while downloading from {full}: {str(e)}"
+                )
+                if attempt == max_retries:
+                    break
+                await asyncio.sleep(1)
+
+            except Exception as e:
+                logger.warning(
+                    f"Unexpected error downloading from {full}: {str(e)}"
+                )
+                if attempt == max_retries:
+                    break
+                await asyncio.sleep(1)
+
+            finally:
+                if not downloaded:
+                    spool.close()
+
+    # If we reach here, all URLs failed
+    logger.error(f"Failed to download file from any URL: {urls}")
+    raise RuntimeError(f"Не вдалося завантажити файл із жодного URL: {urls}")
 
-        # If we reach here, all URLs failed
-        logger.error(f"Failed to download file from any URL: {urls}")
-        raise RuntimeError(f"Не вдалося завантажити файл із жодного URL: {urls}")
+
+async def download_file_from_jira(
+    urls: list[str], max_retries: int = 3, timeout: Optional[float] = None
+) -> bytes:
+    """
+    Спробувати скачати байти файлу по переліку можливих URL із retry та повернути байти.
+    Для великих файлів краще download_file_to_spool - він не тримає файл у пам'яті.
+    urls: список candidate URL у порядку пріоритету.
+    max_retries: скільки разів спробувати кожен URL.
+    timeout: таймаут HTTP запиту в секундах (None - таймаут завантаження з пулу Jira).
+    """
+    with await download_file_to_spool(urls, max_retries, timeout) as spooled:
+        return spooled.file.read()
 
 
 def normalize_jira_domain(raw: str) -> str:
@@ -230,49 +334,45 @@ async def get_issue_attachments_by_filename(
     Returns:
         dict: дані вкладення або None, якщо не знайдено
     """
-    from config.config import JIRA_DOMAIN, JIRA_EMAIL, JIRA_API_TOKEN
+    from config.config import JIRA_DOMAIN
 
     try:
-        # Use basic auth credentials
-        auth = httpx.BasicAuth(JIRA_EMAIL, JIRA_API_TOKEN)
-
-        async with httpx.AsyncClient(
-            timeout=30, auth=auth, follow_redirects=True
-        ) as client:
-            # Отримуємо дані задачі з вкладеннями
-            url = f"https://{normalize_jira_domain(JIRA_DOMAIN)}/rest/api/3/issue/{issue_key}?fields=attachment"
-
-            logger.info(f"Запитуємо вкладення задачі {issue_key} через API")
-            resp = await client.get(url)
-            resp.raise_for_status()
-
-            issue_data = resp.json()
-            attachments = issue_data.get("fields", {}).get("attachment", [])
-
-            logger.info(f"Знайдено {len(attachments)} вкладень у задачі {issue_key}")
-
-            # Шукаємо вкладення за іменем файлу
-            for attachment in attachments:
-                att_filename = attachment.get("filename", "")
-                if att_filename == filename:
-                    logger.info(
-                        f"Знайдено відповідне вкладення: {att_filename} (ID: {attachment.get('id')})"
-                    )
-                    return attachment
-
-            # Якщо точна відповідність не знайдена, шукаємо частичну
-            for attachment in attachments:
-                att_filename = attachment.get("filename", "")
-                if filename in att_filename or att_filename in filename:
-                    logger.info(
-                        f"Знайдено схоже вкладення: {att_filename} (ID: {attachment.get('id')})"
-                    )
-                    return attachment
+        # Отримуємо дані задачі з вкладеннями
+        url = f"https://{normalize_jira_domain(JIRA_DOMAIN)}/rest/api/3/issue/{issue_key}?fields=attachment"
+
+        logger.info(f"Запитуємо вкладення задачі {issue_key} через API")
+        resp = await get_jira_client().request(
+            "GET", url, follow_redirects=True, priority=PRIORITY_BACKGROUND
+        )
+        resp.raise_for_status()
+
+        issue_data = resp.json()
+        attachments = issue_data.get("fields", {}).get("attachment", [])
+
+        logger.info(f"Знайдено {len(attachments)} вкладень у задачі {issue_key}")
+
+        # Шукаємо вкладення за іменем файлу
+        for attachment in attachments:
+            att_filename = attachment.get("filename", "")
+            if att_filename == filename:
+                logger.info(
+                    f"Знайдено відповідне вкладення: {att_filename} (ID: {attachment.get('id')})"
+                )
+                return attachment
+
+        # Якщо точна відповідність не знайдена, шукаємо частичну
+        for attachment in attachments:
+            att_filename = attachment.get("filename", "")
+            if filename in att_filename or att_filename in filename:
+                logger.info(
+                    f"Знайдено схоже вкладення: {att_filename} (ID: {attachment.get('id')})"
+                )
+                return attachment
 
-            logger.warning(
-                f"Не знайдено вкладення з іменем '{filename}' у задачі {issue_key}"
-            )
-            return None
+        logger.warning(
+            f"Не знайдено вкладення з іменем '{filename}' у задачі {issue_key}"
+        )
+        return None
 
     except Exception as e:
         logger.error(f"Помилка отримання вкладень задачі {issue_key}: {str(e)}")
@@ -0,0 +1,533 @@
+"""
+Спільний HTTP клієнт для Jira API.
+Один довгоживучий httpx.AsyncClient з пулом keep-alive з'єднань, який
+створюється при старті бота і закривається при завершенні роботи.
+Всі запити проходять через JiraRateGovernor, який тримає темп у межах
+квоти Jira Cloud і пропускає інтерактивні запити поперед фонових, та через
+JiraCircuitBreaker, який миттєво відхиляє запити, поки Jira недоступна.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+from config.config import (
+    JIRA_BASE_URL,
+    JIRA_EMAIL,
+    JIRA_API_TOKEN,
+    JIRA_HTTP_MAX_CONNECTIONS,
+    JIRA_HTTP_MAX_KEEPALIVE,
+    JIRA_HTTP_KEEPALIVE_EXPIRY,
+    JIRA_HTTP2_ENABLED,
+    JIRA_TIMEOUT_CONNECT,
+    JIRA_TIMEOUT_API,
+    JIRA_TIMEOUT_UPLOAD,
+    JIRA_TIMEOUT_DOWNLOAD,
+    JIRA_RATE_LIMIT_PER_SECOND,
+    JIRA_RATE_LIMIT_BURST,
+    JIRA_RATE_LIMIT_MAX_RETRIES,
+    JIRA_BREAKER_FAILURE_RATIO,
+    JIRA_BREAKER_MIN_REQUESTS,
+    JIRA_BREAKER_WINDOW,
+    JIRA_BREAKER_SLOW_CALL_SECONDS,
+    JIRA_BREAKER_COOLDOWN,
+)
+
+logger = logging.getLogger(__name__)
+
+# Типи операцій, для яких задаються окремі таймаути
+OPERATION_API = "api"
+OPERATION_UPLOAD = "upload"
+OPERATION_DOWNLOAD = "download"
+
+# Пріоритети запитів: дії користувача йдуть поперед фонових задач
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 1
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After: кількість секунд або HTTP-дата"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_rate_limit_reset(value: Optional[str]) -> Optional[float]:
+    """X-RateLimit-Reset у Jira Cloud - ISO 8601 час відновлення квоти"""
+    if not value:
+        return None
+    try:
+        reset_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return max(0.0, (reset_at - datetime.now(timezone.utc)).total_seconds())
+    except ValueError:
+        return None
+
+
+class JiraRateGovernor:
+    """
+    Token bucket для всіх запитів до Jira з пріоритетними чергами.
+
+    Швидкість адаптується (AIMD): відповідь 429 або X-RateLimit-NearLimit
+    вдвічі зменшує темп, успішні відповіді поступово повертають його до
+    налаштованого. Retry-After і вичерпаний X-RateLimit-Remaining ставлять
+    усі запити на паузу до вказаного часу.
+    """
+
+    def __init__(
+        self,
+        rate: float = JIRA_RATE_LIMIT_PER_SECOND,
+        burst: int = JIRA_RATE_LIMIT_BURST,
+    ):
+        self.max_rate = rate
+        self.min_rate = max(0.2, rate / 20)
+        self.rate = rate
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._waiting = {PRIORITY_INTERACTIVE: 0, PRIORITY_BACKGROUND: 0}
+        self.stats = {"throttled": 0, "rate_limited": 0}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def _higher_priority_waiting(self, priority: int) -> bool:
+        return any(
+            count > 0 for lane, count in self._waiting.items() if lane < priority
+        )
+
+    async def acquire(self, priority: int = PRIORITY_INTERACTIVE) -> None:
+        """Чекає на дозвіл виконати один запит"""
+        self._waiting[priority] = self._waiting.get(priority, 0) + 1
+        throttled = False
+        try:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                pause = self._paused_until - now
+                if (
+                    pause <= 0
+                    and self._tokens >= 1
+                    and not self._higher_priority_waiting(priority)
+                ):
+                    self._tokens -= 1
+                    return
+                if not throttled:
+                    throttled = True
+                    self.stats["throttled"] += 1
+                if pause > 0:
+                    delay = pause
+                elif self._tokens < 1:
+                    delay = (1 - self._tokens) / self.rate
+                else:
+                    # Токен є, але його чекає запит з вищим пріоритетом
+                    delay = 0.01
+                await asyncio.sleep(max(0.005, delay))
+        finally:
+            self._waiting[priority] -= 1
+
+    def pause(self, seconds: float) -> None:
+        """Зупиняє всі запити на вказаний час"""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def observe(self, response: httpx.Response, attempt: int = 0) -> Optional[float]:
+        """
+        Аналізує заголовки відповіді і коригує темп.
+
+        Returns:
+            Optional[float]: Пауза перед повтором, якщо запит варто повторити
+        """
+        headers = response.headers
+        retry_after = _parse_retry_after(headers.get("Retry-After"))
+
+        if response.status_code == 429 or (
+            response.status_code == 503 and retry_after is not None
+        ):
+            self.stats["rate_limited"] += 1
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after is None:
+                retry_after = min(60.0, 2**attempt) + random.uniform(0, 1)
+            self.pause(retry_after)
+            logger.warning(
+                f"Jira rate limit ({response.status_code}): пауза {retry_after:.1f} с, "
+                f"темп знижено до {self.rate:.2f} запитів/с"
+            )
+            return retry_after
+
+        remaining = headers.get("X-RateLimit-Remaining")
+        if remaining is not None and remaining.strip() == "0":
+            reset_in = _parse_rate_limit_reset(headers.get("X-RateLimit-Reset"))
+            if reset_in:
+                self.pause(reset_in)
+        if headers.get("X-RateLimit-NearLimit", "").lower() == "true":
+            self.rate = max(self.min_rate, self.rate / 2)
+        elif self.rate < self.max_rate:
+            # Поступово повертаємо темп після успішних відповідей
+            self.rate = min(self.max_rate, self.rate + self.max_rate / 20)
+        return None
+
+    def get_stats(self) -> Dict[str, float]:
+        """Стан обмежувача для моніторингу"""
+        return {
+            "rate": round(self.rate, 2),
+            "max_rate": self.max_rate,
+            "tokens": round(self._tokens, 2),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "waiting_interactive": self._waiting.get(PRIORITY_INTERACTIVE, 0),
+            "waiting_background": self._waiting.get(PRIORITY_BACKGROUND, 0),
+            **self.stats,
+        }
+
+
+class JiraCircuitOpenError(Exception):
+    """Jira вважається недоступною - запит відхилено без звернення до мережі"""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f"Jira circuit is open, retry in {retry_in:.0f}s")
+        self.retry_in = retry_in
+
+
+class JiraCircuitBreaker:
+    """
+    Запобіжник для Jira: рахує помилки і повільні відповіді у ковзному вікні
+    останніх запитів. Коли їх частка перевищує поріг, запобіжник розмикається
+    і всі запити одразу отримують JiraCircuitOpenError, не чекаючи таймаутів.
+    Перевірка відновлення (half-open) виконується фоновим пробним запитом.
+    """
+
+    STATE_CLOSED = "closed"
+    STATE_OPEN = "open"
+    STATE_HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_ratio: float = JIRA_BREAKER_FAILURE_RATIO,
+        min_requests: int = JIRA_BREAKER_MIN_REQUESTS,
+        window: int = JIRA_BREAKER_WINDOW,
+        slow_call_seconds: float = JIRA_BREAKER_SLOW_CALL_SECONDS,
+        cooldown: float = JIRA_BREAKER_COOLDOWN,
+    ):
+        self.failure_ratio = failure_ratio
+        self.min_requests = min_requests
+        self.slow_call_seconds = slow_call_seconds
+        self.cooldown = cooldown
+        self.max_cooldown = cooldown * 10
+        self.state = self.STATE_CLOSED
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._current_cooldown = cooldown
+        self._opened_at = 0.0
+        self._probe: Optional[Callable[[], Awaitable[bool]]] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        self.stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    @property
+    def is_closed(self) -> bool:
+        return self.state == self.STATE_CLOSED
+
+    def _retry_in(self) -> float:
+        return max(0.0, self._opened_at + self._current_cooldown - time.monotonic())
+
+    def set_probe(self, probe: Callable[[], Awaitable[bool]]) -> None:
+        """Задає пробний запит для перевірки відновлення Jira"""
+        self._probe = probe
+
+    def check(self) -> None:
+        """Кидає JiraCircuitOpenError, якщо запобіжник розімкнено"""
+        if self.is_closed:
+            return
+        self.stats["rejected"] += 1
+        raise JiraCircuitOpenError(self._retry_in())
+
+    def record(self, success: bool, latency: float) -> None:
+        """Фіксує результат запиту"""
+        if not self.is_closed:
+            return
+        self._outcomes.append(success and latency <= self.slow_call_seconds)
+        if len(self._outcomes) < self.min_requests:
+            return
+        failures = self._outcomes.count(False)
+        if failures / len(self._outcomes) >= self.failure_ratio:
+            self._open(
+                f"{failures}/{len(self._outcomes)} помилкових або повільних запитів"
+            )
+
+    def _open(self, reason: str) -> None:
+        self.state = self.STATE_OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.stats["opened"] += 1
+        logger.error(
+            f"🔌 Запобіжник Jira розімкнено ({reason}), перевірка через {self._current_cooldown:.0f} с"
+        )
+        if self._probe_task is None or self._probe_task.done():
+            self._probe_task = asyncio.create_task(
+                self._probe_loop(), name="jira-circuit-probe"
+            )
+
+    def _close(self) -> None:
+        self.state = self.STATE_CLOSED
+        self._current_cooldown = self.cooldown
+        self._outcomes.clear()
+        logger.info("🔌 Запобіжник Jira замкнено - Jira знову доступна")
+
+    async def _probe_loop(self) -> None:
+        while not self.is_closed:
+            await asyncio.sleep(self._current_cooldown)
+            self.state = self.STATE_HALF_OPEN
+            self.stats["probes"] += 1
+            try:
+                healthy = self._probe is not None and await self._probe()
+            except Exception as e:
+                logger.warning(f"Пробний запит до Jira невдалий: {e}")
+                healthy = False
+            if healthy:
+                self._close()
+            else:
+                # Jira ще недоступна - збільшуємо інтервал перевірки
+                self.state = self.STATE_OPEN
+                self._opened_at = time.monotonic()
+                self._current_cooldown = min(
+                    self.max_cooldown, self._current_cooldown * 2
+                )
+
+    async def stop(self) -> None:
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            await asyncio.gather(self._probe_task, return_exceptions=True)
+            self._probe_task = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан запобіжника для status endpoint"""
+        window = len(self._outcomes)
+        return {
+            "state": self.state,
+            "failure_ratio": (
+                round(self._outcomes.count(False) / window, 2) if window else 0.0
+            ),
+            "window": window,
+            "retry_in": 0.0 if self.is_closed else round(self._retry_in(), 1),
+            **self.stats,
+        }
+
+
+class JiraHttpClient:
+    """Обгортка над httpx.AsyncClient з пулом з'єднань для всіх запитів до Jira"""
+
+    def __init__(
+        self,
+        max_connections: int = JIRA_HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = JIRA_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = JIRA_HTTP_KEEPALIVE_EXPIRY,
+        http2: bool = JIRA_HTTP2_ENABLED,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.timeouts: Dict[str, httpx.Timeout] = {
+            OPERATION_API: httpx.Timeout(JIRA_TIMEOUT_API, connect=JIRA_TIMEOUT_CONNECT),
+            OPERATION_UPLOAD: httpx.Timeout(
+                JIRA_TIMEOUT_UPLOAD, connect=JIRA_TIMEOUT_CONNECT
+            ),
+            OPERATION_DOWNLOAD: httpx.Timeout(
+                JIRA_TIMEOUT_DOWNLOAD, connect=JIRA_TIMEOUT_CONNECT
+            ),
+        }
+        self._client: Optional[httpx.AsyncClient] = None
+        self.governor = JiraRateGovernor()
+        self.max_rate_limit_retries = JIRA_RATE_LIMIT_MAX_RETRIES
+        self.breaker = JiraCircuitBreaker()
+        self.breaker.set_probe(self._probe)
+
+    def _build_client(self) -> httpx.AsyncClient:
+        """Створює httpx клієнт; якщо пакет h2 відсутній - працюємо через HTTP/1.1"""
+        options = {
+            "auth": httpx.BasicAuth(JIRA_EMAIL, JIRA_API_TOKEN),
+            "limits": self.limits,
+            "timeout": self.timeouts[OPERATION_API],
+            "trust_env": True,
+        }
+        if self.http2:
+            try:
+                return httpx.AsyncClient(http2=True, **options)
+            except ImportError:
+                logger.warning(
+                    "HTTP/2 для Jira увімкнено, але пакет h2 не встановлено - використовуємо HTTP/1.1"
+                )
+                self.http2 = False
+        return httpx.AsyncClient(**options)
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Повертає відкритий httpx клієнт, створюючи його за потреби"""
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+            logger.info(
+                f"Створено пул з'єднань Jira (max={self.limits.max_connections}, "
+                f"keepalive={self.limits.max_keepalive_connections}, http2={self.http2})"
+            )
+        return self._client
+
+    def timeout_for(self, operation: str) -> httpx.Timeout:
+        """Повертає таймаут для типу операції (api, upload, download)"""
+        return self.timeouts.get(operation, self.timeouts[OPERATION_API])
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        operation: str = OPERATION_API,
+        priority: int = PRIORITY_INTERACTIVE,
+        **kwargs,
+    ) -> httpx.Response:
+        """
+        Виконує запит через спільний пул з'єднань з урахуванням квоти Jira.
+        На 429 (і 503 з Retry-After) запит повторюється після паузи.
+
+        Args:
+            method: HTTP метод
+            url: Повний URL запиту
+            operation: Тип операції для вибору таймауту
+            priority: PRIORITY_INTERACTIVE або PRIORITY_BACKGROUND
+            **kwargs: Додаткові параметри httpx (json, params, headers, files...)
+
+        Returns:
+            httpx.Response: Відповідь сервера (без перевірки статусу)
+
+        Raises:
+            JiraCircuitOpenError: Якщо Jira зараз вважається недоступною
+        """
+        kwargs.setdefault("timeout", self.timeout_for(operation))
+        attempt = 0
+        while True:
+            self.breaker.check()
+            await self.governor.acquire(priority)
+            response = await self._send(method, url, **kwargs)
+            retry_after = self.governor.observe(response, attempt)
+            if retry_after is None or attempt >= self.max_rate_limit_retries:
+                return response
+            attempt += 1
+            logger.info(
+                f"Повтор {attempt}/{self.max_rate_limit_retries} запиту {method} {url} "
+                f"через {retry_after:.1f} с"
+            )
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        url: str,
+        operation: str = OPERATION_DOWNLOAD,
+        priority: int = PRIORITY_BACKGROUND,
+        **kwargs,
+    ) -> AsyncIterator[httpx.Response]:
+        """
+        Потоковий запит: тіло відповіді не читається в пам'ять, а віддається
+        частинами через response.aiter_bytes(). Квота, запобіжник і повтори
+        на 429 працюють так само, як у request().
+
+        Raises:
+            JiraCircuitOpenError: Якщо Jira зараз вважається недоступною
+        """
+        kwargs.setdefault("timeout", self.timeout_for(operation))
+        attempt = 0
+        while True:
+            self.breaker.check()
+            await self.governor.acquire(priority)
+            async with AsyncExitStack() as stack:
+                started = time.monotonic()
+                try:
+                    response = await stack.enter_async_context(
+                        self.client.stream(method, url, **kwargs)
+                    )
+                except httpx.TransportError:
+                    self.breaker.record(False, time.monotonic() - started)
+                    raise
+                self.breaker.record(
+                    response.status_code < 500, time.monotonic() - started
+                )
+                retry_after = self.governor.observe(response, attempt)
+                if retry_after is None or attempt >= self.max_rate_limit_retries:
+                    yield response
+                    return
+            attempt += 1
+            logger.info(
+                f"Повтор {attempt}/{self.max_rate_limit_retries} запиту {method} {url} "
+                f"через {retry_after:.1f} с"
+            )
+
+    async def _send(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """Виконує HTTP запит і повідомляє запобіжнику результат і затримку"""
+        started = time.monotonic()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.TransportError:
+            self.breaker.record(False, time.monotonic() - started)
+            raise
+        self.breaker.record(response.status_code < 500, time.monotonic() - started)
+        return response
+
+    async def _probe(self) -> bool:
+        """Пробний запит для перевірки відновлення Jira (в обхід запобіжника)"""
+        await self.governor.acquire(PRIORITY_BACKGROUND)
+        response = await self.client.get(
+            f"{JIRA_BASE_URL}/rest/api/3/serverInfo",
+            timeout=self.timeout_for(OPERATION_API),
+        )
+        return response.status_code < 500
+
+    async def aclose(self) -> None:
+        """Закриває всі з'єднання пулу"""
+        await self.breaker.stop()
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Пул з'єднань Jira закрито")
+        self._client = None
+
+
+# Глобальний екземпляр клієнта
+_jira_client: Optional[JiraHttpClient] = None
+
+
+def get_jira_client() -> JiraHttpClient:
+    """Повертає глобальний Jira клієнт (створює його при першому зверненні)"""
+    global _jira_client
+    if _jira_client is None:
+        _jira_client = JiraHttpClient()
+    return _jira_client
+
+
+async def init_jira_client() -> JiraHttpClient:
+    """Ініціалізує глобальний Jira клієнт при старті бота"""
+    jira_client = get_jira_client()
+    _ = jira_client.client  # Відкриваємо пул заздалегідь
+    return jira_client
+
+
+async def close_jira_client() -> None:
+    """Закриває глобальний Jira клієнт при завершенні роботи"""
+    global _jira_client
+    if _jira_client is not None:
+        await _jira_client.aclose()
+        _jira_client = None
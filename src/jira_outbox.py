@@ -0,0 +1,641 @@
+"""
+Черга записів у Jira на диску (SQLite у режимі WAL).
+Коментарі, файли і нові задачі спершу зберігаються локально разом із вмістом
+файлів, користувач одразу отримує підтвердження, а фоновий доставник
+відправляє записи в Jira: по черзі в межах задачі, паралельно між задачами.
+Кожен запис має ключ ідемпотентності, тому повтор після таймауту не
+створює дубль коментаря чи задачі.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from config.config import (
+    JIRA_OUTBOX_ENABLED,
+    JIRA_OUTBOX_PATH,
+    JIRA_OUTBOX_FILES_DIR,
+    JIRA_OUTBOX_CONCURRENCY,
+    JIRA_OUTBOX_RETRY_BASE,
+    JIRA_OUTBOX_RETRY_MAX,
+    JIRA_OUTBOX_MAX_AGE_HOURS,
+)
+from src.services import (
+    add_comment_to_jira,
+    add_file_reference_comment,
+    attach_file_to_jira,
+    create_jira_issue,
+    find_attachment_by_name,
+    find_comment_by_idempotency_key,
+    find_issue_by_idempotency_key,
+    is_retryable_jira_error,
+)
+
+logger = logging.getLogger(__name__)
+
+KIND_COMMENT = "comment"
+KIND_FILE_COMMENT = "file_comment"
+KIND_CREATE_ISSUE = "create_issue"
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+# Допуск на розбіжність годинників бота і Jira при пошуку вкладення
+_CLOCK_SKEW = 120.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jira_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    kind TEXT NOT NULL,
+    ordering_key TEXT NOT NULL,
+    telegram_id TEXT,
+    payload TEXT NOT NULL,
+    file_path TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jira_outbox_status ON jira_outbox (status, id);
+"""
+
+OutboxHandler = Callable[["JiraOutbox", Dict[str, Any]], Awaitable[None]]
+
+
+def _safe_filename(filename: str) -> str:
+    return re.sub(r"[^\w.\-]+", "_", filename)[-100:] or "file"
+
+
+class JiraOutbox:
+    """Черга записів у Jira з фоновою доставкою і повторами"""
+
+    def __init__(
+        self,
+        path: str = JIRA_OUTBOX_PATH,
+        files_dir: str = JIRA_OUTBOX_FILES_DIR,
+        concurrency: int = JIRA_OUTBOX_CONCURRENCY,
+        retry_base: float = JIRA_OUTBOX_RETRY_BASE,
+        retry_max: float = JIRA_OUTBOX_RETRY_MAX,
+        max_age_hours: float = JIRA_OUTBOX_MAX_AGE_HOURS,
+    ):
+        self.path = path
+        self.files_dir = files_dir
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.max_age_seconds = max_age_hours * 3600
+        # Один потік - одне з'єднання SQLite, всі записи послідовні
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        self._wakeup: Optional[asyncio.Event] = None
+        self._drainer: Optional[asyncio.Task] = None
+        # Ключ впорядкування -> задача, що зараз доставляє його записи
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._handlers: Dict[str, OutboxHandler] = {
+            KIND_COMMENT: _deliver_comment,
+            KIND_FILE_COMMENT: _deliver_file_comment,
+            KIND_CREATE_ISSUE: _deliver_issue,
+        }
+        self._pending = 0
+        self.stats = {
+            "enqueued": 0,
+            "delivered": 0,
+            "retried": 0,
+            "deduplicated": 0,
+            "failed": 0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._drainer is not None
+
+    # --- Синхронна частина (виконується в потоці черги) ---
+
+    def _open(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        os.makedirs(self.files_dir, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        cutoff = time.time() - self.max_age_seconds
+        self._conn.execute(
+            "DELETE FROM jira_outbox WHERE status != ? AND finished_at < ?",
+            (STATUS_PENDING, cutoff),
+        )
+        self._conn.commit()
+
+    def _insert(self, row: Dict[str, Any], content: Optional[bytes]) -> int:
+        assert self._conn is not None
+        if content is not None:
+            # Файл пишемо до запису в базу: запис без файлу доставити неможливо
+            with open(row["file_path"], "wb") as f:
+                f.write(content)
+                f.flush()
+                os.fsync(f.fileno())
+        with self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO jira_outbox (idempotency_key, kind, ordering_key, "
+                "telegram_id, payload, file_path, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    row["idempotency_key"],
+                    row["kind"],
+                    row["ordering_key"],
+                    row["telegram_id"],
+                    json.dumps(row["payload"], ensure_ascii=False),
+                    row["file_path"],
+                    row["created_at"],
+                    row["created_at"],
+                ),
+            )
+        return int(cursor.lastrowid or 0)
+
+    def _load_pending(self) -> List[Dict[str, Any]]:
+        assert self._conn is not None
+        rows = self._conn.execute(
+            "SELECT id, idempotency_key, kind, ordering_key, telegram_id, payload, "
+            "file_path, attempts, next_attempt_at, created_at FROM jira_outbox "
+            "WHERE status = ? ORDER BY id",
+            (STATUS_PENDING,),
+        ).fetchall()
+        columns = (
+            "id",
+            "idempotency_key",
+            "kind",
+            "ordering_key",
+            "telegram_id",
+            "payload",
+            "file_path",
+            "attempts",
+            "next_attempt_at",
+            "created_at",
+        )
+        entries = []
+        for row in rows:
+            entry = dict(zip(columns, row))
+            entry["payload"] = json.loads(entry["payload"])
+            entries.append(entry)
+        return entries
+
+    def _execute(self, sql: str, args: tuple) -> None:
+        assert self._conn is not None
+        with self._conn:
+            self._conn.execute(sql, args)
+
+    def _finish(self, entry: Dict[str, Any], status: str, error: str) -> None:
+        self._execute(
+            "UPDATE jira_outbox SET status = ?, last_error = ?, finished_at = ? "
+            "WHERE id = ?",
+            (status, error or None, time.time(), entry["id"]),
+        )
+        if entry["file_path"] and os.path.exists(entry["file_path"]):
+            os.remove(entry["file_path"])
+
+    # --- Асинхронний інтерфейс ---
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor, func, *args
+        )
+
+    async def open(self) -> None:
+        """Відкриває базу і запускає фонову доставку"""
+        if self._drainer is not None:
+            return
+        await self._run(self._open)
+        self._wakeup = asyncio.Event()
+        self._wakeup.set()  # одразу доставляємо те, що лишилось з минулого запуску
+        self._drainer = asyncio.create_task(self._drain_loop(), name="jira-outbox")
+        logger.info(f"Черга записів Jira відкрита: {self.path}")
+
+    async def enqueue(
+        self,
+        kind: str,
+        ordering_key: str,
+        payload: Dict[str, Any],
+        telegram_id: Optional[str] = None,
+        filename: Optional[str] = None,
+        content: Optional[bytes] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> str:
+        """
+        Зберігає запис на диску і будить доставника.
+
+        Args:
+            kind: Тип запису (KIND_COMMENT, KIND_FILE_COMMENT, KIND_CREATE_ISSUE)
+            ordering_key: Записи з однаковим ключем доставляються строго по черзі
+            payload: Параметри запису (JSON-серіалізовні)
+            telegram_id: Користувач, якого повідомити про результат
+            filename: Назва файлу для KIND_FILE_COMMENT
+            content: Вміст файлу
+            idempotency_key: Ключ уже зробленої прямої спроби (None - новий)
+
+        Returns:
+            str: Ключ ідемпотентності запису
+        """
+        if self._wakeup is None:
+            raise RuntimeError("Jira outbox is not open")
+        idempotency_key = idempotency_key or uuid.uuid4().hex
+        file_path = None
+        if content is not None:
+            file_path = os.path.join(
+                self.files_dir, f"{idempotency_key}_{_safe_filename(filename or '')}"
+            )
+        row = {
+            "idempotency_key": idempotency_key,
+            "kind": kind,
+            "ordering_key": ordering_key,
+            "telegram_id": telegram_id,
+            "payload": payload,
+            "file_path": file_path,
+            "created_at": time.time(),
+        }
+        await self._run(self._insert, row, content)
+        self.stats["enqueued"] += 1
+        self._pending += 1
+        self._wakeup.set()
+        logger.info(f"📮 Запис {kind} для {ordering_key} додано до черги Jira")
+        return idempotency_key
+
+    async def enqueue_comment(
+        self,
+        issue_key: str,
+        comment: str,
+        author_name: Optional[str] = None,
+        telegram_id: Optional[str] = None,
+    ) -> str:
+        """Ставить в чергу коментар до задачі"""
+        return await self.enqueue(
+            KIND_COMMENT,
+            issue_key,
+            {"issue_key": issue_key, "comment": comment, "author_name": author_name},
+            telegram_id=telegram_id,
+        )
+
+    async def enqueue_file_comment(
+        self,
+        issue_key: str,
+        filename: str,
+        content: bytes,
+        comment: str = "",
+        author_name: Optional[str] = None,
+        telegram_id: Optional[str] = None,
+    ) -> str:
+        """Ставить в чергу вкладення з коментарем-посиланням на нього"""
+        return await self.enqueue(
+            KIND_FILE_COMMENT,
+            issue_key,
+            {
+                "issue_key": issue_key,
+                "comment": comment,
+                "author_name": author_name,
+                "filename": filename,
+                "size": len(content),
+            },
+            telegram_id=telegram_id,
+            filename=filename,
+            content=bytes(content),
+        )
+
+    async def enqueue_issue(
+        self,
+        fields: Dict[str, Any],
+        telegram_id: str,
+        filename: Optional[str] = None,
+        content: Optional[bytes] = None,
+        idempotency_key: Optional[str] = None,
+    ) -> str:
+        """
+        Ставить в чергу створення задачі (ключ задачі надійде користувачу
+        повідомленням). Опціональний файл прикріплюється після створення.
+        idempotency_key - ключ, з яким задачу вже пробували створити напряму.
+        """
+        payload: Dict[str, Any] = {"fields": fields}
+        if content is not None:
+            payload.update(filename=filename, size=len(content))
+            content = bytes(content)
+        return await self.enqueue(
+            KIND_CREATE_ISSUE,
+            f"create:{telegram_id}",
+            payload,
+            telegram_id=telegram_id,
+            filename=filename,
+            content=content,
+            idempotency_key=idempotency_key,
+        )
+
+    async def update_payload(self, entry: Dict[str, Any]) -> None:
+        """Зберігає проміжний стан запису (наприклад, ID вже завантаженого файлу)"""
+        await self._run(
+            self._execute,
+            "UPDATE jira_outbox SET payload = ? WHERE id = ?",
+            (json.dumps(entry["payload"], ensure_ascii=False), entry["id"]),
+        )
+
+    async def read_file(self, entry: Dict[str, Any]) -> bytes:
+        """Читає збережений вміст файлу запису"""
+
+        def _read() -> bytes:
+            with open(entry["file_path"], "rb") as f:
+                return f.read()
+
+        return await asyncio.get_running_loop().run_in_executor(None, _read)
+
+    async def _drain_loop(self) -> None:
+        assert self._wakeup is not None
+        while True:
+            self._wakeup.clear()
+            try:
+                delay = await self._drain_once()
+            except Exception as e:
+                logger.error(f"Помилка доставки черги Jira: {e}", exc_info=True)
+                delay = self.retry_base
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _drain_once(self) -> Optional[float]:
+        """
+        Доставляє всі записи, час яких настав.
+
+        Returns:
+            Optional[float]: Через скільки секунд є наступний повтор (None - немає)
+        """
+        entries = await self._run(self._load_pending)
+        self._pending = len(entries)
+        groups: Dict[str, List[Dict[str, Any]]] = {}
+        for entry in entries:
+            groups.setdefault(entry["ordering_key"], []).append(entry)
+
+        # Кожен ключ доставляється окремою задачею: повільна задача Jira не
+        # затримує інші. Ключі, що вже доставляються, пропускаємо - їхня
+        # задача по завершенню знову розбудить доставника.
+        now = time.time()
+        waits = []
+        for ordering_key, group in groups.items():
+            if ordering_key in self._inflight:
+                continue
+            if group[0]["next_attempt_at"] > now:
+                waits.append(group[0]["next_attempt_at"] - now)
+                continue
+            task = asyncio.create_task(
+                self._drain_group(group), name=f"jira-outbox:{ordering_key}"
+            )
+            self._inflight[ordering_key] = task
+            task.add_done_callback(
+                lambda t, key=ordering_key: self._group_done(key, t)
+            )
+        return max(0.0, min(waits)) if waits else None
+
+    def _group_done(self, ordering_key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(ordering_key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(
+                f"Помилка доставки черги Jira для {ordering_key}: {task.exception()}"
+            )
+        # Час наступних повторів змінився - перераховуємо з бази
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _drain_group(self, group: List[Dict[str, Any]]) -> None:
+        """Доставляє записи однієї задачі по черзі, зупиняючись на першому повторі"""
+        async with self._semaphore:
+            for entry in group:
+                if not await self._deliver(entry):
+                    return
+
+    async def _deliver(self, entry: Dict[str, Any]) -> bool:
+        """Returns: False, якщо запис відкладено на повтор (наступні мають чекати)"""
+        handler = self._handlers[entry["kind"]]
+        try:
+            await handler(self, entry)
+        except Exception as e:
+            age = time.time() - entry["created_at"]
+            if is_retryable_jira_error(e) and age < self.max_age_seconds:
+                await self._schedule_retry(entry, e)
+                return False
+            logger.error(
+                f"❌ Запис {entry['kind']} для {entry['ordering_key']} не доставлено: {e}"
+            )
+            self.stats["failed"] += 1
+            await self._run(self._finish, entry, STATUS_FAILED, str(e))
+            await _notify_failure(entry)
+            return True
+
+        self.stats["delivered"] += 1
+        await self._run(self._finish, entry, STATUS_DONE, "")
+        return True
+
+    async def _schedule_retry(self, entry: Dict[str, Any], error: Exception) -> None:
+        attempts = entry["attempts"] + 1
+        delay = min(self.retry_max, self.retry_base * (2 ** (attempts - 1)))
+        delay *= random.uniform(0.8, 1.2)
+        self.stats["retried"] += 1
+        logger.warning(
+            f"⏳ Запис {entry['kind']} для {entry['ordering_key']} відкладено на "
+            f"{delay:.0f} с (спроба {attempts}): {error}"
+        )
+        await self._run(
+            self._execute,
+            "UPDATE jira_outbox SET attempts = ?, next_attempt_at = ?, last_error = ? "
+            "WHERE id = ?",
+            (attempts, time.time() + delay, str(error), entry["id"]),
+        )
+
+    async def close(self) -> None:
+        """Зупиняє доставку і закриває базу (недоставлені записи лишаються на диску)"""
+        if self._drainer is None:
+            return
+        self._drainer.cancel()
+        inflight = list(self._inflight.values())
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(self._drainer, *inflight, return_exceptions=True)
+        self._drainer = None
+        if self._conn is not None:
+            await self._run(self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+        logger.info("Черга записів Jira закрита")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан черги для status endpoint"""
+        return {
+            "path": self.path,
+            "pending": self._pending,
+            "in_flight": len(self._inflight),
+            **self.stats,
+        }
+
+
+# --- Доставка записів ---
+
+
+async def _deliver_comment(outbox: JiraOutbox, entry: Dict[str, Any]) -> None:
+    payload = entry["payload"]
+    key = entry["idempotency_key"]
+    if entry["attempts"] and await find_comment_by_idempotency_key(
+        payload["issue_key"], key
+    ):
+        outbox.stats["deduplicated"] += 1
+        return
+    await add_comment_to_jira(
+        payload["issue_key"], payload["comment"], payload["author_name"], key
+    )
+
+
+async def _deliver_file_comment(outbox: JiraOutbox, entry: Dict[str, Any]) -> None:
+    payload = entry["payload"]
+    issue_key = payload["issue_key"]
+    key = entry["idempotency_key"]
+
+    # Етап 1: вкладення (ID зберігаємо, щоб повтор не завантажував файл вдруге)
+    if not payload.get("attachment_id"):
+        attachment_id = None
+        if entry["attempts"]:
+            attachment_id = await find_attachment_by_name(
+                issue_key,
+                payload["filename"],
+                payload["size"],
+                entry["created_at"] - _CLOCK_SKEW,
+            )
+        if attachment_id is None:
+            content = await outbox.read_file(entry)
+            response = await attach_file_to_jira(issue_key, payload["filename"], content)
+            attachment_id = response[0]["id"] if response else None
+        payload["attachment_id"] = attachment_id
+        await outbox.update_payload(entry)
+
+    # Етап 2: коментар з посиланням на вкладення
+    if entry["attempts"] and await find_comment_by_idempotency_key(issue_key, key):
+        outbox.stats["deduplicated"] += 1
+        return
+    await add_file_reference_comment(
+        issue_key,
+        payload["comment"],
+        payload["author_name"],
+        payload["filename"],
+        payload["attachment_id"],
+        key,
+    )
+
+
+async def _deliver_issue(outbox: JiraOutbox, entry: Dict[str, Any]) -> None:
+    payload = entry["payload"]
+    telegram_id = entry["telegram_id"]
+    key = entry["idempotency_key"]
+
+    # Етап 1: задача (ключ зберігаємо, щоб повтор етапу 2 не створив її вдруге).
+    # Шукаємо задачу навіть на першій спробі: з тим самим ключем її вже
+    # пробували створити напряму, і Jira могла зберегти її до таймауту.
+    if not payload.get("issue_key"):
+        issue_key = await find_issue_by_idempotency_key(telegram_id, key)
+        if issue_key:
+            outbox.stats["deduplicated"] += 1
+        else:
+            issue_key = await create_jira_issue(dict(payload["fields"]), key)
+        payload["issue_key"] = issue_key
+        await outbox.update_payload(entry)
+
+        from src.user_state_service import aset_user_current_task
+
+        await aset_user_current_task(int(telegram_id), issue_key)
+        await _notify(
+            telegram_id,
+            f"✅ Задачу {issue_key} створено.\n"
+            "Тепер ви можете писати коментарі - вони автоматично додаватимуться до неї.",
+        )
+
+    # Етап 2: фото, прикладене під час створення задачі
+    if entry["file_path"]:
+        issue_key = payload["issue_key"]
+        if entry["attempts"] and await find_attachment_by_name(
+            issue_key,
+            payload["filename"],
+            payload["size"],
+            entry["created_at"] - _CLOCK_SKEW,
+        ):
+            return
+        try:
+            content = await outbox.read_file(entry)
+            await attach_file_to_jira(issue_key, payload["filename"], content)
+        except Exception as e:
+            if is_retryable_jira_error(e):
+                raise
+            # Як і при прямому створенні: задача є, фото можна додати коментарем
+            logger.error(f"Помилка прикріплення фото до задачі {issue_key}: {e}")
+
+
+async def _notify(telegram_id: Optional[str], text: str) -> None:
+    """Повідомляє користувача про результат відкладеного запису"""
+    if not telegram_id:
+        return
+    from src.telegram_client import get_telegram_client
+
+    try:
+        await get_telegram_client().call(
+            "sendMessage", json={"chat_id": int(telegram_id), "text": text}
+        )
+    except Exception as e:
+        logger.warning(f"Не вдалося повідомити {telegram_id} про запис у Jira: {e}")
+
+
+async def _notify_failure(entry: Dict[str, Any]) -> None:
+    payload = entry["payload"]
+    if entry["kind"] == KIND_CREATE_ISSUE:
+        text = "❌ Не вдалося створити задачу в Jira. Будь ласка, спробуйте ще раз."
+    elif entry["kind"] == KIND_FILE_COMMENT:
+        text = (
+            f"❌ Файл '{payload['filename']}' не вдалося додати до задачі "
+            f"{payload['issue_key']}. Будь ласка, надішліть його ще раз."
+        )
+    else:
+        text = (
+            f"❌ Коментар не вдалося додати до задачі {payload['issue_key']}:\n"
+            f"{payload['comment'][:200]}"
+        )
+    await _notify(entry["telegram_id"], text)
+
+
+# Глобальна черга записів
+_jira_outbox: Optional[JiraOutbox] = None
+
+
+def get_jira_outbox() -> Optional[JiraOutbox]:
+    """Повертає відкриту глобальну чергу або None, якщо її вимкнено чи не відкрито"""
+    if _jira_outbox is None or not _jira_outbox.running:
+        return None
+    return _jira_outbox
+
+
+async def start_jira_outbox() -> None:
+    """Відкриває глобальну чергу при старті бота"""
+    global _jira_outbox
+    if not JIRA_OUTBOX_ENABLED or _jira_outbox is not None:
+        return
+    _jira_outbox = JiraOutbox()
+    await _jira_outbox.open()
+
+
+async def close_jira_outbox() -> None:
+    """Закриває глобальну чергу при завершенні роботи"""
+    global _jira_outbox
+    if _jira_outbox is not None:
+        await _jira_outbox.close()
+        _jira_outbox = None
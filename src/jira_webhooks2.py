@@ -2,7 +2,7 @@ import json
 import logging
 import asyncio
 import traceback
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Awaitable, BinaryIO, Callable, Dict, Any, Optional, List, Tuple, Union
 import re
 import urllib.parse
 import time
@@ -20,22 +20,49 @@ parent_dir = os.path.dirname(current_dir)
 sys.path.insert(0, parent_dir)
 
 from config.config import (  # noqa: E402
+    ATTACHMENT_MAX_SIZE_MB,
+    ATTACHMENT_MEDIA_GROUPS_ENABLED,
     JIRA_DOMAIN,
-    JIRA_API_TOKEN,
-    JIRA_EMAIL,
-    TELEGRAM_TOKEN,
     WEBHOOK_RATE_LIMIT_ENABLED,
     WEBHOOK_RATE_LIMIT_MAX_REQUESTS,
     WEBHOOK_RATE_LIMIT_WINDOW,
     WEBHOOK_RATE_LIMIT_BLACKLIST_DURATION,
     WEBHOOK_IP_WHITELIST_ENABLED,
     WEBHOOK_IP_WHITELIST_CUSTOM,
+    WEBHOOK_QUEUE_RETRY_AFTER,
+)
+from src.services import (  # noqa: E402
+    find_user_by_jira_issue_key,
+    get_create_meta_stats,
+    get_issue_creation_stats,
+    update_issue_cache_from_webhook,
+)
+from src.jira_client import get_jira_client, PRIORITY_BACKGROUND  # noqa: E402
+from src.jira_outbox import get_jira_outbox  # noqa: E402
+from src.issue_status_refresher import get_issue_status_refresher  # noqa: E402
+from src.telegram_client import PRIORITY_BULK, get_telegram_client  # noqa: E402
+from src.webhook_dispatcher import get_webhook_dispatcher  # noqa: E402
+from src.webhook_spool import get_webhook_spool  # noqa: E402
+from src.user_state_service import (  # noqa: E402
+    aset_user_task_status,
+    user_state_manager,
 )
-from src.services import find_user_by_jira_issue_key  # noqa: E402
 from src.fixed_issue_formatter import format_issue_info, format_issue_text  # noqa: E402
+from src.attachment_processor import (  # noqa: E402
+    deliver_attachments,
+    get_attachment_pipeline_stats,
+)
 from src.jira_attachment_utils import (  # noqa: E402
+    AttachmentTooLargeError,
+    SpooledAttachment,
     build_attachment_urls,
-    download_file_from_jira,
+    download_file_to_spool,
+)
+from src.telegram_file_cache import (  # noqa: E402
+    SEND_METHODS,
+    CachedTelegramFile,
+    extract_file_ref,
+    get_telegram_file_cache,
 )
 
 # Ініціалізуємо логування з ротацією для вебхуків
@@ -303,6 +330,17 @@ EVENT_WORKLOG_DELETED = "worklog_deleted"
 EVENT_USER_CREATED = "user_created"
 EVENT_USER_UPDATED = "user_updated"
 
+# Інформаційні події: логуємо, але не обробляємо
+INFO_EVENTS = [
+    EVENT_ISSUE_PROPERTY_SET,
+    EVENT_ISSUELINK_CREATED,
+    EVENT_WORKLOG_CREATED,
+    EVENT_WORKLOG_UPDATED,
+    EVENT_WORKLOG_DELETED,
+    EVENT_USER_CREATED,
+    EVENT_USER_UPDATED,
+]
+
 # Кеш для зберігання відправлених повідомлень, щоб уникнути дублікатів
 # Структура: {issue_key: [{"text": "message_text", "time": timestamp}]]}
 # Зберігаємо тільки останні повідомлення за останні 5 хвилин
@@ -320,6 +358,24 @@ ATTACHMENT_CACHE_TTL = 300  # 5 minutes - INCREASED for debugging timing issues
 ATTACHMENT_ID_CACHE: Dict[str, Dict[str, Any]] = {}
 ATTACHMENT_ID_CACHE_TTL = 600  # 10 minutes - INCREASED for debugging
 
+# ===== КОРЕЛЯЦІЯ КОМЕНТАРІВ З ВКЛАДЕННЯМИ =====
+# Коментар з вбудованими файлами чекає не фіксований час, а на відповідні
+# attachment_created події: він відправляється, щойно прибудуть усі файли,
+# або після адаптивного дедлайну. Файли, що прийшли пізніше, надсилаються
+# користувачу окремим повідомленням (follow-up).
+ATTACHMENT_WAIT_MIN = 0.5  # секунд
+ATTACHMENT_WAIT_MAX = 5.0  # не довше за колишню фіксовану затримку
+ATTACHMENT_WAIT_INITIAL = 2.0
+ATTACHMENT_FOLLOWUP_TTL = 300  # 5 minutes
+
+# Структура: {issue_key: [{"pending": [embedded...], "future": Future, "created": monotonic}]}
+ATTACHMENT_WAITERS: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+# Структура: {issue_key: [{"chat_id": str, "pending": [embedded...], "created": monotonic,
+#                         "comment_arrived": monotonic}]}
+LATE_ATTACHMENT_FOLLOWUPS: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+# Згладжена оцінка запізнення attachment_created відносно comment_created
+_attachment_lag_estimate = ATTACHMENT_WAIT_INITIAL
+
 # === Функції для обробки вебхуків ===
 
 
@@ -364,24 +420,7 @@ async def handle_webhook(request: web.Request) -> web.Response:
             )
 
         # Route to appropriate handler
-        handler = None
-        if event_type == EVENT_ISSUE_UPDATED:
-            handler = handle_issue_updated
-        elif event_type == EVENT_COMMENT_CREATED:
-            handler = handle_comment_created
-        elif event_type == EVENT_ISSUE_CREATED:
-            handler = handle_issue_created
-        elif event_type == EVENT_ATTACHMENT_CREATED:
-            handler = handle_attachment_created
-        elif event_type in [
-            EVENT_ISSUE_PROPERTY_SET,
-            EVENT_ISSUELINK_CREATED,
-            EVENT_WORKLOG_CREATED,
-            EVENT_WORKLOG_UPDATED,
-            EVENT_WORKLOG_DELETED,
-            EVENT_USER_CREATED,
-            EVENT_USER_UPDATED,
-        ]:
+        if event_type in INFO_EVENTS:
             # Логуємо інформаційні події без обробки
             logger.info(
                 f"ℹ️ Info event received: {event_type} - logging only, no action taken"
@@ -392,22 +431,48 @@ async def handle_webhook(request: web.Request) -> web.Response:
             return web.json_response(
                 {"status": "success", "message": f"Info event logged: {event_type}"}
             )
-        else:
+
+        handler = get_webhook_handler(event_type)
+        if handler is None:
             logger.warning(f"Unsupported event type: {event_type}")
             return web.json_response(
                 {"status": "error", "message": f"Unsupported event type: {event_type}"},
                 status=400,
             )
 
-        try:
-            await handler(webhook_data)
-        except Exception as e:
-            logger.error(f"Error in {event_type} handler: {str(e)}", exc_info=True)
-            # Don't return error to Jira - we've already received the webhook
-            # Just log it and return success to prevent retries
+        ordering_key = get_webhook_ordering_key(event_type, webhook_data)
+
+        # Записуємо подію в журнал до відповіді Jira, щоб вона пережила перезапуск
+        spool = get_webhook_spool()
+        spool_id = None
+        if spool is not None:
+            spool_id = await spool.append(event_type, ordering_key, webhook_data)
+            if spool_id is None:
+                logger.info(f"Duplicate delivery of {event_type} ignored")
+                return web.json_response(
+                    {"status": "success", "message": f"Duplicate event: {event_type}"}
+                )
+
+        # Ставимо подію в чергу і одразу відповідаємо Jira, щоб уникнути
+        # таймаутів і повторних доставок
+        if not get_webhook_dispatcher().submit(
+            event_type,
+            webhook_data,
+            _with_spool_ack(handler, spool_id),
+            ordering_key,
+        ):
+            if spool is not None and spool_id is not None:
+                # Jira повторить доставку - не вважаємо подію прийнятою
+                await spool.discard(spool_id)
+            return web.json_response(
+                {"status": "error", "message": "Webhook queue is full, retry later"},
+                status=503,
+                headers={"Retry-After": str(WEBHOOK_QUEUE_RETRY_AFTER)},
+            )
 
         return web.json_response(
-            {"status": "success", "message": f"Event processed: {event_type}"}
+            {"status": "accepted", "message": f"Event queued: {event_type}"},
+            status=202,
         )
 
     except Exception as e:
@@ -417,6 +482,128 @@ async def handle_webhook(request: web.Request) -> web.Response:
         )
 
 
+def get_webhook_handler(
+    event_type: str,
+) -> Optional[Callable[[Dict[str, Any]], Awaitable[None]]]:
+    """Повертає обробник для типу події Jira або None"""
+    return {
+        EVENT_ISSUE_UPDATED: handle_issue_updated,
+        EVENT_COMMENT_CREATED: handle_comment_created,
+        EVENT_ISSUE_CREATED: handle_issue_created,
+        EVENT_ATTACHMENT_CREATED: handle_attachment_created,
+    }.get(event_type)
+
+
+def get_webhook_ordering_key(
+    event_type: str, webhook_data: Dict[str, Any]
+) -> Optional[str]:
+    """
+    Ключ впорядкування подій: події однієї задачі обробляються по черзі.
+    attachment_created не впорядковуємо, бо коментар тієї ж задачі може
+    чекати саме на це вкладення.
+    """
+    if event_type == EVENT_ATTACHMENT_CREATED:
+        return None
+    return webhook_data.get("issue", {}).get("key") or None
+
+
+def _with_spool_ack(
+    handler: Callable[[Dict[str, Any]], Awaitable[None]], spool_id: Optional[int]
+) -> Callable[[Dict[str, Any]], Awaitable[None]]:
+    """Позначає подію в журналі виконаною після завершення обробника"""
+    if spool_id is None:
+        return handler
+
+    async def run(webhook_data: Dict[str, Any]) -> None:
+        try:
+            await handler(webhook_data)
+        except asyncio.CancelledError:
+            # Обробку перервано при зупинці - подію буде відтворено
+            raise
+        except Exception:
+            _mark_spooled_event_done(spool_id, failed=True)
+            raise
+        _mark_spooled_event_done(spool_id)
+
+    return run
+
+
+def _mark_spooled_event_done(spool_id: int, failed: bool = False) -> None:
+    spool = get_webhook_spool()
+    if spool is not None:
+        spool.mark_done(spool_id, failed=failed)
+
+
+async def replay_spooled_webhooks() -> int:
+    """
+    Ставить у чергу події, що не були оброблені до перезапуску бота.
+    Якщо черга обробки заповнена, решта подій відтворюється пізніше.
+
+    Returns:
+        int: Кількість відтворених подій
+    """
+    spool = get_webhook_spool()
+    dispatcher = get_webhook_dispatcher()
+    if spool is None or not spool.running or not dispatcher.running:
+        return 0
+
+    # Беремо стільки подій, скільки поміститься в чергу: спроба
+    # зараховується лише поданим у чергу подіям
+    events = await spool.load_pending(dispatcher.max_queue_size - dispatcher.pending)
+    replayed = 0
+    for index, event in enumerate(events):
+        event_type = event["event_type"]
+        handler = get_webhook_handler(event_type)
+        if handler is None:
+            spool.mark_done(event["id"], failed=True)
+            continue
+        webhook_data = event["data"]
+        if not dispatcher.submit(
+            event_type,
+            webhook_data,
+            _with_spool_ack(handler, event["id"]),
+            get_webhook_ordering_key(event_type, webhook_data),
+        ):
+            # Чергу зайняли живі вебхуки - повертаємо решту подій у журнал
+            await spool.release(events[index:])
+            break
+        replayed += 1
+
+    if replayed:
+        logger.info(f"♻️ Відтворено {replayed} незавершених вебхуків з журналу")
+    if spool.has_replay_backlog:
+        logger.warning(
+            f"Черга заповнена, решту подій журналу буде відтворено через "
+            f"{WEBHOOK_QUEUE_RETRY_AFTER} с"
+        )
+        _schedule_spool_replay()
+    return replayed
+
+
+# Відкладене відтворення журналу (коли черга обробки була заповнена)
+_spool_replay_task: Optional[asyncio.Task] = None
+
+
+def _schedule_spool_replay() -> None:
+    global _spool_replay_task
+    if _spool_replay_task is not None and not _spool_replay_task.done():
+        return
+    _spool_replay_task = asyncio.create_task(
+        _replay_spooled_webhooks_later(), name="webhook-spool-replay"
+    )
+
+
+async def _replay_spooled_webhooks_later() -> None:
+    global _spool_replay_task
+    await asyncio.sleep(WEBHOOK_QUEUE_RETRY_AFTER)
+    # Звільняємо слот, щоб відтворення могло запланувати наступний повтор
+    _spool_replay_task = None
+    try:
+        await replay_spooled_webhooks()
+    except Exception as e:
+        logger.error(f"Помилка відтворення журналу вебхуків: {e}", exc_info=True)
+
+
 async def validate_webhook_data(data: Dict[str, Any], event_type: str) -> bool:
     """
     Validates that the webhook data contains all required fields for the given event type.
@@ -480,12 +667,20 @@ async def validate_webhook_data(data: Dict[str, Any], event_type: str) -> bool:
         return False
 
 
+def format_status_message(issue_key: str, status: str) -> str:
+    """Текст сповіщення користувача про зміну статусу задачі"""
+    return f"📝 Статус Задачі:<b>{issue_key}</b> оновлено: <b>{status}</b>\n"
+
+
 async def handle_issue_updated(webhook_data: Dict[str, Any]) -> None:
     """
     Обробка події оновлення задачі в Jira.
     Перевіряє зміну статусу та надсилає повідомлення користувачу в Telegram.
     """
     try:
+        # Оновлюємо кеш статусів незалежно від того, чи буде сповіщення
+        update_issue_cache_from_webhook(webhook_data.get("issue", {}))
+
         # Перевіряємо, чи змінився статус задачі
         changelog = webhook_data.get("changelog", {})
         items = changelog.get("items", [])
@@ -537,8 +732,14 @@ async def handle_issue_updated(webhook_data: Dict[str, Any]) -> None:
             logger.warning(f"Не знайдено користувача Telegram для задачі {issue_key}")
             return
 
+        # Запам'ятовуємо статус, про який знає користувач (для фонового оновлення)
+        if str(user_data["telegram_id"]).isdigit():
+            await aset_user_task_status(
+                int(user_data["telegram_id"]), issue_key, new_status
+            )
+
         # Готуємо повідомлення про зміну статусу
-        message = f"📝 Статус Задачі:<b>{issue_key}</b> оновлено: <b>{new_status}</b>\n"
+        message = format_status_message(issue_key, new_status)
 
         # Перевіряємо чи повідомлення є дублікатом
         if is_duplicate_message(issue_key, message):
@@ -608,17 +809,6 @@ async def handle_comment_created(webhook_data: Dict[str, Any]) -> None:
 
         logger.info("🔍 SEARCHING FOR ATTACHMENTS IN ALL LOCATIONS:")
 
-        # КРИТИЧНЕ ВИПРАВЛЕННЯ: Збільшена затримка для завершення кешування ВСІХ файлів
-        logger.info(
-            "⏳ Waiting 5 seconds for all attachment_created events to complete..."
-        )
-        await asyncio.sleep(
-            5
-        )  # Збільшено з 2 до 5 секунд для повного завершення всіх attachment_created подій
-
-        # НОВИНКА: Спочатку перевіряємо закешовані вкладення + ID-based пошук
-        comment_timestamp = time.time()  # Приблизний час коментаря
-
         # Отримуємо embedded attachments для допомоги в пошуку
         embedded_attachments = []
         if comment_body:
@@ -630,6 +820,18 @@ async def handle_comment_created(webhook_data: Dict[str, Any]) -> None:
                 filename = att.get("filename", "unknown")
                 logger.info(f"   {i+1}. {filename}")
 
+        # Чекаємо тільки на ті вбудовані файли, яких ще немає в кеші.
+        # Текстові коментарі відправляються без затримки.
+        missing_embedded = []
+        comment_arrived = time.monotonic()
+        if embedded_attachments:
+            missing_embedded = await wait_for_comment_attachments(
+                issue_key, embedded_attachments
+            )
+
+        # НОВИНКА: Спочатку перевіряємо закешовані вкладення + ID-based пошук
+        comment_timestamp = time.time()  # Приблизний час коментаря
+
         # Використовуємо нову стратегію пошуку
         cached_attachments = find_cached_attachments_by_patterns(
             issue_key, embedded_attachments, comment_timestamp
@@ -820,6 +1022,17 @@ async def handle_comment_created(webhook_data: Dict[str, Any]) -> None:
                 attachments, issue_key, user_data["telegram_id"]
             )
 
+        # Файли, які не встигли до дедлайну, будуть дослані окремо
+        late_attachments = [
+            embedded
+            for embedded in missing_embedded
+            if not any(_attachment_matches(embedded, att) for att in attachments)
+        ]
+        if late_attachments:
+            register_late_attachment_followup(
+                issue_key, user_data["telegram_id"], late_attachments, comment_arrived
+            )
+
         # Очищаємо кеш вкладень після обробки коментаря
         cleanup_attachment_cache()
 
@@ -838,6 +1051,7 @@ async def handle_issue_created(webhook_data: Dict[str, Any]) -> None:
     try:
         # Отримуємо дані про задачу
         issue = webhook_data.get("issue", {})
+        update_issue_cache_from_webhook(issue)
         issue_key = issue.get("key", "")
         issue_summary = issue.get("fields", {}).get("summary", "")
         issue_creator = (
@@ -970,6 +1184,7 @@ async def handle_attachment_created(webhook_data: Dict[str, Any]) -> None:
             logger.info(
                 f"💡 Attachment {filename} cached by ID. Will be matched later by filename/timestamp."
             )
+            await notify_attachment_arrived(None, attachment)
 
             # Очищаємо старі записи з кешу
             cleanup_attachment_cache()
@@ -987,7 +1202,9 @@ async def handle_attachment_created(webhook_data: Dict[str, Any]) -> None:
             f"🔵 CACHE STATE AFTER: {len(PENDING_ATTACHMENTS_CACHE)} issues, {sum(len(v) for v in PENDING_ATTACHMENTS_CACHE.values())} total attachments"  # noqa: E501
         )
         logger.info(f"✅ Attachment {filename} cached for issue {issue_key}")
-        logger.info("💡 Waiting for comment_created event to process attachment...")
+
+        if not await notify_attachment_arrived(issue_key, attachment):
+            logger.info("💡 Waiting for comment_created event to process attachment...")
 
         # Очищаємо старі записи з кешу
         cleanup_attachment_cache()
@@ -1021,49 +1238,46 @@ async def get_issue_key_from_attachment_api(attachment_id: str) -> Optional[str]
     domain = normalize_jira_domain(JIRA_DOMAIN)
     api_url = f"https://{domain}/rest/api/3/attachment/{attachment_id}"
 
-    auth = httpx.BasicAuth(JIRA_EMAIL, JIRA_API_TOKEN)
     headers = {
         "X-Atlassian-Token": "no-check",
         "Accept": "application/json",
         "Content-Type": "application/json",
-        "Connection": "keep-alive",
     }
 
     logger.info(f"🌐 Attempting API call: {api_url}")
 
     for attempt in range(max_retries):
         try:
-            async with httpx.AsyncClient(
-                timeout=15.0, auth=auth, verify=True, trust_env=True  # Коротший timeout
-            ) as client:
-                response = await client.get(api_url, headers=headers)
-
-                if response.status_code == 404:
-                    logger.warning(f"Attachment {attachment_id} not found (404)")
-                    return None
+            response = await get_jira_client().request(
+                "GET", api_url, headers=headers, priority=PRIORITY_BACKGROUND
+            )
 
-                response.raise_for_status()
-                attachment_info = response.json()
-
-                logger.debug(f"API Response: {json.dumps(attachment_info, indent=2)}")
-
-                # В різних версіях Jira може бути різне поле
-                for field in ["issueId", "issueKey", "issue"]:
-                    if field in attachment_info:
-                        value = attachment_info[field]
-                        if isinstance(value, dict):
-                            issue_key = value.get("key", "")
-                        else:
-                            issue_key = str(value)
-                        if issue_key and re.match(r"^[A-Z]+-\d+$", issue_key):
-                            logger.info(f"🔍 Found issue key via API: {issue_key}")
-                            return issue_key
-
-                logger.warning(
-                    f"No valid issue key found in API response for attachment {attachment_id}"
-                )
+            if response.status_code == 404:
+                logger.warning(f"Attachment {attachment_id} not found (404)")
                 return None
 
+            response.raise_for_status()
+            attachment_info = response.json()
+
+            logger.debug(f"API Response: {json.dumps(attachment_info, indent=2)}")
+
+            # В різних версіях Jira може бути різне поле
+            for field in ["issueId", "issueKey", "issue"]:
+                if field in attachment_info:
+                    value = attachment_info[field]
+                    if isinstance(value, dict):
+                        issue_key = value.get("key", "")
+                    else:
+                        issue_key = str(value)
+                    if issue_key and re.match(r"^[A-Z]+-\d+$", issue_key):
+                        logger.info(f"🔍 Found issue key via API: {issue_key}")
+                        return issue_key
+
+            logger.warning(
+                f"No valid issue key found in API response for attachment {attachment_id}"
+            )
+            return None
+
         except httpx.ConnectError as conn_error:
             logger.warning(
                 f"Connection error (attempt {attempt + 1}/{max_retries}): {str(conn_error)}"
@@ -1144,8 +1358,33 @@ def extract_issue_key_from_urls(attachment: Dict[str, Any]) -> Optional[str]:
 # === Допоміжні функції ===
 
 
+# Зображення, які Telegram приймає як фото в альбомі sendMediaGroup
+MEDIA_GROUP_PHOTO_TYPES = {"image/jpeg", "image/png", "image/webp"}
+
+
+def _file_payload_size(file_content: Union[bytes, BinaryIO]) -> int:
+    """Розмір вмісту файлу: байтів або тимчасового файлу на диску"""
+    if isinstance(file_content, (bytes, bytearray)):
+        return len(file_content)
+    return file_content.seek(0, os.SEEK_END)
+
+
+def _file_payload(file_content: Union[bytes, BinaryIO]) -> BinaryIO:
+    """
+    Об'єкт для multipart-завантаження. Файл з диска httpx читає частинами,
+    тож він не копіюється в пам'ять і його можна відправити повторно.
+    """
+    if isinstance(file_content, (bytes, bytearray)):
+        return BytesIO(file_content)
+    file_content.seek(0)
+    return file_content
+
+
 async def send_telegram_message(
-    chat_id: str, text: str, file_data: Optional[tuple] = None
+    chat_id: str,
+    text: str,
+    file_data: Optional[tuple] = None,
+    on_sent: Optional[Callable[[Dict[str, Any]], None]] = None,
 ) -> bool:
     """
     Надсилає повідомлення користувачу в Telegram.
@@ -1153,139 +1392,148 @@ async def send_telegram_message(
     Args:
         chat_id: ID чату користувача в Telegram
         text: Текст повідомлення
-        file_data: Кортеж (filename, file_content, mime_type) для надсилання файлу
+        file_data: Кортеж (filename, file_content, mime_type) для надсилання файлу;
+            file_content - байти або відкритий бінарний файл
+        on_sent: Викликається з надісланим повідомленням (Message) після
+            успішної відправки файлу, наприклад щоб зберегти file_id
 
     Returns:
         bool: True якщо повідомлення надіслано успішно
     """
     try:
-        # Базові налаштування для HTTP клієнта
-        base_url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}"
+        # Спільний пул з'єднань до Telegram Bot API
+        telegram_client = get_telegram_client()
 
         # Для файлів використовуємо спеціальну обробку
         if file_data:
             filename, file_content, mime_type = file_data
-            if not file_content:
+            file_size = _file_payload_size(file_content) if file_content else 0
+            if not file_size:
                 logger.error("Файл порожній або відсутній")
                 return False
 
-            # Використовуємо httpx для асинхронних запитів з підвищеним timeout
-            async with httpx.AsyncClient(timeout=60.0) as client:
-                try:
-                    # Визначаємо метод відправки в залежності від типу файлу
-                    method = "sendDocument"  # Default method
-                    file_param = "document"  # Default parameter name
-
-                    # Select appropriate method based on MIME type and file size
-                    if mime_type.startswith("image/"):
-                        if len(file_content) <= 10 * 1024 * 1024:  # Max 10MB for photos
-                            method = "sendPhoto"
-                            file_param = "photo"
-
-                    elif mime_type.startswith("video/"):
-                        if len(file_content) <= 50 * 1024 * 1024:  # Max 50MB for videos
-                            method = "sendVideo"
-                            file_param = "video"
-
-                    elif mime_type.startswith("audio/"):
-                        if len(file_content) <= 50 * 1024 * 1024:  # Max 50MB for audio
-                            method = "sendAudio"
-                            file_param = "audio"
-
-                    logger.debug(f"Using Telegram API method: {method}")
-
-                    # Готуємо дані для відправки
-                    files = {file_param: (filename, BytesIO(file_content), mime_type)}
-                    data = {
-                        "chat_id": chat_id,
-                        "caption": (
-                            text[:1024] if text else None
-                        ),  # Limit caption to 1024 chars
-                        "parse_mode": "HTML",
-                    }
-
-                    # For large files, set a longer timeout
-                    file_size_mb = len(file_content) / (1024 * 1024)
-                    timeout = max(
-                        30, min(300, int(file_size_mb * 5))
-                    )  # 5 seconds per MB, min 30s, max 300s
+            try:
+                # Визначаємо метод відправки в залежності від типу файлу
+                method = "sendDocument"  # Default method
+                file_param = "document"  # Default parameter name
+
+                # Select appropriate method based on MIME type and file size
+                if mime_type.startswith("image/"):
+                    if file_size <= 10 * 1024 * 1024:  # Max 10MB for photos
+                        method = "sendPhoto"
+                        file_param = "photo"
+
+                elif mime_type.startswith("video/"):
+                    if file_size <= 50 * 1024 * 1024:  # Max 50MB for videos
+                        method = "sendVideo"
+                        file_param = "video"
+
+                elif mime_type.startswith("audio/"):
+                    if file_size <= 50 * 1024 * 1024:  # Max 50MB for audio
+                        method = "sendAudio"
+                        file_param = "audio"
+
+                logger.debug(f"Using Telegram API method: {method}")
+
+                # Готуємо дані для відправки
+                files = {
+                    file_param: (filename, _file_payload(file_content), mime_type)
+                }
+                data = {
+                    "chat_id": chat_id,
+                    "caption": (
+                        text[:1024] if text else None
+                    ),  # Limit caption to 1024 chars
+                    "parse_mode": "HTML",
+                }
 
-                    logger.debug(
-                        f"Sending file {filename} ({mime_type}) of size {file_size_mb:.2f} MB with {timeout}s timeout"
-                    )
-                    logger.debug(f"Request data: {data}")
+                # For large files, set a longer timeout
+                file_size_mb = file_size / (1024 * 1024)
+                timeout = max(
+                    30, min(300, int(file_size_mb * 5))
+                )  # 5 seconds per MB, min 30s, max 300s
 
-                    async with httpx.AsyncClient(timeout=timeout) as client:
-                        response = await client.post(
-                            f"{base_url}/{method}", data=data, files=files
-                        )
-                        logger.debug(f"API Response status: {response.status_code}")
+                logger.debug(
+                    f"Sending file {filename} ({mime_type}) of size {file_size_mb:.2f} MB with {timeout}s timeout"
+                )
+                logger.debug(f"Request data: {data}")
+
+                response = await telegram_client.call(
+                    method,
+                    priority=PRIORITY_BULK,
+                    data=data,
+                    files=files,
+                    timeout=timeout,
+                )
+                logger.debug(f"API Response status: {response.status_code}")
 
-                        response.raise_for_status()
-                        response_json = response.json()
+                response.raise_for_status()
+                response_json = response.json()
+
+                if not response_json.get("ok"):
+                    error_msg = response_json.get("description", "Unknown error")
+                    logger.error(f"Telegram API error: {error_msg}")
 
-                        if not response_json.get("ok"):
-                            error_msg = response_json.get(
-                                "description", "Unknown error"
+                    # If file is too large for selected method, try sendDocument
+                    if (
+                        "file is too big" in error_msg.lower()
+                        and method != "sendDocument"
+                    ):
+                        logger.info(
+                            f"File too big for {method}, falling back to sendDocument"
+                        )
+                        files = {
+                            "document": (
+                                filename,
+                                _file_payload(file_content),
+                                mime_type,
                             )
-                            logger.error(f"Telegram API error: {error_msg}")
-
-                            # If file is too large for selected method, try sendDocument
-                            if (
-                                "file is too big" in error_msg.lower()
-                                and method != "sendDocument"
-                            ):
-                                logger.info(
-                                    f"File too big for {method}, falling back to sendDocument"
-                                )
-                                files = {
-                                    "document": (
-                                        filename,
-                                        BytesIO(file_content),
-                                        mime_type,
-                                    )
-                                }
-                                response = await client.post(
-                                    f"{base_url}/sendDocument", data=data, files=files
-                                )
-                                response.raise_for_status()
-                                response_json = response.json()
-
-                        logger.info(f"File {filename} sent successfully")
-                        logger.debug(
-                            f"Telegram API response: {json.dumps(response_json, indent=2)}"
+                        }
+                        response = await telegram_client.call(
+                            "sendDocument",
+                            priority=PRIORITY_BULK,
+                            data=data,
+                            files=files,
+                            timeout=timeout,
                         )
+                        response.raise_for_status()
+                        response_json = response.json()
 
-                        return True
-
-                except Exception as e:
-                    logger.error(
-                        f"Error sending file {filename}: {str(e)}", exc_info=True
-                    )
+                logger.info(f"File {filename} sent successfully")
+                if on_sent is not None and response_json.get("ok"):
+                    on_sent(response_json.get("result") or {})
+                logger.debug(
+                    f"Telegram API response: {json.dumps(response_json, indent=2)}"
+                )
 
-                    # Try to get more info about the error
-                    error_details = str(e)
-                    try:
-                        if hasattr(e, "response") and e.response:
-                            error_details = f"{e} - Response: {e.response.text}"
-                    except Exception:
-                        pass
+                return True
 
-                    logger.error(f"Error details: {error_details}")
+            except Exception as e:
+                logger.error(f"Error sending file {filename}: {str(e)}", exc_info=True)
 
-                    # If file is too large, try to send as a link
-                    if (
-                        "Request entity too large" in str(e)
-                        or "file is too big" in str(e).lower()
-                    ):
-                        logger.info("File too large for Telegram, sending as a link")
-                        link_text = (
-                            f"{text}\n\n⚠️ <i>Файл завеликий для надсилання в Telegram. "
-                            f"Будь ласка, завантажте його безпосередньо з Jira.</i>"
-                        )
-                        return await send_telegram_message(chat_id, link_text)
+                # Try to get more info about the error
+                error_details = str(e)
+                try:
+                    if hasattr(e, "response") and e.response:
+                        error_details = f"{e} - Response: {e.response.text}"
+                except Exception:
+                    pass
+
+                logger.error(f"Error details: {error_details}")
+
+                # If file is too large, try to send as a link
+                if (
+                    "Request entity too large" in str(e)
+                    or "file is too big" in str(e).lower()
+                ):
+                    logger.info("File too large for Telegram, sending as a link")
+                    link_text = (
+                        f"{text}\n\n⚠️ <i>Файл завеликий для надсилання в Telegram. "
+                        f"Будь ласка, завантажте його безпосередньо з Jira.</i>"
+                    )
+                    return await send_telegram_message(chat_id, link_text)
 
-                    return False
+                return False
 
         # Для звичайних текстових повідомлень
         else:
@@ -1296,20 +1544,73 @@ async def send_telegram_message(
             data = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
 
             # Надсилаємо повідомлення
-            async with httpx.AsyncClient() as client:
-                response = await client.post(f"{base_url}/sendMessage", json=data)
-                response.raise_for_status()
+            response = await telegram_client.call("sendMessage", json=data)
+            response.raise_for_status()
 
-                logger.debug(f"Message sent successfully: {text[:100]}...")
-                return True
+            logger.debug(f"Message sent successfully: {text[:100]}...")
+            return True
 
     except Exception as e:
         logger.error(f"Error sending message to Telegram: {str(e)}", exc_info=True)
         return False
 
 
+def _describe_file_type(mime_type: str) -> Tuple[str, str, str, int]:
+    """
+    Іконка, назва типу, метод Telegram API і ліміт розміру для MIME типу.
+
+    Returns:
+        Tuple[str, str, str, int]: (іконка, назва, метод, ліміт у байтах)
+    """
+    if mime_type.startswith("image/"):
+        file_type_icon = "🖼️"
+        file_type_name = "Зображення"
+        telegram_method = "sendPhoto"
+        size_limit = 10 * 1024 * 1024  # 10MB for photos
+    elif mime_type.startswith("video/"):
+        file_type_icon = "🎥"
+        file_type_name = "Відео"
+        telegram_method = "sendVideo"
+        size_limit = 50 * 1024 * 1024  # 50MB for videos
+    elif mime_type.startswith("audio/"):
+        file_type_icon = "🎵"
+        file_type_name = "Аудіо"
+        telegram_method = "sendAudio"
+        size_limit = 50 * 1024 * 1024  # 50MB for audio
+    elif (
+        mime_type == "application/vnd.ms-excel"
+        or mime_type
+        == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    ):
+        file_type_icon = "📊"
+        file_type_name = "Excel документ"
+        telegram_method = "sendDocument"
+        size_limit = 50 * 1024 * 1024  # 50MB for documents
+    elif mime_type == "application/pdf":
+        file_type_icon = "📄"
+        file_type_name = "PDF документ"
+        telegram_method = "sendDocument"
+        size_limit = 50 * 1024 * 1024
+    elif mime_type.startswith("text/"):
+        file_type_icon = "📝"
+        file_type_name = "Текстовий файл"
+        telegram_method = "sendDocument"
+        size_limit = 50 * 1024 * 1024
+    else:
+        file_type_icon = "📎"
+        file_type_name = "Документ"
+        telegram_method = "sendDocument"
+        size_limit = 50 * 1024 * 1024
+    return file_type_icon, file_type_name, telegram_method, size_limit
+
+
 async def send_file_as_separate_message(
-    chat_id: str, filename: str, file_content: bytes, mime_type: str, issue_key: str
+    chat_id: str,
+    filename: str,
+    file_content: Union[bytes, BinaryIO],
+    mime_type: str,
+    issue_key: str,
+    on_sent: Optional[Callable[[Dict[str, Any]], None]] = None,
 ) -> bool:
     """
     Універсальна функція для відправки файлів як окремих повідомлень в Telegram.
@@ -1318,61 +1619,26 @@ async def send_file_as_separate_message(
     Args:
         chat_id: ID чату в Telegram
         filename: Ім'я файлу
-        file_content: Вміст файлу в байтах
+        file_content: Вміст файлу - байти або відкритий бінарний файл
         mime_type: MIME тип файлу
         issue_key: Ключ задачі Jira
+        on_sent: Викликається з надісланим повідомленням (Message)
 
     Returns:
         bool: True якщо файл успішно відправлено
     """
     try:
-        if not file_content:
+        file_size = _file_payload_size(file_content) if file_content else 0
+        if not file_size:
             logger.error(f"Empty file content for {filename}")
             return False
 
-        file_size = len(file_content)
         file_size_mb = file_size / (1024 * 1024)
 
         # Визначаємо тип файлу та іконку
-        if mime_type.startswith("image/"):
-            file_type_icon = "🖼️"
-            file_type_name = "Зображення"
-            telegram_method = "sendPhoto"
-            size_limit = 10 * 1024 * 1024  # 10MB for photos
-        elif mime_type.startswith("video/"):
-            file_type_icon = "🎥"
-            file_type_name = "Відео"
-            telegram_method = "sendVideo"
-            size_limit = 50 * 1024 * 1024  # 50MB for videos
-        elif mime_type.startswith("audio/"):
-            file_type_icon = "🎵"
-            file_type_name = "Аудіо"
-            telegram_method = "sendAudio"
-            size_limit = 50 * 1024 * 1024  # 50MB for audio
-        elif (
-            mime_type == "application/vnd.ms-excel"
-            or mime_type
-            == "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        ):
-            file_type_icon = "📊"
-            file_type_name = "Excel документ"
-            telegram_method = "sendDocument"
-            size_limit = 50 * 1024 * 1024  # 50MB for documents
-        elif mime_type == "application/pdf":
-            file_type_icon = "📄"
-            file_type_name = "PDF документ"
-            telegram_method = "sendDocument"
-            size_limit = 50 * 1024 * 1024
-        elif mime_type.startswith("text/"):
-            file_type_icon = "📝"
-            file_type_name = "Текстовий файл"
-            telegram_method = "sendDocument"
-            size_limit = 50 * 1024 * 1024
-        else:
-            file_type_icon = "📎"
-            file_type_name = "Документ"
-            telegram_method = "sendDocument"
-            size_limit = 50 * 1024 * 1024
+        file_type_icon, file_type_name, telegram_method, size_limit = (
+            _describe_file_type(mime_type)
+        )
 
         # Формуємо повідомлення (simplified without tech support header)
         message = f"{file_type_icon} <b>{filename}</b> ({file_size_mb:.1f} MB)"
@@ -1392,7 +1658,7 @@ async def send_file_as_separate_message(
 
         # Відправляємо файл через наявну функцію
         return await send_telegram_message(
-            chat_id, message, (filename, file_content, mime_type)
+            chat_id, message, (filename, file_content, mime_type), on_sent=on_sent
         )
 
     except Exception as e:
@@ -1409,7 +1675,7 @@ async def process_attachments_universal(
     """
     Універсальна обробка вкладень з кешованими та webhook даними.
     Об'єднує кешовані вкладення з отриманими через webhook, видаляє дублікати
-    та відправляє кожен файл як окреме повідомлення.
+    та відправляє файли окремими повідомленнями або альбомами (sendMediaGroup).
 
     ⚠️ NOTE: Це АКТИВНА функція для обробки вкладень Jira → Telegram.
     📌 HISTORY: Замінила стару функцію process_attachments() яка була видалена 2025-10-08.
@@ -1473,44 +1739,24 @@ async def process_attachments_universal(
             logger.info("ℹ️ No attachments to process")
             return
 
-        # Обробляємо кожен файл окремо
-        success_count = 0
-        error_count = 0
-
-        for idx, attachment in enumerate(unique_attachments, 1):
-            filename = attachment.get("filename", f"attachment_{idx}")
-            att_id = attachment.get("id", "unknown")
-
-            logger.info(
-                f"📎 Processing attachment {idx}/{len(unique_attachments)}: {filename} (ID: {att_id})"
+        # Файли завантажуються паралельно, а в чат ідуть у початковому порядку;
+        # сусідні фото/відео та документи об'єднуються в альбоми
+        async def send(attachment: Dict[str, Any], downloaded: Any) -> bool:
+            return await send_downloaded_attachment(
+                chat_id, issue_key, attachment, downloaded
             )
 
-            try:
-                # Використовуємо callback функцію для обробки
-                result = await send_file_as_separate_message_callback(
-                    {
-                        "attachment": attachment,
-                        "issue_key": issue_key,
-                        "chat_id": chat_id,
-                    }
-                )
-
-                if result:
-                    success_count += 1
-                    logger.info(f"✅ Successfully sent: {filename}")
-                else:
-                    error_count += 1
-                    logger.error(f"❌ Failed to send: {filename}")
-
-            except Exception as e:
-                error_count += 1
-                logger.error(
-                    f"❌ Error processing attachment {filename}: {str(e)}",
-                    exc_info=True,
-                )
-
-        logger.info(
-            f"🏁 Attachment processing complete: {success_count} successful, {error_count} failed"
+        async def send_group(items: List[Tuple[Dict[str, Any], Any]]) -> int:
+            return await send_media_group(chat_id, issue_key, items)
+
+        await deliver_attachments(
+            chat_id,
+            unique_attachments,
+            download_attachment_to_spool,
+            send,
+            label=issue_key,
+            group_key=media_group_kind,
+            send_group=send_group,
         )
 
         # Очищаємо оброблені файли з ID-кешу, щоб уникнути повторної обробки
@@ -1529,6 +1775,328 @@ async def process_attachments_universal(
         )
 
 
+def _attachment_mime_type(attachment: Dict[str, Any]) -> str:
+    """MIME тип вкладення з даних Jira або за розширенням імені файлу"""
+    return attachment.get(
+        "mimeType",
+        attachment.get(
+            "contentType", _infer_mime_type(attachment.get("filename", ""))
+        ),
+    )
+
+
+def _file_caption(filename: str, mime_type: str, file_size: int) -> str:
+    """Підпис файлу в Telegram: іконка типу, ім'я і розмір"""
+    file_type_icon, _, _, _ = _describe_file_type(mime_type)
+    return f"{file_type_icon} <b>{filename}</b> ({file_size / (1024 * 1024):.1f} MB)"
+
+
+async def download_attachment_to_spool(
+    attachment: Dict[str, Any]
+) -> Union[SpooledAttachment, CachedTelegramFile, AttachmentTooLargeError, None]:
+    """
+    Завантажує вкладення Jira у тимчасовий файл на диску.
+    Файл потоково пишеться на диск і звідти ж частинами відправляється
+    в Telegram - цілком у пам'яті він не буває. Якщо файл уже є в Telegram
+    (кеш file_id), він не завантажується і не відправляється повторно.
+
+    Args:
+        attachment: Дані вкладення
+
+    Returns:
+        SpooledAttachment - тимчасовий файл; CachedTelegramFile - файл уже є
+        в Telegram; AttachmentTooLargeError для завеликого файлу (замість нього
+        в чат піде попередження); None, якщо завантажити не вдалося
+    """
+    filename = attachment.get("filename", "unknown_file")
+    att_id = str(attachment.get("id", "") or "")
+
+    file_cache = get_telegram_file_cache()
+    if file_cache is not None:
+        cached = file_cache.lookup(att_id)
+        if cached is not None:
+            logger.info(f"♻️ {filename} is already in Telegram, reusing file_id")
+            return cached
+
+    logger.info(f"⬇️ Downloading file from Jira: {filename}")
+
+    # Формуємо URL для завантаження
+    content_url = attachment.get("content", attachment.get("self", ""))
+    urls = build_attachment_urls(JIRA_DOMAIN, att_id, filename, content_url)
+
+    try:
+        spooled = await download_file_to_spool(
+            urls, max_bytes=int(ATTACHMENT_MAX_SIZE_MB * 1024 * 1024)
+        )
+    except AttachmentTooLargeError as e:
+        logger.warning(f"Attachment {filename} is too large for Telegram: {e}")
+        return e
+    except Exception as e:
+        logger.error(f"Failed to download file content for {filename}: {e}")
+        return None
+
+    if file_cache is not None:
+        # Той самий файл міг бути прикріплений раніше під іншим ID
+        cached = file_cache.lookup_content(att_id, spooled.sha256)
+        if cached is not None:
+            logger.info(
+                f"♻️ {filename} has the same content as a sent file, reusing file_id"
+            )
+            spooled.close()
+            return cached
+    return spooled
+
+
+def _remember_file_id(
+    attachment: Dict[str, Any], spooled: SpooledAttachment, message: Dict[str, Any]
+) -> None:
+    """Запам'ятовує file_id з відповіді Telegram на відправку файлу"""
+    file_cache = get_telegram_file_cache()
+    if file_cache is None:
+        return
+    file_ref = extract_file_ref(message)
+    if file_ref is not None:
+        media_type, file_id = file_ref
+        file_cache.remember(
+            attachment.get("id"), spooled.sha256, spooled.size, media_type, file_id
+        )
+
+
+async def _send_cached_attachment(
+    chat_id: str, attachment: Dict[str, Any], cached: CachedTelegramFile
+) -> bool:
+    """Відправляє файл, який уже є в Telegram, за його file_id"""
+    filename = attachment.get("filename", "unknown_file")
+    method, file_param = SEND_METHODS.get(cached.media_type, SEND_METHODS["document"])
+    data = {
+        "chat_id": chat_id,
+        file_param: cached.file_id,
+        "caption": _file_caption(
+            filename, _attachment_mime_type(attachment), cached.size
+        ),
+        "parse_mode": "HTML",
+    }
+    try:
+        response = await get_telegram_client().call(
+            method, priority=PRIORITY_BULK, json=data
+        )
+        response_json = response.json()
+    except Exception as e:
+        logger.warning(f"Error sending {filename} by file_id: {e}")
+        return False
+    if not response_json.get("ok"):
+        logger.warning(
+            f"Telegram rejected file_id for {filename}: "
+            f"{response_json.get('description', 'Unknown error')}"
+        )
+        return False
+    logger.info(f"File {filename} sent by file_id via {method}")
+    return True
+
+
+async def send_downloaded_attachment(
+    chat_id: str,
+    issue_key: str,
+    attachment: Dict[str, Any],
+    downloaded: Union[SpooledAttachment, CachedTelegramFile, AttachmentTooLargeError],
+) -> bool:
+    """
+    Відправляє в Telegram вкладення, отримане download_attachment_to_spool.
+
+    Returns:
+        bool: True якщо файл (або попередження про розмір) відправлено
+    """
+    filename = attachment.get("filename", "unknown_file")
+    if isinstance(downloaded, AttachmentTooLargeError):
+        warning_msg = (
+            f"📎 <b>{filename}</b> ({downloaded.size / (1024 * 1024):.1f} MB)\n\n"
+            f"⚠️ <i>Файл завеликий для надсилання в Telegram "
+            f"(обмеження {ATTACHMENT_MAX_SIZE_MB:.0f}MB). "
+            f"Будь ласка, завантажте його безпосередньо з Jira.</i>"
+        )
+        return await send_telegram_message(chat_id, warning_msg)
+
+    if isinstance(downloaded, CachedTelegramFile):
+        if await _send_cached_attachment(chat_id, attachment, downloaded):
+            return True
+        # file_id більше не дійсний - забуваємо його і відправляємо файл заново
+        file_cache = get_telegram_file_cache()
+        if file_cache is not None:
+            file_cache.forget(downloaded)
+        redownloaded = await download_attachment_to_spool(attachment)
+        if redownloaded is None or isinstance(redownloaded, CachedTelegramFile):
+            return False
+        try:
+            return await send_downloaded_attachment(
+                chat_id, issue_key, attachment, redownloaded
+            )
+        finally:
+            if isinstance(redownloaded, SpooledAttachment):
+                redownloaded.close()
+
+    mime_type = _attachment_mime_type(attachment)
+
+    logger.info(
+        f"📤 File downloaded ({downloaded.size} bytes), sending to Telegram..."
+    )
+
+    # Відправляємо файл
+    return await send_file_as_separate_message(
+        chat_id=chat_id,
+        filename=filename,
+        file_content=downloaded.file,
+        mime_type=mime_type,
+        issue_key=issue_key,
+        on_sent=lambda message: _remember_file_id(attachment, downloaded, message),
+    )
+
+
+def media_group_kind(attachment: Dict[str, Any], downloaded: Any) -> Optional[str]:
+    """
+    Вид альбому sendMediaGroup, до якого можна додати вкладення.
+    Telegram групує фото з відео, аудіо лише з аудіо, документи лише з
+    документами; файли, які в альбом не підходять, відправляються окремо.
+
+    Returns:
+        Optional[str]: "media", "audio", "document" або None
+    """
+    if not ATTACHMENT_MEDIA_GROUPS_ENABLED or isinstance(
+        downloaded, AttachmentTooLargeError
+    ):
+        return None
+    if isinstance(downloaded, CachedTelegramFile):
+        # Файл уже є в Telegram: вид визначає те, як його прийняв Telegram
+        return {
+            "photo": "media",
+            "video": "media",
+            "audio": "audio",
+            "document": "document",
+        }.get(downloaded.media_type)
+    mime_type = _attachment_mime_type(attachment)
+    if mime_type.startswith("image/"):
+        if mime_type not in MEDIA_GROUP_PHOTO_TYPES:
+            # GIF, SVG тощо Telegram не показує як фото - відправляємо документом
+            return "document"
+        _, _, _, size_limit = _describe_file_type(mime_type)
+        return "media" if downloaded.size <= size_limit else None
+    if mime_type.startswith("video/"):
+        return "media"
+    if mime_type.startswith("audio/"):
+        return "audio"
+    return "document"
+
+
+def _media_group_input_type(mime_type: str) -> str:
+    """Тип InputMedia для файлу в альбомі"""
+    if mime_type in MEDIA_GROUP_PHOTO_TYPES:
+        return "photo"
+    if mime_type.startswith("video/"):
+        return "video"
+    if mime_type.startswith("audio/"):
+        return "audio"
+    return "document"
+
+
+async def send_media_group(
+    chat_id: str, issue_key: str, items: List[Tuple[Dict[str, Any], Any]]
+) -> int:
+    """
+    Відправляє завантажені вкладення альбомами sendMediaGroup.
+    Альбом ділиться на частини, щоб один запит не перевищував ліміт Telegram
+    на розмір завантаження; якщо альбом не прийнято - файли йдуть окремо.
+
+    Args:
+        chat_id: ID чату в Telegram
+        issue_key: Ключ задачі Jira
+        items: Пари (вкладення, результат download_attachment_to_spool)
+            одного виду media_group_kind
+
+    Returns:
+        int: Кількість відправлених файлів
+    """
+    max_bytes = int(ATTACHMENT_MAX_SIZE_MB * 1024 * 1024)
+    chunks: List[List[Tuple[Dict[str, Any], Any]]] = []
+    chunk_bytes = 0
+    for item in items:
+        # Файли, що вже є в Telegram, не завантажуються повторно
+        size = item[1].size if isinstance(item[1], SpooledAttachment) else 0
+        if not chunks or chunk_bytes + size > max_bytes:
+            chunks.append([])
+            chunk_bytes = 0
+        chunks[-1].append(item)
+        chunk_bytes += size
+
+    sent = 0
+    for chunk in chunks:
+        if len(chunk) > 1 and await _send_media_group_chunk(chat_id, chunk):
+            sent += len(chunk)
+            continue
+        for attachment, downloaded in chunk:
+            if await send_downloaded_attachment(
+                chat_id, issue_key, attachment, downloaded
+            ):
+                sent += 1
+    return sent
+
+
+async def _send_media_group_chunk(
+    chat_id: str, chunk: List[Tuple[Dict[str, Any], Any]]
+) -> bool:
+    """Один запит sendMediaGroup; False - альбом не прийнято"""
+    media = []
+    files = {}
+    total_size = 0
+    for idx, (attachment, downloaded) in enumerate(chunk):
+        filename = attachment.get("filename", "unknown_file")
+        mime_type = _attachment_mime_type(attachment)
+        item = {
+            "caption": _file_caption(filename, mime_type, downloaded.size),
+            "parse_mode": "HTML",
+        }
+        if isinstance(downloaded, CachedTelegramFile):
+            item["type"] = downloaded.media_type
+            item["media"] = downloaded.file_id
+        else:
+            item["type"] = _media_group_input_type(mime_type)
+            item["media"] = f"attach://file{idx}"
+            files[f"file{idx}"] = (filename, _file_payload(downloaded.file), mime_type)
+            total_size += downloaded.size
+        media.append(item)
+
+    # 5 seconds per MB, min 30s, max 300s - як для окремих файлів
+    timeout = max(30, min(300, int(total_size / (1024 * 1024) * 5)))
+    logger.info(
+        f"📤 Sending media group of {len(chunk)} files "
+        f"({total_size / (1024 * 1024):.1f}MB to upload) to {chat_id}"
+    )
+    try:
+        response = await get_telegram_client().call(
+            "sendMediaGroup",
+            priority=PRIORITY_BULK,
+            data={"chat_id": chat_id, "media": json.dumps(media)},
+            files=files or None,
+            timeout=timeout,
+        )
+        response_json = response.json()
+    except Exception as e:
+        logger.warning(f"Media group failed, sending files one by one: {e}")
+        return False
+    if not response_json.get("ok"):
+        logger.warning(
+            f"Media group rejected by Telegram "
+            f"({response_json.get('description', 'Unknown error')}), "
+            f"sending files one by one"
+        )
+        return False
+
+    # Повідомлення альбому повертаються в тому ж порядку, що й файли
+    messages = response_json.get("result", [])
+    for (attachment, downloaded), message in zip(chunk, messages):
+        if isinstance(downloaded, SpooledAttachment):
+            _remember_file_id(attachment, downloaded, message)
+    return True
+
+
 async def send_file_as_separate_message_callback(data: Dict[str, Any]) -> bool:
     """
     Callback функція для відправки вкладень через attachment_processor.
@@ -1554,40 +2122,16 @@ async def send_file_as_separate_message_callback(data: Dict[str, Any]) -> bool:
             )
             return False
 
-        # Завантажуємо файл з Jira
-        filename = attachment.get("filename", "unknown_file")
-
-        logger.info(f"⬇️ Downloading file from Jira: {filename}")
-
-        # Формуємо URL для завантаження
-        att_id = attachment.get("id", "")
-        content_url = attachment.get("content", attachment.get("self", ""))
-        urls = build_attachment_urls(JIRA_DOMAIN, att_id, filename, content_url)
-
-        # Використовуємо наявну функцію для завантаження
-        file_content = await download_file_from_jira(urls)
-
-        if not file_content:
-            logger.error(f"Failed to download file content for {filename}")
+        downloaded = await download_attachment_to_spool(attachment)
+        if downloaded is None:
             return False
-
-        # Визначаємо MIME тип
-        mime_type = attachment.get(
-            "mimeType", attachment.get("contentType", _infer_mime_type(filename))
-        )
-
-        logger.info(
-            f"📤 File downloaded ({len(file_content)} bytes), sending to Telegram..."
-        )
-
-        # Відправляємо файл
-        return await send_file_as_separate_message(
-            chat_id=chat_id,
-            filename=filename,
-            file_content=file_content,
-            mime_type=mime_type,
-            issue_key=issue_key,
-        )
+        try:
+            return await send_downloaded_attachment(
+                chat_id, issue_key, attachment, downloaded
+            )
+        finally:
+            if isinstance(downloaded, SpooledAttachment):
+                downloaded.close()
 
     except Exception as e:
         logger.error(
@@ -1608,22 +2152,18 @@ async def send_telegram_text(chat_id: str, text: str) -> bool:
         bool: True, якщо повідомлення успішно надіслано
     """
     try:
-        from config.config import TELEGRAM_BOT_TOKEN
-
-        tg_url = f"https://api.telegram.org/bot{TELEGRAM_BOT_TOKEN}/sendMessage"
         data = {"chat_id": chat_id, "text": text, "parse_mode": "HTML"}
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(tg_url, json=data)
+        response = await get_telegram_client().call("sendMessage", json=data)
 
-            if response.status_code == 200:
-                logger.info("Повідомлення успішно надіслано")
-                return True
-            else:
-                logger.error(
-                    f"Помилка надсилання повідомлення: {response.status_code} - {response.text}"
-                )
-                return False
+        if response.status_code == 200:
+            logger.info("Повідомлення успішно надіслано")
+            return True
+        else:
+            logger.error(
+                f"Помилка надсилання повідомлення: {response.status_code} - {response.text}"
+            )
+            return False
 
     except Exception as e:
         logger.error(
@@ -1857,6 +2397,19 @@ def cleanup_attachment_cache() -> None:
             )
             del PENDING_ATTACHMENTS_CACHE[issue_key]
 
+    # Очищаємо прострочені очікування follow-up
+    monotonic_now = time.monotonic()
+    for issue_key in list(LATE_ATTACHMENT_FOLLOWUPS.keys()):
+        active_followups = [
+            followup
+            for followup in LATE_ATTACHMENT_FOLLOWUPS[issue_key]
+            if monotonic_now - followup["created"] < ATTACHMENT_FOLLOWUP_TTL
+        ]
+        if active_followups:
+            LATE_ATTACHMENT_FOLLOWUPS[issue_key] = active_followups
+        else:
+            del LATE_ATTACHMENT_FOLLOWUPS[issue_key]
+
     # Очищаємо кеш за attachment_id
     expired_ids = []
     for att_id, cache_entry in ATTACHMENT_ID_CACHE.items():
@@ -2041,6 +2594,190 @@ def find_cached_attachments_by_patterns(
     return found_attachments
 
 
+def _attachment_matches(embedded: Dict[str, Any], attachment: Dict[str, Any]) -> bool:
+    """Перевіряє, чи вкладення відповідає файлу, вбудованому в коментар"""
+    embedded_id = embedded.get("id")
+    attachment_id = attachment.get("id")
+    if embedded_id and attachment_id and str(embedded_id) == str(attachment_id):
+        return True
+    return files_match(attachment.get("filename", ""), embedded.get("filename", ""))
+
+
+def _is_attachment_cached(issue_key: str, embedded: Dict[str, Any]) -> bool:
+    """Перевіряє, чи вбудований файл вже є в кеші вкладень"""
+    for item in PENDING_ATTACHMENTS_CACHE.get(issue_key, []):
+        if _attachment_matches(embedded, item["attachment"]):
+            return True
+    return any(
+        _attachment_matches(embedded, cached["attachment"])
+        for cached in ATTACHMENT_ID_CACHE.values()
+    )
+
+
+def _record_attachment_lag(lag: float) -> None:
+    """Оновлює оцінку запізнення вкладень (експоненційне згладжування)"""
+    global _attachment_lag_estimate
+    _attachment_lag_estimate = 0.8 * _attachment_lag_estimate + 0.2 * lag
+
+
+def get_attachment_wait_deadline() -> float:
+    """Адаптивний дедлайн очікування вкладень для коментаря"""
+    return max(
+        ATTACHMENT_WAIT_MIN, min(ATTACHMENT_WAIT_MAX, _attachment_lag_estimate * 1.5)
+    )
+
+
+async def wait_for_comment_attachments(
+    issue_key: str, embedded_attachments: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Чекає, поки в кеш потраплять усі файли, вбудовані в коментар.
+
+    Args:
+        issue_key: Ключ задачі
+        embedded_attachments: Файли з тексту коментаря
+
+    Returns:
+        List[Dict]: Файли, які так і не прибули до дедлайну
+    """
+    missing = [
+        att for att in embedded_attachments if not _is_attachment_cached(issue_key, att)
+    ]
+    if not missing:
+        logger.info("✅ All embedded attachments already cached - no wait needed")
+        return []
+
+    waiter = {
+        "pending": missing,
+        "future": asyncio.get_running_loop().create_future(),
+        "created": time.monotonic(),
+    }
+    ATTACHMENT_WAITERS[issue_key].append(waiter)
+    deadline = get_attachment_wait_deadline()
+
+    logger.info(
+        f"⏳ Waiting up to {deadline:.1f}s for {len(missing)} attachments of {issue_key}"
+    )
+    try:
+        await asyncio.wait_for(waiter["future"], timeout=deadline)
+        logger.info(
+            f"✅ All attachments arrived in {time.monotonic() - waiter['created']:.2f}s"
+        )
+    except asyncio.TimeoutError:
+        logger.warning(
+            f"⏰ Attachment wait deadline expired, {len(waiter['pending'])} still missing"
+        )
+        # Запізнення не менше за дедлайн - інакше оцінка могла б лише зменшуватись
+        _record_attachment_lag(deadline)
+    finally:
+        waiters = ATTACHMENT_WAITERS.get(issue_key, [])
+        if waiter in waiters:
+            waiters.remove(waiter)
+        if not waiters:
+            ATTACHMENT_WAITERS.pop(issue_key, None)
+
+    return waiter["pending"]
+
+
+def register_late_attachment_followup(
+    issue_key: str,
+    chat_id: str,
+    missing: List[Dict[str, Any]],
+    comment_arrived: Optional[float] = None,
+) -> None:
+    """
+    Запам'ятовує файли коментаря, які потрібно дослати, коли вони прибудуть.
+    comment_arrived (monotonic) - час надходження коментаря, від якого
+    рахується запізнення вкладень.
+    """
+    now = time.monotonic()
+    LATE_ATTACHMENT_FOLLOWUPS[issue_key].append(
+        {
+            "chat_id": chat_id,
+            "pending": list(missing),
+            "created": now,
+            "comment_arrived": comment_arrived or now,
+        }
+    )
+    logger.info(
+        f"📬 Registered follow-up for {len(missing)} late attachments of {issue_key}"
+    )
+
+
+def _remove_attachment_from_caches(issue_key: str, attachment: Dict[str, Any]) -> None:
+    """Видаляє вкладення з обох кешів, щоб не надіслати його повторно"""
+    attachment_id = attachment.get("id")
+    if issue_key in PENDING_ATTACHMENTS_CACHE:
+        remaining = [
+            item
+            for item in PENDING_ATTACHMENTS_CACHE[issue_key]
+            if item["attachment"] is not attachment
+            and (not attachment_id or item.get("attachment_id") != attachment_id)
+        ]
+        if remaining:
+            PENDING_ATTACHMENTS_CACHE[issue_key] = remaining
+        else:
+            del PENDING_ATTACHMENTS_CACHE[issue_key]
+    if attachment_id:
+        ATTACHMENT_ID_CACHE.pop(attachment_id, None)
+
+
+async def notify_attachment_arrived(
+    issue_key: Optional[str], attachment: Dict[str, Any]
+) -> bool:
+    """
+    Повідомляє коментарі, що чекають, про нове вкладення.
+    Якщо коментар вже відправлено без цього файлу - досилає файл окремо.
+
+    Args:
+        issue_key: Ключ задачі (None, якщо невідомий)
+        attachment: Дані вкладення з attachment_created події
+
+    Returns:
+        bool: True якщо вкладення надіслано як follow-up
+    """
+    now = time.monotonic()
+
+    waiter_keys = [issue_key] if issue_key else list(ATTACHMENT_WAITERS.keys())
+    for key in waiter_keys:
+        for waiter in ATTACHMENT_WAITERS.get(key, []):
+            matched = [e for e in waiter["pending"] if _attachment_matches(e, attachment)]
+            if not matched:
+                continue
+            for embedded in matched:
+                waiter["pending"].remove(embedded)
+            _record_attachment_lag(now - waiter["created"])
+            if not waiter["pending"] and not waiter["future"].done():
+                waiter["future"].set_result(True)
+            # Коментар, що чекає, сам забере файл з кешу
+            return False
+
+    followup_keys = [issue_key] if issue_key else list(LATE_ATTACHMENT_FOLLOWUPS.keys())
+    for key in followup_keys:
+        for followup in LATE_ATTACHMENT_FOLLOWUPS.get(key, []):
+            matched = [
+                e for e in followup["pending"] if _attachment_matches(e, attachment)
+            ]
+            if not matched:
+                continue
+            for embedded in matched:
+                followup["pending"].remove(embedded)
+            if not followup["pending"]:
+                LATE_ATTACHMENT_FOLLOWUPS[key].remove(followup)
+                if not LATE_ATTACHMENT_FOLLOWUPS[key]:
+                    del LATE_ATTACHMENT_FOLLOWUPS[key]
+            _record_attachment_lag(now - followup["comment_arrived"])
+            _remove_attachment_from_caches(key, attachment)
+
+            logger.info(
+                f"📬 Late attachment {attachment.get('filename', 'unknown')} for {key} - sending as follow-up"
+            )
+            await process_attachments_universal([attachment], key, followup["chat_id"])
+            return True
+
+    return False
+
+
 def files_match(filename1: str, filename2: str) -> bool:
     """
     Перевіряє, чи відповідають два імені файлів (з урахуванням можливих відмінностей).
@@ -2168,6 +2905,16 @@ async def setup_webhook_server(
     # Зберігаємо Telegram application в app state для використання в webhook handler
     web_app["telegram_app"] = app
 
+    # Запускаємо воркери черги вебхуків і відтворюємо незавершені події
+    await get_webhook_dispatcher().start()
+    file_cache = get_telegram_file_cache()
+    if file_cache is not None:
+        await file_cache.open()
+    spool = get_webhook_spool()
+    if spool is not None:
+        await spool.open()
+        await replay_spooled_webhooks()
+
     # Налаштовуємо маршрути
     web_app.router.add_post("/rest/webhooks/webhook1", handle_webhook)  # Jira webhooks
     web_app.router.add_post(
@@ -2176,8 +2923,30 @@ async def setup_webhook_server(
 
     # Налаштуємо додатковий маршрут для простої перевірки роботи вебхуку
     async def ping(request):
+        outbox = get_jira_outbox()
+        refresher = get_issue_status_refresher()
         return web.json_response(
-            {"status": "ok", "message": "Webhook server is running", "max_size": "50MB"}
+            {
+                "status": "ok",
+                "message": "Webhook server is running",
+                "max_size": "50MB",
+                "queue": get_webhook_dispatcher().get_stats(),
+                "jira_rate": get_jira_client().governor.get_stats(),
+                "jira_circuit": get_jira_client().breaker.get_stats(),
+                "jira_outbox": outbox.get_stats() if outbox is not None else None,
+                "issue_creation": get_issue_creation_stats(),
+                "create_meta": get_create_meta_stats(),
+                "spool": spool.get_stats() if spool is not None else None,
+                "user_state": user_state_manager.get_stats(),
+                "attachments": get_attachment_pipeline_stats(),
+                "telegram": get_telegram_client().scheduler.get_stats(),
+                "file_cache": (
+                    file_cache.get_stats() if file_cache is not None else None
+                ),
+                "status_refresher": (
+                    refresher.get_stats() if refresher is not None else None
+                ),
+            }
         )
 
     web_app.router.add_get("/rest/webhooks/ping", ping)
@@ -197,6 +197,26 @@ async def init_bot():
             .build()
         )
 
+        # Відкриваємо спільний пул з'єднань до Jira
+        from src.jira_client import init_jira_client
+
+        await init_jira_client()
+
+        # Запускаємо фонову доставку відкладених записів у Jira
+        from src.jira_outbox import start_jira_outbox
+
+        await start_jira_outbox()
+
+        # Завантажуємо метадані екрану створення задач для локальної перевірки полів
+        from src.services import refresh_create_meta
+
+        await refresh_create_meta()
+
+        # Запускаємо фонову звірку статусів поточних задач
+        from src.issue_status_refresher import start_issue_status_refresher
+
+        await start_issue_status_refresher()
+
         # Реєструємо всі хендлери
         from src.handlers import register_handlers
 
@@ -324,6 +344,7 @@ async def main():
 
         # Импортируем менеджер пользователей для синхронизации
         from user_management_service import user_manager
+        from src.google_sheets_service import arefresh_users_directory
 
         try:
             sync_counter = 0
@@ -331,10 +352,18 @@ async def main():
                 await asyncio.sleep(60)  # Перевірка кожну хвилину
                 sync_counter += 1
 
+                # Кожні 5 хвилин оновлюємо знімок таблиці користувачів,
+                # щоб пошук у обробниках не чекав на завантаження
+                if sync_counter % 5 == 0:
+                    try:
+                        await arefresh_users_directory()
+                    except Exception as e:
+                        logger.error(f"Помилка оновлення довідника користувачів: {e}")
+
                 # Кожні 10 хвилин запускаємо синхронізацію
                 if sync_counter % 10 == 0:
                     try:
-                        result = user_manager.sync_pending_users()
+                        result = await user_manager.sync_pending_users()
                         if result["synced"] > 0 or result["failed"] > 0:
                             logger.info(
                                 f"🔄 Синхронізація: {result['synced']} успішно, {result['failed']} помилок"
@@ -348,6 +377,29 @@ async def main():
             await application.updater.stop()
             await application.stop()
 
+            from src.jira_client import close_jira_client
+            from src.jira_outbox import close_jira_outbox
+            from src.issue_status_refresher import close_issue_status_refresher
+            from src.telegram_client import close_telegram_client
+            from src.google_sheets_service import shutdown_sheets_executor
+            from src.webhook_dispatcher import stop_webhook_dispatcher
+            from src.webhook_spool import close_webhook_spool
+            from src.telegram_file_cache import close_telegram_file_cache
+
+            await stop_webhook_dispatcher()
+            await close_webhook_spool()
+            await close_telegram_file_cache()
+            await close_issue_status_refresher()
+            await close_jira_outbox()
+            await close_jira_client()
+            await close_telegram_client()
+            shutdown_sheets_executor()
+
+            # Записуємо на диск стани користувачів, які ще в пам'яті
+            from src.user_state_service import flush_user_states
+
+            flush_user_states()
+
     except KeyboardInterrupt:
         logger.info("Отримано команду на завершення")
     except Exception as e:
@@ -1,24 +1,72 @@
 import logging
 import asyncio
+import copy
 import json
-from typing import Dict, Any, List, Optional
+import functools
+import time
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 import httpx
-from src.field_mapping import FIELD_MAP
-from utils.jira_field_mappings import get_field_value_by_name
+from src.field_mapping import DEFAULT_PROJECT_KEY, FIELD_PLAN
 from config.config import (
     JIRA_BASE_URL,
     JIRA_EMAIL,
     JIRA_API_TOKEN,
     JIRA_PROJECT_KEY,
+    JIRA_ISSUE_TYPE,
     JIRA_REPORTER_ACCOUNT_ID,
+    ISSUE_CACHE_TTL,
+    ISSUE_OWNER_CACHE_TTL,
+    ISSUE_DONE_LOOKBACK_DAYS,
+    JIRA_CREATE_CONSISTENCY,
+    JIRA_CREATEMETA_TTL,
+)
+from src.jira_client import (
+    JiraCircuitOpenError,
+    get_jira_client,
+    OPERATION_UPLOAD,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_BACKGROUND,
 )
-from src.constants import JIRA_FIELD_MAPPINGS
 
 
 class JiraApiError(Exception):
     """Custom exception for Jira API errors"""
 
 
+class JiraUnavailableError(JiraApiError):
+    """Jira тимчасово недоступна (запобіжник розімкнено) - запит не виконувався"""
+
+
+# Ключ властивості (entity property), якою позначаються коментарі і задачі,
+# створені з черги записів: за нею повторна спроба знаходить вже доставлений запис
+OUTBOX_PROPERTY_KEY = "tgbot.outbox"
+
+
+def is_retryable_jira_error(error: BaseException) -> bool:
+    """
+    Чи варто повторити запис пізніше: Jira недоступна, мережева помилка,
+    таймаут, 429 або 5xx. Помилки валідації (4xx) повтор не виправить.
+    """
+    seen = set()
+    current: Optional[BaseException] = error
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+        if isinstance(current, (JiraUnavailableError, httpx.RequestError)):
+            return True
+        if isinstance(current, httpx.HTTPStatusError):
+            status_code = current.response.status_code
+            return status_code == 429 or status_code >= 500
+        current = current.__cause__ or current.__context__
+    return False
+
+
+def _outbox_properties(idempotency_key: Optional[str]) -> List[Dict[str, Any]]:
+    if not idempotency_key:
+        return []
+    return [{"key": OUTBOX_PROPERTY_KEY, "value": {"id": idempotency_key}}]
+
+
 # HTTP Basic Auth для Jira
 AUTH = (JIRA_EMAIL, JIRA_API_TOKEN)
 HEADERS_JSON = {
@@ -41,10 +89,6 @@ async def _make_request(method: str, url: str, **kwargs) -> Dict[str, Any]:
     Raises:
         JiraApiError: For API errors, network errors, or timeouts
     """
-    # Define default timeouts if not provided
-    if "timeout" not in kwargs:
-        kwargs["timeout"] = httpx.Timeout(10.0, connect=5.0)
-
     # Maximum number of retry attempts
     max_retries = 3
     retry_delay = 1  # Initial delay in seconds
@@ -57,15 +101,14 @@ async def _make_request(method: str, url: str, **kwargs) -> Dict[str, Any]:
         f"Request body: {json.dumps(request_body, indent=2, ensure_ascii=False)}"
     )
 
-    # Use default AUTH
-    auth = AUTH
+    # Спільний пул з'єднань Jira (auth та таймаути налаштовані в клієнті)
+    jira_client = get_jira_client()
 
     for attempt in range(max_retries):
         try:
-            async with httpx.AsyncClient(auth=auth) as client:
-                response = await client.request(method, url, **kwargs)
-                response.raise_for_status()
-                return response.json()
+            response = await jira_client.request(method, url, **kwargs)
+            response.raise_for_status()
+            return response.json()
         except (httpx.ConnectTimeout, httpx.ReadTimeout) as e:
             if attempt == max_retries - 1:
                 # This was the last attempt
@@ -138,6 +181,9 @@ async def _make_request(method: str, url: str, **kwargs) -> Dict[str, Any]:
             raise JiraApiError(error_msg) from e
         except httpx.RequestError as e:
             raise JiraApiError(f"Network error: {str(e)}") from e
+        except JiraCircuitOpenError as e:
+            logger.warning(f"Jira недоступна, запит {method} {url} відхилено: {e}")
+            raise JiraUnavailableError(str(e)) from e
 
     # This point should never be reached, but added for type safety
     raise JiraApiError(
@@ -148,6 +194,7 @@ async def _make_request(method: str, url: str, **kwargs) -> Dict[str, Any]:
 def build_jira_payload(bot_vars: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
     """
     Формує JSON для Jira Issue на основі bot_vars і FIELD_MAP.
+    Використовує план полів, скомпільований при старті (FIELD_PLAN).
 
     Args:
         bot_vars (Dict[str, Any]): Словник з ключами, як у YAML
@@ -159,120 +206,332 @@ def build_jira_payload(bot_vars: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
     Examples:
         >>> vars = {"summary": "Test Issue", "issuetype": "Task"}
         >>> build_jira_payload(vars)
-        {'fields': {'summary': 'Test Issue', 'issuetype': {'name': 'Task'}}}
+        {'fields': {'summary': 'Test Issue', 'issuetype': {'name': 'Task'}, 'project': {'key': 'SD'}}}
     """
-    fields: Dict[str, Any] = {}
-    logger = logging.getLogger(__name__)
+    fields = FIELD_PLAN.build(bot_vars)
+    logging.getLogger(__name__).debug(f"Jira payload fields: {list(fields)}")
+    return {"fields": fields}
 
-    # Обязательно добавляем проект если он не был добавлен ранее
-    if "project" in bot_vars and "project" not in fields:
-        fields["project"] = {"key": bot_vars["project"]}
 
-    # Маппінг полів з вкладеними об'єктами
-    nested_fields = {
-        "issuetype.name": ("issuetype", "name"),
-        "reporter.accountId": ("reporter", "accountId"),
-        "project.key": ("project", "key"),
-    }
+# === Перевірка створених задач ===
+# POST /issue вже повертає ключ створеної задачі, тому повторний GET - лише
+# страховка. Режим задається JIRA_CREATE_CONSISTENCY.
+CONSISTENCY_TRUST = "trust"
+CONSISTENCY_ASYNC_VERIFY = "async-verify"
+CONSISTENCY_SYNC_VERIFY = "sync-verify"
+
+_issue_creation_stats: Dict[str, Any] = {
+    "created": 0,
+    "create_seconds_total": 0.0,
+    "verified": 0,
+    "mismatches": 0,
+    "verify_errors": 0,
+    "verify_seconds_total": 0.0,
+}
+# Посилання на фонові перевірки, щоб їх не прибрав збирач сміття
+_background_verifications: set = set()
 
-    for var_name, value in bot_vars.items():
-        jira_field = FIELD_MAP.get(var_name)
-        if not jira_field or value is None:
-            continue
 
-        # Log field mapping for debugging
-        logger.info(f"Mapping field {var_name} -> {jira_field} = {value}")
-
-        # Обробка базових полів
-        if jira_field == "summary":
-            fields[jira_field] = str(value)
-        elif jira_field == "customfield_10145":  # telegram_id field
-            fields[jira_field] = str(value)
-        elif jira_field == "customfield_10146":  # telegram_username field
-            # Only add telegram_username if it has a value
-            if value and str(value).strip():
-                fields[jira_field] = str(value)
-        elif jira_field == "description":
-            # Convert to Atlassian Document Format
-            fields[jira_field] = {
-                "version": 1,
-                "type": "doc",
-                "content": [
-                    {
-                        "type": "paragraph",
-                        "content": [{"type": "text", "text": str(value)}],
-                    }
-                ],
-            }
-            logger.info("Converting description to Atlassian Document Format")
-
-        # Обробка вкладених полів
-        elif jira_field in nested_fields:
-            parent, child = nested_fields[jira_field]
-            fields.setdefault(parent, {})[child] = value
-
-        # Обробка кастомних полів
-        elif jira_field in (
-            "customfield_10069",
-            "customfield_10065",
-            "customfield_10068",
-        ):
-            # These are select fields that need specific format with ID
-            if isinstance(value, dict) and ("name" in value or "id" in value):
-                # Value is already properly formatted
-                fields[jira_field] = value
-            else:
-                # Get properly formatted field value using our centralized mappings
-                str_value = str(value)
-
-                # Маппинг кастомных полей в типы полей
-                field_type_mapping = {
-                    "customfield_10069": "division",
-                    "customfield_10065": "department",
-                    "customfield_10068": "service",
+async def _verify_created_issue(issue_key: str) -> None:
+    """Перечитує щойно створену задачу і пише алерт у лог, якщо ключ не збігся"""
+    logger = logging.getLogger(__name__)
+    started = time.monotonic()
+    try:
+        verification = await _make_request(
+            "GET",
+            f"{JIRA_BASE_URL}/rest/api/3/issue/{issue_key}",
+            params={"fields": "status"},
+            headers=HEADERS_JSON,
+            priority=PRIORITY_BACKGROUND,
+        )
+        if verification and verification.get("key") == issue_key:
+            _issue_creation_stats["verified"] += 1
+            logger.info(f"Успешно подтверждено создание задачи с ключом: {issue_key}")
+        else:
+            _issue_creation_stats["mismatches"] += 1
+            logger.error(
+                f"🚨 Створена задача {issue_key} не пройшла перевірку: "
+                f"Jira повернула {verification.get('key') if verification else None}"
+            )
+    except Exception as e:
+        # Помилка перевірки не скасовує створення задачі
+        _issue_creation_stats["verify_errors"] += 1
+        logger.warning(f"Created issue {issue_key} but verification failed: {str(e)}")
+    finally:
+        _issue_creation_stats["verify_seconds_total"] += time.monotonic() - started
+
+
+def get_issue_creation_stats() -> Dict[str, Any]:
+    """Метрики створення задач для status endpoint"""
+    stats = dict(_issue_creation_stats)
+    checks = stats["verified"] + stats["mismatches"] + stats["verify_errors"]
+    stats["mode"] = JIRA_CREATE_CONSISTENCY
+    stats["pending_verifications"] = len(_background_verifications)
+    stats["avg_create_seconds"] = (
+        round(stats["create_seconds_total"] / stats["created"], 3)
+        if stats["created"]
+        else 0.0
+    )
+    stats["avg_verify_seconds"] = (
+        round(stats["verify_seconds_total"] / checks, 3) if checks else 0.0
+    )
+    return stats
+
+
+# === Метадані екрану створення задач (createmeta) ===
+# Допустимі значення select-полів і обов'язкові поля кешуються при старті та
+# оновлюються раз на JIRA_CREATEMETA_TTL, щоб payload перевірявся локально і
+# задача зазвичай створювалась одним POST без повторів з видаленням полів.
+
+# Структура: {(project_key, issuetype_name): (fetched_at, {field_id: meta})},
+# meta = {"name": str, "required": bool, "allowed": {option_id: label} | None}
+_create_meta_cache: Dict[Tuple[str, str], Tuple[float, Dict[str, Dict[str, Any]]]] = {}
+_create_meta_refreshes: Dict[Tuple[str, str], asyncio.Task] = {}
+# Поля, які Jira заповнює сама і які не перевіряємо за екраном створення
+CREATE_META_SKIP_FIELDS = frozenset({"project", "issuetype"})
+CREATE_META_PAGE_SIZE = 200
+
+_create_meta_stats: Dict[str, int] = {
+    "refreshes": 0,
+    "refresh_errors": 0,
+    "validated": 0,
+    "unvalidated": 0,
+    "fields_dropped": 0,
+    "fields_fixed": 0,
+    "invalidated": 0,
+}
+
+
+def _create_meta_key(payload_fields: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    project = payload_fields.get("project")
+    issuetype = payload_fields.get("issuetype")
+    project_key = project.get("key") if isinstance(project, dict) else project
+    issuetype_name = issuetype.get("name") if isinstance(issuetype, dict) else issuetype
+    if not project_key or not issuetype_name:
+        return None
+    return str(project_key), str(issuetype_name)
+
+
+async def _fetch_create_meta(
+    project_key: str, issuetype_name: str
+) -> Dict[str, Dict[str, Any]]:
+    """Завантажує поля екрану створення для типу задачі (фоновий пріоритет)"""
+    base_url = f"{JIRA_BASE_URL}/rest/api/3/issue/createmeta/{project_key}/issuetypes"
+    issuetype_id = None
+    start_at = 0
+    while issuetype_id is None:
+        page = await _make_request(
+            "GET",
+            base_url,
+            params={"startAt": start_at, "maxResults": CREATE_META_PAGE_SIZE},
+            headers=HEADERS_JSON,
+            priority=PRIORITY_BACKGROUND,
+        )
+        issue_types = page.get("issueTypes") or page.get("values") or []
+        for issue_type in issue_types:
+            if str(issue_type.get("name", "")).lower() == issuetype_name.lower():
+                issuetype_id = issue_type.get("id")
+                break
+        start_at += len(issue_types)
+        if not issue_types or start_at >= page.get("total", start_at):
+            break
+    if issuetype_id is None:
+        raise JiraApiError(
+            f"Issue type '{issuetype_name}' not found in project {project_key}"
+        )
+
+    field_meta: Dict[str, Dict[str, Any]] = {}
+    start_at = 0
+    while True:
+        page = await _make_request(
+            "GET",
+            f"{base_url}/{issuetype_id}",
+            params={"startAt": start_at, "maxResults": CREATE_META_PAGE_SIZE},
+            headers=HEADERS_JSON,
+            priority=PRIORITY_BACKGROUND,
+        )
+        page_fields = page.get("fields") or page.get("results") or []
+        for field in page_fields:
+            field_id = field.get("fieldId") or field.get("key")
+            if not field_id:
+                continue
+            allowed = None
+            if "allowedValues" in field:
+                allowed = {
+                    str(option["id"]): str(option.get("value") or option.get("name"))
+                    for option in field["allowedValues"]
+                    if isinstance(option, dict) and "id" in option
                 }
+            field_meta[field_id] = {
+                "name": field.get("name", field_id),
+                "required": bool(field.get("required"))
+                and not field.get("hasDefaultValue"),
+                "allowed": allowed,
+            }
+        start_at += len(page_fields)
+        if not page_fields or start_at >= page.get("total", start_at):
+            break
+    return field_meta
 
-                # Получаем тип поля для использования в get_field_value_by_name
-                field_type = field_type_mapping.get(jira_field)
 
-                if field_type:
-                    fields[jira_field] = get_field_value_by_name(str_value, field_type)
-                    logger.info(
-                        f"Using field mapping for {jira_field}: {str_value} -> {fields[jira_field]}"
-                    )
-                else:
-                    fields[jira_field] = {"name": str_value}
-                    logger.warning(
-                        f"Unknown field type for {jira_field}, using default format: {fields[jira_field]}"
-                    )
+async def refresh_create_meta(
+    project_key: Optional[str] = None, issuetype_name: Optional[str] = None
+) -> bool:
+    """
+    Оновлює кеш метаданих створення задач. Без аргументів - для проєкту й типу
+    задачі з конфігурації. Повертає False, якщо Jira не відповіла (у кеші
+    лишаються попередні дані).
+    """
+    logger = logging.getLogger(__name__)
+    key = (
+        project_key or JIRA_PROJECT_KEY or DEFAULT_PROJECT_KEY,
+        issuetype_name or JIRA_ISSUE_TYPE,
+    )
+    if not key[1]:
+        return False
+    try:
+        field_meta = await _fetch_create_meta(*key)
+    except Exception as e:
+        _create_meta_stats["refresh_errors"] += 1
+        logger.warning(f"Не вдалося оновити createmeta для {key[0]}/{key[1]}: {e}")
+        return False
+    _create_meta_cache[key] = (time.monotonic(), field_meta)
+    _create_meta_stats["refreshes"] += 1
+    logger.info(
+        f"Метадані створення задач {key[0]}/{key[1]} оновлено: {len(field_meta)} полів"
+    )
+    return True
+
+
+async def _get_create_meta(
+    key: Tuple[str, str]
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Повертає метадані з кешу. Прострочений запис віддається одразу, а
+    оновлення запускається у фоні; за відсутності запису - одне завантаження.
+    """
+    entry = _create_meta_cache.get(key)
+    if entry is None:
+        await refresh_create_meta(*key)
+        entry = _create_meta_cache.get(key)
+        return entry[1] if entry else None
+
+    fetched_at, field_meta = entry
+    if fetched_at + JIRA_CREATEMETA_TTL < time.monotonic():
+        task = _create_meta_refreshes.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(refresh_create_meta(*key))
+            _create_meta_refreshes[key] = task
+    return field_meta
+
+
+def _invalidate_create_meta(payload_fields: Dict[str, Any]) -> None:
+    """Скидає метадані, за якими payload пройшов перевірку, але Jira його відхилила"""
+    key = _create_meta_key(payload_fields)
+    if key and _create_meta_cache.pop(key, None) is not None:
+        _create_meta_stats["invalidated"] += 1
+
+
+def _check_option(
+    value: Any, allowed: Dict[str, str]
+) -> Tuple[Optional[Dict[str, str]], bool]:
+    """Повертає ({"id"} або None якщо значення недопустиме, чи змінювали формат)"""
+    if isinstance(value, dict) and "id" in value:
+        option_id = str(value["id"])
+        return ({"id": option_id} if option_id in allowed else None), False
+    label = value.get("value", value.get("name")) if isinstance(value, dict) else value
+    for option_id, option_label in allowed.items():
+        if option_label == str(label):
+            return {"id": option_id}, True
+    return None, False
+
+
+async def _validate_with_create_meta(payload: Dict[str, Any]) -> bool:
+    """
+    Перевіряє поля payload за метаданими екрану створення: прибирає поля,
+    яких немає на екрані, та select-значення поза списком допустимих, а
+    назви варіантів замінює їх ID. Повертає False, якщо метадані недоступні.
+
+    Raises:
+        JiraApiError: Якщо після перевірки бракує обов'язкових полів
+    """
+    logger = logging.getLogger(__name__)
+    payload_fields = payload["fields"]
+    key = _create_meta_key(payload_fields)
+    field_meta = await _get_create_meta(key) if key else None
+    if field_meta is None:
+        _create_meta_stats["unvalidated"] += 1
+        return False
+
+    for field_id in list(payload_fields):
+        if field_id in CREATE_META_SKIP_FIELDS:
+            continue
+        meta = field_meta.get(field_id)
+        if meta is None:
+            logger.warning(f"Поле {field_id} відсутнє на екрані створення - видаляю")
+            del payload_fields[field_id]
+            _create_meta_stats["fields_dropped"] += 1
+            continue
+        if meta["allowed"] is None:
+            continue
+
+        value = payload_fields[field_id]
+        if isinstance(value, list):
+            checked = [_check_option(item, meta["allowed"]) for item in value]
+            options = [option for option, _ in checked if option is not None]
+            fixed = any(was_fixed for _, was_fixed in checked)
+            valid = len(options) == len(value)
+            new_value: Any = options
         else:
-            fields[jira_field] = value
+            new_value, fixed = _check_option(value, meta["allowed"])
+            valid = new_value is not None
+        if not valid:
+            logger.warning(
+                f"Значення {value} поля {meta['name']} ({field_id}) "
+                f"недопустиме за createmeta - видаляю"
+            )
+            _create_meta_stats["fields_dropped"] += 1
+        elif fixed:
+            _create_meta_stats["fields_fixed"] += 1
+        if new_value:
+            payload_fields[field_id] = new_value
+        else:
+            del payload_fields[field_id]
+
+    missing = [
+        f"{meta['name']} ({field_id})"
+        for field_id, meta in field_meta.items()
+        if meta["required"]
+        and field_id not in payload_fields
+        and field_id not in CREATE_META_SKIP_FIELDS
+    ]
+    if missing:
+        raise JiraApiError(f"Missing required fields: {', '.join(missing)}")
 
-    # Проверка наличия обязательных полей
-    if "project" not in fields:
-        fields["project"] = {"key": "SD"}  # Устанавливаем проект по умолчанию
-
-    # Проверяем, что поле issuetype правильно сформировано
-    if (
-        "issuetype" in fields
-        and isinstance(fields["issuetype"], dict)
-        and "name" not in fields["issuetype"]
-    ):
-        # Если issuetype — словарь без name, добавляем name
-        if isinstance(bot_vars.get("issuetype"), str):
-            fields["issuetype"]["name"] = bot_vars["issuetype"]
-    elif "issuetype" in fields and not isinstance(fields["issuetype"], dict):
-        # Если issuetype не словарь, преобразуем его
-        value = fields["issuetype"]
-        fields["issuetype"] = {"name": value}
+    _create_meta_stats["validated"] += 1
+    return True
 
-    return {"fields": fields}
 
+def get_create_meta_stats() -> Dict[str, Any]:
+    """Метрики кешу createmeta для status endpoint"""
+    now = time.monotonic()
+    stats: Dict[str, Any] = dict(_create_meta_stats)
+    stats["cached"] = {
+        f"{project_key}/{issuetype_name}": round(now - fetched_at)
+        for (project_key, issuetype_name), (fetched_at, _) in _create_meta_cache.items()
+    }
+    return stats
 
-async def create_jira_issue(fields: Dict) -> str:
+
+async def create_jira_issue(fields: Dict, idempotency_key: Optional[str] = None) -> str:
     """
     Створює нову задачу в Jira.
 
+    Args:
+        fields: Payload задачі
+        idempotency_key: Ключ черги записів - зберігається властивістю задачі,
+            щоб черга могла знайти задачу, якщо відповідь на POST втрачено
+
     Raises:
         JiraApiError: If API request fails or response is invalid
     """
@@ -311,6 +570,12 @@ async def create_jira_issue(fields: Dict) -> str:
             f"Автоматически исправлен формат поля issuetype: {issuetype_field} -> {fields['fields']['issuetype']}"
         )
 
+    if idempotency_key:
+        fields["properties"] = _outbox_properties(idempotency_key)
+
+    # Перевіряємо поля за метаданими екрану створення до першого POST
+    validated = await _validate_with_create_meta(fields)
+
     # Список проблемных полей, которые могут вызвать ошибки валидации
     problematic_fields = []
     # Определяем кастомные поля, которые могут быть проблемными
@@ -323,8 +588,10 @@ async def create_jira_issue(fields: Dict) -> str:
     # Сохраняем оригинальный payload для логов
     original_fields = json.loads(json.dumps(fields))
 
-    # Максимальное количество попыток создания задачи с удалением проблемных полей
-    max_attempts = 4  # Одна попытка с полным payload + до 3 попыток с удалением полей
+    # Максимальное количество попыток создания задачи с удалением проблемных полей.
+    # Повтори лишаються і для payload, перевіреного за createmeta: reporter і
+    # права доступу createmeta не перевіряє, а кеш метаданих міг застаріти.
+    max_attempts = 4
     attempt = 1
 
     while attempt <= max_attempts:
@@ -374,34 +641,6 @@ async def create_jira_issue(fields: Dict) -> str:
                             f"Fixed nested reporter accountId format: {accountId}"
                         )
 
-            # Process custom fields
-            for cf_id, cf_name in custom_fields.items():
-                if (
-                    cf_id in fields.get("fields", {})
-                    and cf_id not in problematic_fields
-                ):
-                    value = fields["fields"][cf_id]
-                    # Ensure the field has the correct format
-                    if isinstance(value, dict) and ("id" in value or "name" in value):
-                        logger.info(
-                            f"Field {cf_name} ({cf_id}) already in correct format: {value}"
-                        )
-                    else:
-                        # If the value is a string, we need to convert it to a proper format
-                        str_value = (
-                            str(value)
-                            if not isinstance(value, dict)
-                            else str(value.get("name", ""))
-                        )
-
-                        # Use our centralized field mappings to format the value
-                        fields["fields"][cf_id] = get_field_value_by_name(
-                            cf_id, str_value
-                        )
-                        logger.info(
-                            f"Using field mapping for {cf_name} ({cf_id}): {str_value} -> {fields['fields'][cf_id]}"
-                        )
-
             # Ensure description is in Atlassian Document Format
             if "description" in fields.get("fields", {}) and not isinstance(
                 fields["fields"]["description"], dict
@@ -420,6 +659,7 @@ async def create_jira_issue(fields: Dict) -> str:
                 logger.info("Fixed description format to Atlassian Document Format")
 
             # Make the API request
+            create_started = time.monotonic()
             response = await _make_request(
                 "POST", url, json=fields, headers=HEADERS_JSON
             )
@@ -430,27 +670,19 @@ async def create_jira_issue(fields: Dict) -> str:
                 )
                 raise JiraApiError("Failed to get issue key from response")
 
-            # Verify that the issue was created by fetching it
             issue_key = response["key"]
-            try:
-                # Quick check to confirm issue exists
-                verify_url = f"{JIRA_BASE_URL}/rest/api/3/issue/{issue_key}"
-                verification = await _make_request(
-                    "GET", verify_url, headers=HEADERS_JSON
-                )
-                if verification and verification.get("key") == issue_key:
-                    logger.info(
-                        f"Успешно подтверждено создание задачи с ключом: {issue_key}"
-                    )
-                else:
-                    logger.warning(
-                        f"Created issue {issue_key} but couldn't verify it properly"
-                    )
-            except Exception as e:
-                # Log but don't fail if verification has issues
-                logger.warning(
-                    f"Created issue {issue_key} but verification failed: {str(e)}"
-                )
+            _issue_creation_stats["created"] += 1
+            _issue_creation_stats["create_seconds_total"] += (
+                time.monotonic() - create_started
+            )
+
+            # Перевірка створеної задачі залежно від режиму узгодженості
+            if JIRA_CREATE_CONSISTENCY == CONSISTENCY_SYNC_VERIFY:
+                await _verify_created_issue(issue_key)
+            elif JIRA_CREATE_CONSISTENCY == CONSISTENCY_ASYNC_VERIFY:
+                task = asyncio.create_task(_verify_created_issue(issue_key))
+                _background_verifications.add(task)
+                task.add_done_callback(_background_verifications.discard)
 
             # Log which fields were removed in successful attempt
             if problematic_fields:
@@ -460,9 +692,17 @@ async def create_jira_issue(fields: Dict) -> str:
             else:
                 logger.info("✅ Задача успішно створена з усіма полями")
 
+            # Нова задача має з'явитися в списку відкритих задач користувача
+            telegram_id = fields["fields"].get("customfield_10145")
+            if telegram_id:
+                _open_issues_cache.pop(_normalize_telegram_id(telegram_id), None)
+
             logger.info(f"Успешно создана задача с ключом: {issue_key}")
             return issue_key
 
+        except JiraUnavailableError:
+            # Jira недоступна - повтор з іншими полями не допоможе
+            raise
         except JiraApiError as e:
             error_message = str(e)
             logger.error(f"Jira API Error (попытка {attempt}): {error_message}")
@@ -511,6 +751,10 @@ async def create_jira_issue(fields: Dict) -> str:
 
             # Если нашли проблемное поле и это не последняя попытка
             if field_to_remove and attempt < max_attempts:
+                if validated and field_to_remove != "reporter":
+                    # Допустимі значення змінились - наступна перевірка
+                    # завантажить свіжі метадані
+                    _invalidate_create_meta(fields["fields"])
                 problematic_fields.append(field_to_remove)
 
                 # Специальная обработка для поля reporter - заменить вместо удаления
@@ -563,13 +807,160 @@ async def create_jira_issue(fields: Dict) -> str:
     )
 
 
-async def get_issue_details(issue_key: str, fields: List[str]) -> Dict[str, Any]:
+# === Кеш статусів задач ===
+# Статуси задач і списки відкритих задач користувачів кешуються в пам'яті.
+# Вебхуки jira:issue_created/jira:issue_updated оновлюють кеш одразу,
+# а TTL лише страхує від пропущених подій.
+
+# Структура: {issue_key: (expires_at, {"name": str, "category": str})}
+_issue_status_cache: Dict[str, Tuple[float, Dict[str, str]]] = {}
+# Структура: {telegram_id: (expires_at, [{"key": str, "status": str}])}
+_open_issues_cache: Dict[str, Tuple[float, List[Dict[str, str]]]] = {}
+
+STATUS_CATEGORY_DONE = "Done"
+
+# Власник задачі (Telegram ID) не змінюється після створення, тому кешуємо
+# його надовго. Відсутність ID кешуємо коротше - поле могли заповнити пізніше.
+# Структура: {issue_key: (expires_at, telegram_id or None)}
+_issue_owner_cache: Dict[str, Tuple[float, Optional[str]]] = {}
+ISSUE_OWNER_NEGATIVE_TTL = 60
+ISSUE_OWNER_CACHE_MAX_SIZE = 10000  # після цього розміру чистимо прострочені записи
+
+# Запити get_issue_details, що виконуються зараз: однакові запити об'єднуються
+# Структура: {(issue_key, fields, priority): asyncio.Task}
+_inflight_issue_requests: Dict[Tuple[str, Tuple[str, ...], int], asyncio.Task] = {}
+
+
+def _normalize_telegram_id(telegram_id: Any) -> str:
+    return str(telegram_id).strip().replace("'", "").replace('"', "")
+
+
+def _cache_issue_status(issue_key: str, name: str, category: str) -> None:
+    _issue_status_cache[issue_key] = (
+        time.monotonic() + ISSUE_CACHE_TTL,
+        {"name": name, "category": category},
+    )
+
+
+def _get_cached_issue_status(
+    issue_key: str, allow_stale: bool = False
+) -> Optional[Dict[str, str]]:
+    """allow_stale: повернути прострочений запис (коли Jira недоступна)"""
+    entry = _issue_status_cache.get(issue_key)
+    if entry is None:
+        return None
+    expires_at, status = entry
+    if expires_at < time.monotonic() and not allow_stale:
+        return None
+    return dict(status)
+
+
+def _get_cached_open_issues(
+    telegram_id: str, allow_stale: bool = False
+) -> Optional[List[Dict[str, str]]]:
+    """allow_stale: повернути прострочений запис (коли Jira недоступна)"""
+    entry = _open_issues_cache.get(telegram_id)
+    if entry is None:
+        return None
+    expires_at, issues = entry
+    if expires_at < time.monotonic() and not allow_stale:
+        return None
+    return [dict(issue) for issue in issues]
+
+
+def _cache_issue_owner(issue_key: str, telegram_id: Optional[str]) -> None:
+    if len(_issue_owner_cache) >= ISSUE_OWNER_CACHE_MAX_SIZE:
+        now = time.monotonic()
+        for key, (expires_at, _) in list(_issue_owner_cache.items()):
+            if expires_at < now:
+                del _issue_owner_cache[key]
+    ttl = ISSUE_OWNER_CACHE_TTL if telegram_id else ISSUE_OWNER_NEGATIVE_TTL
+    _issue_owner_cache[issue_key] = (time.monotonic() + ttl, telegram_id)
+
+
+def invalidate_issue_cache(issue_key: str, telegram_id: Optional[str] = None) -> None:
+    """
+    Видаляє задачу з кешу статусів і скидає списки відкритих задач, що її містять.
+
+    Args:
+        issue_key: Ключ задачі
+        telegram_id: Telegram ID власника задачі (якщо відомий)
+    """
+    _issue_status_cache.pop(issue_key, None)
+    if telegram_id:
+        _open_issues_cache.pop(_normalize_telegram_id(telegram_id), None)
+    for cached_id, (_, issues) in list(_open_issues_cache.items()):
+        if any(issue["key"] == issue_key for issue in issues):
+            del _open_issues_cache[cached_id]
+
+
+def update_issue_cache_from_webhook(issue: Dict[str, Any]) -> None:
+    """
+    Оновлює кеш статусів за даними задачі з вебхука Jira
+    (jira:issue_created, jira:issue_updated).
+
+    Args:
+        issue: Об'єкт issue з тіла вебхука
+    """
+    logger = logging.getLogger(__name__)
+    issue_key = issue.get("key")
+    if not issue_key:
+        return
+
+    issue_fields = issue.get("fields") or {}
+    status = issue_fields.get("status") or {}
+    telegram_id = issue_fields.get("customfield_10145")
+    telegram_id = _normalize_telegram_id(telegram_id) if telegram_id else None
+    name = status.get("name")
+    category = (status.get("statusCategory") or {}).get("name")
+
+    if telegram_id:
+        _cache_issue_owner(issue_key, telegram_id)
+
+    if not name or not category:
+        # Вебхук без статусу - просто скидаємо кеш цієї задачі
+        invalidate_issue_cache(issue_key, telegram_id)
+        return
+
+    _cache_issue_status(issue_key, name, category)
+
+    # Оновлюємо списки відкритих задач, які містять цю задачу
+    owners = {
+        cached_id
+        for cached_id, (_, issues) in _open_issues_cache.items()
+        if any(cached["key"] == issue_key for cached in issues)
+    }
+    if telegram_id and telegram_id in _open_issues_cache:
+        owners.add(telegram_id)
+
+    for owner in owners:
+        expires_at, issues = _open_issues_cache[owner]
+        issues = [cached for cached in issues if cached["key"] != issue_key]
+        if category != STATUS_CATEGORY_DONE:
+            issues.append({"key": issue_key, "status": name})
+        _open_issues_cache[owner] = (expires_at, issues)
+
+    logger.debug(f"Кеш статусу {issue_key} оновлено з вебхука: {name} ({category})")
+
+
+def _finish_issue_request(request_key: Tuple[Any, ...], task: asyncio.Task) -> None:
+    _inflight_issue_requests.pop(request_key, None)
+    # Помилку забираємо тут: якщо всі очікувачі скасовані, asyncio інакше
+    # повідомить "Task exception was never retrieved"
+    if not task.cancelled():
+        task.exception()
+
+
+async def get_issue_details(
+    issue_key: str, fields: List[str], priority: int = PRIORITY_INTERACTIVE
+) -> Dict[str, Any]:
     """
     Отримує деталі задачі з Jira.
 
     Args:
         issue_key (str): Ключ задачі (e.g., "PRJ-123")
         fields (List[str]): Список полів для отримання
+        priority (int): Пріоритет запиту для обмежувача темпу Jira
 
     Raises:
         JiraApiError: If API request fails
@@ -578,9 +969,24 @@ async def get_issue_details(issue_key: str, fields: List[str]) -> Dict[str, Any]
     if not issue_key or not issue_key.strip():
         raise ValueError("Invalid issue key")
 
-    url = f"{JIRA_BASE_URL}/rest/api/3/issue/{issue_key}"
-    params = {"fields": ",".join(fields)}
-    return await _make_request("GET", url, params=params, headers=HEADERS_JSON)
+    # Однакові одночасні запити (напр. кілька вебхуків однієї задачі)
+    # виконуються одним HTTP викликом, результат отримують усі. Пріоритет
+    # входить у ключ: інтерактивний запит не чекає у фоновій черзі обмежувача
+    request_key = (issue_key, tuple(fields), priority)
+    task = _inflight_issue_requests.get(request_key)
+    if task is None:
+        url = f"{JIRA_BASE_URL}/rest/api/3/issue/{issue_key}"
+        params = {"fields": ",".join(fields)}
+        task = asyncio.ensure_future(
+            _make_request(
+                "GET", url, params=params, headers=HEADERS_JSON, priority=priority
+            )
+        )
+        _inflight_issue_requests[request_key] = task
+        task.add_done_callback(functools.partial(_finish_issue_request, request_key))
+
+    # shield: скасування одного з очікувачів не скасовує спільний запит
+    return copy.deepcopy(await asyncio.shield(task))
 
 
 async def find_open_issues(telegram_id: str) -> List[Dict[str, str]]:
@@ -602,6 +1008,14 @@ async def find_open_issues(telegram_id: str) -> List[Dict[str, str]]:
 
     # Додаємо логування
     logger = logging.getLogger(__name__)
+
+    cached_issues = _get_cached_open_issues(normalized_id)
+    if cached_issues is not None:
+        logger.info(
+            f"find_open_issues: {len(cached_issues)} задач для '{normalized_id}' з кешу"
+        )
+        return cached_issues
+
     logger.info(
         f"find_open_issues: пошук задач для Telegram ID: '{telegram_id}' (нормалізовано: '{normalized_id}')"
     )
@@ -612,26 +1026,20 @@ async def find_open_issues(telegram_id: str) -> List[Dict[str, str]]:
         f'AND "Telegram ID" ~ "{normalized_id}" '
         "AND statusCategory != Done"
     )
-    url = f"{JIRA_BASE_URL}/rest/api/3/search/jql"
     logger.info(f"find_open_issues: JQL запит: {jql}")
 
-    response = await _make_request(
-        "GET", url, params={"jql": jql, "fields": "status"}, headers=HEADERS_JSON
-    )
-
-    # Додаємо логування відповіді
-    logger.info(f"find_open_issues: відповідь від Jira: {str(response)[:200]}...")
-    logger.info(
-        f"find_open_issues: кількість issues в відповіді: {len(response.get('issues', []))}"
-    )
-
-    # Логуємо повну відповідь від Jira для діагностики
-    logger.info(
-        f"find_open_issues: відповідь від Jira: {json.dumps(response)[:200]}..."
-    )
+    try:
+        issues = await _search_issues(jql, ["status"])
+    except JiraUnavailableError:
+        # Jira недоступна - віддаємо останній відомий список, якщо він є
+        stale_issues = _get_cached_open_issues(normalized_id, allow_stale=True)
+        if stale_issues is None:
+            raise
+        logger.warning(
+            f"find_open_issues: Jira недоступна, повертаємо кешований список для '{normalized_id}'"
+        )
+        return stale_issues
 
-    # Перевіряємо наявність ключа issues в відповіді
-    issues = response.get("issues", [])
     logger.info(f"find_open_issues: кількість issues в відповіді: {len(issues)}")
 
     result = [
@@ -639,6 +1047,17 @@ async def find_open_issues(telegram_id: str) -> List[Dict[str, str]]:
         for issue in issues
     ]
 
+    # Кешуємо список і статуси задач (statusCategory приходить разом зі status)
+    _open_issues_cache[normalized_id] = (
+        time.monotonic() + ISSUE_CACHE_TTL,
+        [dict(issue) for issue in result],
+    )
+    for issue in issues:
+        status = issue["fields"]["status"]
+        category = status.get("statusCategory", {}).get("name")
+        if category:
+            _cache_issue_status(issue["key"], status["name"], category)
+
     logger.info(f"find_open_issues: знайдено {len(result)} задач")
     if result:
         for issue in result:
@@ -678,21 +1097,15 @@ async def find_done_issues(telegram_id: str) -> List[Dict[str, str]]:
         f'AND "Telegram ID" ~ "{normalized_id}" '
         "AND statusCategory = Done"
     )
-    url = f"{JIRA_BASE_URL}/rest/api/3/search/jql"
     logger.info(f"find_done_issues: JQL запит: {jql}")
 
-    response = await _make_request(
-        "GET", url, params={"jql": jql, "fields": "status"}, headers=HEADERS_JSON
-    )
+    issues = await _search_issues(jql, ["status"])
 
     # Логування відповіді
     logger.info(
-        f"find_done_issues: кількість завершених задач в відповіді: {len(response.get('issues', []))}"
+        f"find_done_issues: кількість завершених задач в відповіді: {len(issues)}"
     )
 
-    # Перевіряємо наявність ключа issues в відповіді
-    issues = response.get("issues", [])
-
     result = [
         {"key": issue["key"], "status": issue["fields"]["status"]["name"]}
         for issue in issues
@@ -708,8 +1121,152 @@ async def find_done_issues(telegram_id: str) -> List[Dict[str, str]]:
     return result
 
 
+# === Пошук задач ===
+# /search/jql віддає результати сторінками з nextPageToken. Відкриті й нещодавно
+# завершені задачі шукаються одним запитом, а для фонового оновлення - одразу
+# для багатьох користувачів.
+ISSUE_SEARCH_PAGE_SIZE = 100
+# Скільки Telegram ID об'єднується в один JQL (обмеження довжини запиту)
+ISSUE_SEARCH_USERS_PER_QUERY = 50
+TELEGRAM_ID_FIELD = "customfield_10145"
+
+
+async def _search_issues(
+    jql: str, fields: List[str], priority: int = PRIORITY_INTERACTIVE
+) -> List[Dict[str, Any]]:
+    """Виконує JQL-пошук і збирає задачі з усіх сторінок"""
+    url = f"{JIRA_BASE_URL}/rest/api/3/search/jql"
+    params: Dict[str, Any] = {
+        "jql": jql,
+        "fields": ",".join(fields),
+        "maxResults": ISSUE_SEARCH_PAGE_SIZE,
+    }
+    issues: List[Dict[str, Any]] = []
+    while True:
+        response = await _make_request(
+            "GET", url, params=params, headers=HEADERS_JSON, priority=priority
+        )
+        issues.extend(response.get("issues", []))
+        next_page_token = response.get("nextPageToken")
+        if response.get("isLast", True) or not next_page_token:
+            return issues
+        params["nextPageToken"] = next_page_token
+
+
+def _telegram_ids_jql(telegram_ids: List[str]) -> str:
+    """
+    Умова за Telegram ID. Поле текстове, а для текстових полів JQL не підтримує
+    "in", тому кілька ID об'єднуються через OR.
+    """
+    clauses = [f'"Telegram ID" ~ "{telegram_id}"' for telegram_id in telegram_ids]
+    return clauses[0] if len(clauses) == 1 else f"({' OR '.join(clauses)})"
+
+
+async def find_issues_for_users(
+    telegram_ids: List[str], priority: int = PRIORITY_BACKGROUND
+) -> Dict[str, Dict[str, List[Dict[str, str]]]]:
+    """
+    Шукає відкриті та нещодавно завершені задачі кількох користувачів
+    (по ISSUE_SEARCH_USERS_PER_QUERY ID на запит). Оновлює кеш відкритих задач
+    і статусів.
+
+    Returns:
+        {telegram_id: {"open": [{"key", "status"}], "done": [{"key", "status"}]}}
+    """
+    normalized_ids = list(
+        dict.fromkeys(
+            _normalize_telegram_id(telegram_id)
+            for telegram_id in telegram_ids
+            if telegram_id and _normalize_telegram_id(telegram_id)
+        )
+    )
+    result: Dict[str, Dict[str, List[Dict[str, str]]]] = {
+        telegram_id: {"open": [], "done": []} for telegram_id in normalized_ids
+    }
+
+    for start in range(0, len(normalized_ids), ISSUE_SEARCH_USERS_PER_QUERY):
+        chunk = normalized_ids[start : start + ISSUE_SEARCH_USERS_PER_QUERY]
+        jql = (
+            f"project = {JIRA_PROJECT_KEY} AND {_telegram_ids_jql(chunk)} "
+            "AND (statusCategory != Done "
+            f"OR statusCategoryChangedDate >= -{ISSUE_DONE_LOOKBACK_DAYS}d) "
+            "ORDER BY created DESC"
+        )
+        issues = await _search_issues(
+            jql, ["status", TELEGRAM_ID_FIELD], priority=priority
+        )
+        for issue in issues:
+            issue_fields = issue.get("fields") or {}
+            owner = _normalize_telegram_id(issue_fields.get(TELEGRAM_ID_FIELD) or "")
+            if owner not in result:
+                # "~" шукає входження: для одного ID приймаємо будь-який збіг
+                if len(chunk) != 1:
+                    continue
+                owner = chunk[0]
+            status = issue_fields["status"]
+            category = status.get("statusCategory", {}).get("name")
+            if category:
+                _cache_issue_status(issue["key"], status["name"], category)
+            bucket = "done" if category == STATUS_CATEGORY_DONE else "open"
+            result[owner][bucket].append(
+                {"key": issue["key"], "status": status["name"]}
+            )
+
+        expires_at = time.monotonic() + ISSUE_CACHE_TTL
+        for telegram_id in chunk:
+            _open_issues_cache[telegram_id] = (
+                expires_at,
+                [dict(issue) for issue in result[telegram_id]["open"]],
+            )
+
+    return result
+
+
+async def find_user_issues(
+    telegram_id: str,
+) -> Tuple[List[Dict[str, str]], List[Dict[str, str]]]:
+    """
+    Відкриті та нещодавно завершені задачі користувача одним пошуком.
+    Якщо Jira недоступна, повертає кешований список відкритих задач.
+
+    Returns:
+        (open_issues, done_issues)
+
+    Raises:
+        JiraApiError: If API request fails
+        ValueError: If telegram_id is invalid
+    """
+    normalized_id = _normalize_telegram_id(telegram_id) if telegram_id else ""
+    if not normalized_id:
+        raise ValueError("Invalid Telegram ID")
+
+    logger = logging.getLogger(__name__)
+    try:
+        issues = await find_issues_for_users(
+            [normalized_id], priority=PRIORITY_INTERACTIVE
+        )
+    except JiraUnavailableError:
+        stale_issues = _get_cached_open_issues(normalized_id, allow_stale=True)
+        if stale_issues is None:
+            raise
+        logger.warning(
+            f"find_user_issues: Jira недоступна, повертаємо кешований список для '{normalized_id}'"
+        )
+        return stale_issues, []
+
+    user_issues = issues[normalized_id]
+    logger.info(
+        f"find_user_issues: '{normalized_id}' - {len(user_issues['open'])} відкритих, "
+        f"{len(user_issues['done'])} завершених задач"
+    )
+    return user_issues["open"], user_issues["done"]
+
+
 async def add_comment_to_jira(
-    issue_key: str, comment: str, author_name: Optional[str] = None
+    issue_key: str,
+    comment: str,
+    author_name: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
 ) -> None:
     """
     Додає коментар до Jira Issue з опціональним заголовком автора.
@@ -718,6 +1275,7 @@ async def add_comment_to_jira(
         issue_key: Ключ задачі Jira
         comment: Текст коментаря
         author_name: ПІБ автора повідомлення (додається як заголовок)
+        idempotency_key: Ключ запису з черги (зберігається у властивостях коментаря)
 
     Raises:
         JiraApiError: If API request fails
@@ -735,7 +1293,7 @@ async def add_comment_to_jira(
     url = f"{JIRA_BASE_URL}/rest/api/3/issue/{issue_key}/comment"
 
     # Спрощений формат ADF (Atlassian Document Format)
-    payload = {
+    payload: Dict[str, Any] = {
         "body": {
             "type": "doc",
             "version": 1,
@@ -747,6 +1305,8 @@ async def add_comment_to_jira(
             ],
         }
     }
+    if idempotency_key:
+        payload["properties"] = _outbox_properties(idempotency_key)
 
     # Додаємо логування для діагностики
     logger = logging.getLogger(__name__)
@@ -775,15 +1335,16 @@ async def attach_file_to_jira(issue_key: str, filename: str, content: bytes) ->
     headers = {"X-Atlassian-Token": "no-check"}
 
     try:
-        async with httpx.AsyncClient(auth=AUTH) as client:
-            # Перетворюємо bytearray в bytes якщо потрібно
-            if isinstance(content, bytearray):
-                content = bytes(content)
+        # Перетворюємо bytearray в bytes якщо потрібно
+        if isinstance(content, bytearray):
+            content = bytes(content)
 
-            files = {"file": (filename, content, "application/octet-stream")}
-            response = await client.post(url, headers=headers, files=files)
-            response.raise_for_status()
-            return response.json()
+        files = {"file": (filename, content, "application/octet-stream")}
+        response = await get_jira_client().request(
+            "POST", url, operation=OPERATION_UPLOAD, headers=headers, files=files
+        )
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPStatusError as e:
         error_msg = f"Jira API error ({e.response.status_code})"
         try:
@@ -794,14 +1355,29 @@ async def attach_file_to_jira(issue_key: str, filename: str, content: bytes) ->
         raise JiraApiError(error_msg) from e
     except httpx.RequestError as e:
         raise JiraApiError(f"Network error: {str(e)}") from e
+    except JiraCircuitOpenError as e:
+        raise JiraUnavailableError(str(e)) from e
 
 
 # New retrieval functions
 async def get_issue_status(issue_key: str) -> Dict[str, str]:
-    """Get issue status information"""
-    response = await get_issue_details(issue_key, ["status"])
+    """Get issue status information (cached, kept fresh by Jira webhooks)"""
+    cached_status = _get_cached_issue_status(issue_key)
+    if cached_status is not None:
+        return cached_status
+
+    try:
+        response = await get_issue_details(issue_key, ["status"])
+    except JiraUnavailableError:
+        # Jira недоступна - віддаємо останній відомий статус, якщо він є
+        stale_status = _get_cached_issue_status(issue_key, allow_stale=True)
+        if stale_status is None:
+            raise
+        return stale_status
     status = response["fields"]["status"]
-    return {"name": status["name"], "category": status["statusCategory"]["name"]}
+    result = {"name": status["name"], "category": status["statusCategory"]["name"]}
+    _cache_issue_status(issue_key, result["name"], result["category"])
+    return result
 
 
 async def get_issue_summary(issue_key: str) -> Dict[str, str]:
@@ -882,120 +1458,13 @@ async def get_full_issue_info(issue_key: str) -> Dict[str, Any]:
 def _ensure_correct_custom_fields_format(payload: Dict[str, Any]) -> None:
     """
     Проверяет и корректирует формат кастомных полей перед отправкой в Jira API.
+    Payload з build_jira_payload вже у правильному форматі - тут лише O(1)
+    перевірка за таблицями FIELD_PLAN (для payload, сформованих інакше).
 
     Args:
         payload: Словарь с данными для отправки в Jira API
     """
-    logger = logging.getLogger(__name__)
-
-    custom_fields = (
-        "customfield_10069",  # Балансова Одиниця (Підрозділ)
-        "customfield_10065",  # Departament
-        "customfield_10068",  # Service
-    )
-
-    # Маппинги идентификаторов из constants.py
-    field_mappings = {
-        "customfield_10069": JIRA_FIELD_MAPPINGS.get(
-            "customfield_10069", {}
-        ),  # DIVISION_ID_MAPPINGS
-        "customfield_10065": JIRA_FIELD_MAPPINGS.get(
-            "customfield_10065", {}
-        ),  # DEPARTMENT_ID_MAPPINGS
-        "customfield_10068": JIRA_FIELD_MAPPINGS.get(
-            "customfield_10068", {}
-        ),  # SERVICE_ID_MAPPINGS
-    }
-
-    fields = payload.get("fields", {})
-
-    for field_id in custom_fields:
-        if field_id in fields:
-            field_value = fields[field_id]
-            field_name = {
-                "customfield_10069": "Балансова Одиниця (Підрозділ)",
-                "customfield_10065": "Departament",
-                "customfield_10068": "Service",
-            }.get(field_id, field_id)
-
-            # Проверяем, что поле имеет правильный формат
-            if isinstance(field_value, dict):
-                # Если есть другие ключи, кроме 'id', оставляем только 'id'
-                if "id" in field_value:
-                    if len(field_value) > 1 or field_value.get("name") == field_id:
-                        id_value = field_value["id"]
-                        fields[field_id] = {"id": id_value}
-                        logger.info(
-                            f"Field {field_name} ({field_id}) already in correct format with ID: {fields[field_id]}"
-                        )
-
-                        # Дополнительная проверка валидности ID
-                        mapping = field_mappings.get(field_id, {})
-                        valid_ids = [
-                            entry.get("id")
-                            for entry in mapping.values()
-                            if entry.get("id")
-                        ]
-                        if valid_ids and id_value not in valid_ids:
-                            logger.warning(
-                                f"⚠️ Возможно неверное значение ID для поля {field_name}: {id_value} не найдено в списке допустимых значений!"  # noqa: E501
-                            )
-
-                elif "name" in field_value and field_value["name"] != field_id:
-                    # Оставляем только name, если это не имя самого поля
-                    name_value = field_value["name"]
-                    fields[field_id] = {"name": name_value}
-                    logger.info(
-                        f"Field {field_name} ({field_id}) corrected to use name: {fields[field_id]}"
-                    )
-
-                    # Проверяем есть ли соответствующее значение в маппинге
-                    mapping = field_mappings.get(field_id, {})
-                    found = False
-                    for key, value in mapping.items():
-                        if key == name_value or value.get("name") == name_value:
-                            found = True
-                            # Заменяем на объект с ID, если возможно
-                            if value.get("id"):
-                                fields[field_id] = {"id": value["id"]}
-                                logger.info(
-                                    f"Заменено name на id для {field_name}: {name_value} -> {fields[field_id]}"
-                                )
-                            break
-
-                    if not found:
-                        logger.warning(
-                            f"⚠️ Имя '{name_value}' для поля {field_name} не найдено в маппинге!"
-                        )
-                else:
-                    logger.warning(
-                        f"Field {field_name} ({field_id}) has invalid format: {field_value}"
-                    )
-            else:
-                # Если значение не словарь, пробуем найти его в маппингах
-                str_value = str(field_value)
-                mapping = field_mappings.get(field_id, {})
-
-                if str_value.isdigit():
-                    fields[field_id] = {"id": str_value}
-                    logger.info(
-                        f"Field {field_name} ({field_id}) converted to ID format: {fields[field_id]}"
-                    )
-                elif str_value in mapping:
-                    # Используем ID из маппинга
-                    fields[field_id] = {"id": mapping[str_value].get("id", "")}
-                    logger.info(
-                        f"Field {field_name} ({field_id}) mapped from name to ID: {str_value} -> {fields[field_id]}"
-                    )
-                else:
-                    # Если не нашли в маппинге, используем как имя
-                    fields[field_id] = {"name": str_value}
-                    logger.info(
-                        f"Field {field_name} ({field_id}) converted to name format: {fields[field_id]}"
-                    )
-                    logger.warning(
-                        f"⚠️ Имя '{str_value}' для поля {field_name} не найдено в маппинге!"
-                    )
+    FIELD_PLAN.normalize_options(payload.get("fields", {}))
 
 
 async def find_user_by_jira_issue_key(issue_key: str) -> Optional[Dict[str, Any]]:
@@ -1018,10 +1487,19 @@ async def find_user_by_jira_issue_key(issue_key: str) -> Optional[Dict[str, Any]
     logger = logging.getLogger(__name__)
     logger.info(f"Looking up Telegram user for issue {issue_key}")
 
+    cached_owner = _issue_owner_cache.get(issue_key)
+    if cached_owner is not None and cached_owner[0] > time.monotonic():
+        telegram_id = cached_owner[1]
+        if not telegram_id:
+            logger.info(f"No Telegram ID for issue {issue_key} (cached)")
+            return None
+        logger.info(f"Found Telegram ID {telegram_id} for issue {issue_key} (cached)")
+        return {"telegram_id": telegram_id, "issue_key": issue_key}
+
     # Get issue details including the telegram_id custom field
     try:
         response = await get_issue_details(
-            issue_key, ["customfield_10145"]
+            issue_key, ["customfield_10145"], priority=PRIORITY_BACKGROUND
         )  # telegram_id field
 
         fields = response.get("fields", {})
@@ -1031,15 +1509,19 @@ async def find_user_by_jira_issue_key(issue_key: str) -> Optional[Dict[str, Any]
             logger.info(
                 f"No Telegram ID found for issue {issue_key} - likely created manually in Jira web interface"
             )
+            _cache_issue_owner(issue_key, None)
             return None
 
         # Normalize the Telegram ID
-        normalized_id = str(telegram_id).strip().replace("'", "").replace('"', "")
+        normalized_id = _normalize_telegram_id(telegram_id)
 
         if not normalized_id:
             logger.warning(f"Invalid Telegram ID format for issue {issue_key}")
+            _cache_issue_owner(issue_key, None)
             return None
 
+        _cache_issue_owner(issue_key, normalized_id)
+
         logger.info(f"Found Telegram ID {normalized_id} for issue {issue_key}")
 
         return {
@@ -1120,7 +1602,7 @@ async def add_comment_with_file_reference_to_jira(
     logger = logging.getLogger(__name__)
 
     # Спочатку прикріплюємо файл, якщо він є
-    attachment_url = None
+    attachment_id = None
     if filename and file_content:
         try:
             attachment_response = await attach_file_to_jira(
@@ -1128,20 +1610,49 @@ async def add_comment_with_file_reference_to_jira(
             )
             logger.info(f"Файл {filename} успішно прикріплено до {issue_key}")
 
-            # Отримуємо URL прикріпленого файлу
+            # Отримуємо ID прикріпленого файлу
             if attachment_response and len(attachment_response) > 0:
                 attachment_id = attachment_response[0].get("id")
-                if attachment_id:
-                    attachment_url = (
-                        f"{JIRA_BASE_URL}/secure/attachment/{attachment_id}/{filename}"
-                    )
-                    logger.info(f"URL файлу: {attachment_url}")
         except Exception as e:
             logger.error(
                 f"Помилка при прикріпленні файлу {filename} до {issue_key}: {str(e)}"
             )
             # Продовжуємо навіть якщо файл не вдалось прикріпити
 
+    await add_file_reference_comment(
+        issue_key, comment, author_name, filename, attachment_id
+    )
+
+
+async def add_file_reference_comment(
+    issue_key: str,
+    comment: str,
+    author_name: Optional[str] = None,
+    filename: Optional[str] = None,
+    attachment_id: Optional[str] = None,
+    idempotency_key: Optional[str] = None,
+) -> None:
+    """
+    Додає коментар з посиланням на вже прикріплений файл.
+
+    Args:
+        issue_key: Ключ задачі Jira
+        comment: Текст коментаря
+        author_name: ПІБ автора повідомлення (додається як заголовок)
+        filename: Назва файлу
+        attachment_id: ID вкладення в Jira (None - звичайний коментар)
+        idempotency_key: Ключ запису з черги (зберігається у властивостях коментаря)
+
+    Raises:
+        JiraApiError: If API request fails
+    """
+    logger = logging.getLogger(__name__)
+
+    attachment_url = None
+    if attachment_id and filename:
+        attachment_url = f"{JIRA_BASE_URL}/secure/attachment/{attachment_id}/{filename}"
+        logger.info(f"URL файлу: {attachment_url}")
+
     # Додаємо заголовок автора, якщо вказано
     if author_name:
         header_text = f"**Ім'я: {author_name} додав коментар:**\n\n"
@@ -1186,7 +1697,11 @@ async def add_comment_with_file_reference_to_jira(
             }
         )
 
-        payload = {"body": {"type": "doc", "version": 1, "content": adf_content}}
+        payload: Dict[str, Any] = {
+            "body": {"type": "doc", "version": 1, "content": adf_content}
+        }
+        if idempotency_key:
+            payload["properties"] = _outbox_properties(idempotency_key)
 
         try:
             await _make_request("POST", url, json=payload, headers=HEADERS_JSON)
@@ -1202,5 +1717,95 @@ async def add_comment_with_file_reference_to_jira(
             f"{header_text}{comment}" if comment else f"{header_text}Файл прикріплено"
         )
         await add_comment_to_jira(
-            issue_key, full_comment, None
+            issue_key, full_comment, None, idempotency_key
         )  # author_name вже додано до тексту
+
+
+# === Пошук записів, доставлених з черги ===
+# Після таймауту чи обриву з'єднання невідомо, чи Jira встигла зберегти запис.
+# Перед повтором черга шукає запис за ключем ідемпотентності, щоб не дублювати.
+
+
+def _has_outbox_property(entity: Dict[str, Any], idempotency_key: str) -> bool:
+    for prop in entity.get("properties") or []:
+        if prop.get("key") == OUTBOX_PROPERTY_KEY and (prop.get("value") or {}).get(
+            "id"
+        ) == idempotency_key:
+            return True
+    return False
+
+
+async def find_comment_by_idempotency_key(issue_key: str, idempotency_key: str) -> bool:
+    """Чи є серед останніх коментарів задачі коментар з цим ключем черги"""
+    url = f"{JIRA_BASE_URL}/rest/api/3/issue/{issue_key}/comment"
+    response = await _make_request(
+        "GET",
+        url,
+        params={"orderBy": "-created", "maxResults": 50, "expand": "properties"},
+        headers=HEADERS_JSON,
+        priority=PRIORITY_BACKGROUND,
+    )
+    return any(
+        _has_outbox_property(comment, idempotency_key)
+        for comment in response.get("comments", [])
+    )
+
+
+async def find_issue_by_idempotency_key(
+    telegram_id: str, idempotency_key: str
+) -> Optional[str]:
+    """Шукає серед свіжих задач користувача задачу, створену з цим ключем черги"""
+    normalized_id = _normalize_telegram_id(telegram_id)
+    jql = (
+        f"project = {JIRA_PROJECT_KEY} "
+        f'AND "Telegram ID" ~ "{normalized_id}" '
+        "AND created >= -2d ORDER BY created DESC"
+    )
+    response = await _make_request(
+        "GET",
+        f"{JIRA_BASE_URL}/rest/api/3/search/jql",
+        params={"jql": jql, "fields": "created", "maxResults": 20},
+        headers=HEADERS_JSON,
+        priority=PRIORITY_BACKGROUND,
+    )
+    for issue in response.get("issues", []):
+        issue_key = issue["key"]
+        try:
+            prop = await _make_request(
+                "GET",
+                f"{JIRA_BASE_URL}/rest/api/3/issue/{issue_key}/properties/{OUTBOX_PROPERTY_KEY}",
+                headers=HEADERS_JSON,
+                priority=PRIORITY_BACKGROUND,
+            )
+        except JiraUnavailableError:
+            raise
+        except JiraApiError:
+            # 404 - у задачі немає властивості, отже її створено не з черги
+            continue
+        if (prop.get("value") or {}).get("id") == idempotency_key:
+            return issue_key
+    return None
+
+
+async def find_attachment_by_name(
+    issue_key: str, filename: str, size: int, created_after: float
+) -> Optional[str]:
+    """
+    Шукає вкладення з тією ж назвою і розміром, додане не раніше created_after
+    (unix time). Вкладення не мають властивостей, тому це найближчий відбиток.
+    """
+    issue = await get_issue_details(
+        issue_key, ["attachment"], priority=PRIORITY_BACKGROUND
+    )
+    for attachment in issue.get("fields", {}).get("attachment") or []:
+        if attachment.get("filename") != filename or attachment.get("size") != size:
+            continue
+        try:
+            created = datetime.strptime(
+                attachment.get("created", ""), "%Y-%m-%dT%H:%M:%S.%f%z"
+            ).timestamp()
+        except ValueError:
+            continue
+        if created >= created_after:
+            return str(attachment["id"])
+    return None
@@ -0,0 +1,339 @@
+"""
+Спільний HTTP клієнт для Telegram Bot API.
+Всі сповіщення з вебхуків Jira надсилаються через один пул keep-alive з'єднань,
+тому N повідомлень - це N запитів на "теплих" з'єднаннях, а не N TLS handshake.
+Відправки проходять через TelegramSendScheduler: загальний і окремий для
+кожного чату token bucket тримають темп у межах лімітів Telegram, повідомлення
+в один чат ідуть по черзі, а 429 Too Many Requests повторюється після паузи.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+import httpx
+
+from config.config import (
+    TELEGRAM_TOKEN,
+    TELEGRAM_HTTP_MAX_CONNECTIONS,
+    TELEGRAM_HTTP_MAX_KEEPALIVE,
+    TELEGRAM_HTTP_KEEPALIVE_EXPIRY,
+    TELEGRAM_TIMEOUT_MESSAGE,
+    TELEGRAM_RATE_LIMIT_PER_SECOND,
+    TELEGRAM_CHAT_RATE_LIMIT_PER_SECOND,
+    TELEGRAM_CHAT_RATE_LIMIT_BURST,
+    TELEGRAM_RATE_LIMIT_MAX_RETRIES,
+)
+
+logger = logging.getLogger(__name__)
+
+# Пріоритети відправки: сповіщення (статуси, відповіді) йдуть поперед вкладень
+PRIORITY_NOTIFICATION = 0
+PRIORITY_BULK = 1
+
+# Скільки неактивних чатів тримати, перш ніж прибирати їх стан
+_MAX_IDLE_LANES = 256
+_LANE_IDLE_SECONDS = 60.0
+
+
+def _retry_after(response: httpx.Response) -> float:
+    """Пауза з відповіді 429: parameters.retry_after або заголовок Retry-After"""
+    try:
+        retry_after = response.json().get("parameters", {}).get("retry_after")
+    except Exception:
+        retry_after = None
+    if retry_after is None:
+        retry_after = response.headers.get("Retry-After")
+    try:
+        return max(0.0, float(retry_after))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+class _ChatLane:
+    """Черга і token bucket одного чату"""
+
+    def __init__(self, burst: int):
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.busy = False
+        self.queue: Deque[object] = deque()
+        self.changed = asyncio.Condition()
+
+    @property
+    def idle(self) -> bool:
+        return not self.busy and not self.queue
+
+
+class TelegramSendScheduler:
+    """
+    Планувальник відправок у Telegram.
+
+    Загальний token bucket (TELEGRAM_RATE_LIMIT_PER_SECOND) і bucket на кожен
+    чат (TELEGRAM_CHAT_RATE_LIMIT_PER_SECOND) тримають темп у межах лімітів
+    Telegram. У межах чату запити виконуються строго по одному в порядку
+    надходження; пріоритет діє між чатами - коли загальних токенів бракує,
+    сповіщення отримують їх раніше за вкладення. Альбом (sendMediaGroup)
+    витрачає токен на кожен файл.
+    """
+
+    def __init__(
+        self,
+        rate: float = TELEGRAM_RATE_LIMIT_PER_SECOND,
+        chat_rate: float = TELEGRAM_CHAT_RATE_LIMIT_PER_SECOND,
+        chat_burst: int = TELEGRAM_CHAT_RATE_LIMIT_BURST,
+    ):
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = max(1, chat_burst)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lanes: Dict[str, _ChatLane] = {}
+        self._waiting = {PRIORITY_NOTIFICATION: 0, PRIORITY_BULK: 0}
+        self.stats = {"sent": 0, "throttled": 0, "rate_limited": 0}
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(
+            self.burst, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def _refill_lane(self, lane: _ChatLane, now: float) -> None:
+        lane.tokens = min(
+            self.chat_burst, lane.tokens + (now - lane.updated) * self.chat_rate
+        )
+        lane.updated = now
+
+    def _higher_priority_waiting(self, priority: int) -> bool:
+        return any(
+            count > 0 for lane, count in self._waiting.items() if lane < priority
+        )
+
+    def _get_lane(self, chat_id: str) -> _ChatLane:
+        lane = self._lanes.get(chat_id)
+        if lane is None:
+            if len(self._lanes) >= _MAX_IDLE_LANES:
+                self._prune_lanes()
+            lane = _ChatLane(self.chat_burst)
+            self._lanes[chat_id] = lane
+        return lane
+
+    def _prune_lanes(self) -> None:
+        """Прибирає чати, які давно нічого не надсилали (їх bucket уже повний)"""
+        cutoff = time.monotonic() - _LANE_IDLE_SECONDS
+        for chat_id, lane in list(self._lanes.items()):
+            if lane.idle and lane.updated < cutoff and lane.paused_until < cutoff:
+                del self._lanes[chat_id]
+
+    async def _acquire(self, lane: _ChatLane, priority: int, cost: int) -> None:
+        ticket = object()
+        lane.queue.append(ticket)
+        self._waiting[priority] += 1
+        throttled = False
+        try:
+            while True:
+                now = time.monotonic()
+                if lane.busy or lane.queue[0] is not ticket:
+                    # Попереду в цьому чаті є інший запит - чекаємо на нього
+                    delay = None
+                else:
+                    self._refill(now)
+                    self._refill_lane(lane, now)
+                    if lane.paused_until > now:
+                        delay = lane.paused_until - now
+                    elif lane.tokens < 1:
+                        delay = (1 - lane.tokens) / self.chat_rate
+                    elif self._tokens < 1:
+                        delay = (1 - self._tokens) / self.rate
+                    elif self._higher_priority_waiting(priority) and (
+                        self._tokens < 2
+                    ):
+                        # Останній токен лишаємо для сповіщень, що чекають
+                        delay = 0.01
+                    else:
+                        # Борг за альбом відпрацьовується наступними запитами
+                        self._tokens -= cost
+                        lane.tokens -= cost
+                        lane.busy = True
+                        return
+                if not throttled:
+                    throttled = True
+                    self.stats["throttled"] += 1
+                async with lane.changed:
+                    try:
+                        await asyncio.wait_for(
+                            lane.changed.wait(), max(0.005, delay or 1.0)
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            lane.queue.remove(ticket)
+            self._waiting[priority] -= 1
+
+    async def _release(self, lane: _ChatLane) -> None:
+        lane.busy = False
+        async with lane.changed:
+            lane.changed.notify_all()
+
+    @asynccontextmanager
+    async def slot(
+        self, chat_id: str, priority: int = PRIORITY_NOTIFICATION, cost: int = 1
+    ) -> AsyncIterator[None]:
+        """Дозвіл на відправку в чат; наступний запит у цей чат чекає виходу"""
+        lane = self._get_lane(chat_id)
+        await self._acquire(lane, priority, cost)
+        try:
+            yield
+        finally:
+            await self._release(lane)
+
+    def pause(self, chat_id: str, seconds: float) -> None:
+        """Зупиняє відправки в чат після 429 від Telegram"""
+        lane = self._get_lane(chat_id)
+        lane.paused_until = max(lane.paused_until, time.monotonic() + seconds)
+        self.stats["rate_limited"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан планувальника для status endpoint"""
+        now = time.monotonic()
+        return {
+            "rate": self.rate,
+            "chat_rate": self.chat_rate,
+            "tokens": round(self._tokens, 2),
+            "chats": len(self._lanes),
+            "paused_chats": sum(
+                1 for lane in self._lanes.values() if lane.paused_until > now
+            ),
+            "waiting_notifications": self._waiting[PRIORITY_NOTIFICATION],
+            "waiting_bulk": self._waiting[PRIORITY_BULK],
+            **self.stats,
+        }
+
+
+class TelegramHttpClient:
+    """Обгортка над httpx.AsyncClient з пулом з'єднань до api.telegram.org"""
+
+    def __init__(
+        self,
+        token: str = TELEGRAM_TOKEN,
+        max_connections: int = TELEGRAM_HTTP_MAX_CONNECTIONS,
+        max_keepalive: int = TELEGRAM_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = TELEGRAM_HTTP_KEEPALIVE_EXPIRY,
+    ):
+        self.base_url = f"https://api.telegram.org/bot{token}"
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(TELEGRAM_TIMEOUT_MESSAGE, connect=10.0)
+        self._client: Optional[httpx.AsyncClient] = None
+        self.scheduler = TelegramSendScheduler()
+        self.max_rate_limit_retries = TELEGRAM_RATE_LIMIT_MAX_RETRIES
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Повертає відкритий httpx клієнт, створюючи його за потреби"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits, timeout=self.timeout, trust_env=True
+            )
+            logger.info(
+                f"Створено пул з'єднань Telegram (max={self.limits.max_connections}, "
+                f"keepalive={self.limits.max_keepalive_connections})"
+            )
+        return self._client
+
+    async def call(
+        self, api_method: str, priority: int = PRIORITY_NOTIFICATION, **kwargs
+    ) -> httpx.Response:
+        """
+        Викликає метод Bot API (sendMessage, sendPhoto, ...).
+        Відправки в чат (send*) проходять через планувальник, а на 429 Too Many
+        Requests повторюються після retry_after.
+
+        Args:
+            api_method: Назва методу Bot API
+            priority: PRIORITY_NOTIFICATION або PRIORITY_BULK (вкладення)
+            **kwargs: Параметри httpx (json, data, files, timeout)
+
+        Returns:
+            httpx.Response: Відповідь Telegram (без перевірки статусу)
+        """
+        url = f"{self.base_url}/{api_method}"
+        payload = kwargs.get("json") or kwargs.get("data") or {}
+        chat_id = payload.get("chat_id")
+        if not api_method.startswith("send") or chat_id is None:
+            return await self.client.post(url, **kwargs)
+
+        async with self.scheduler.slot(
+            str(chat_id), priority, cost=_message_count(api_method, payload)
+        ):
+            attempt = 0
+            while True:
+                response = await self.client.post(url, **kwargs)
+                self.scheduler.stats["sent"] += 1
+                if (
+                    response.status_code != 429
+                    or attempt >= self.max_rate_limit_retries
+                ):
+                    return response
+                attempt += 1
+                retry_after = _retry_after(response)
+                self.scheduler.pause(str(chat_id), retry_after)
+                logger.warning(
+                    f"Telegram 429 для чату {chat_id} ({api_method}): повтор "
+                    f"{attempt}/{self.max_rate_limit_retries} через {retry_after:.1f} с"
+                )
+                await asyncio.sleep(retry_after)
+                # Файли з диска/пам'яті відправляємо повторно з початку
+                for file_tuple in (kwargs.get("files") or {}).values():
+                    file_obj = file_tuple[1] if isinstance(file_tuple, tuple) else None
+                    if hasattr(file_obj, "seek"):
+                        file_obj.seek(0)
+
+    async def aclose(self) -> None:
+        """Закриває всі з'єднання пулу"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+            logger.info("Пул з'єднань Telegram закрито")
+        self._client = None
+
+
+def _message_count(api_method: str, payload: Dict[str, Any]) -> int:
+    """Скільки повідомлень створить запит (альбом - по одному на файл)"""
+    if api_method != "sendMediaGroup":
+        return 1
+    media = payload.get("media") or []
+    if isinstance(media, str):
+        try:
+            media = json.loads(media)
+        except ValueError:
+            return 1
+    return max(1, len(media))
+
+
+# Глобальний екземпляр клієнта
+_telegram_client: Optional[TelegramHttpClient] = None
+
+
+def get_telegram_client() -> TelegramHttpClient:
+    """Повертає глобальний Telegram клієнт (створює його при першому зверненні)"""
+    global _telegram_client
+    if _telegram_client is None:
+        _telegram_client = TelegramHttpClient()
+    return _telegram_client
+
+
+async def close_telegram_client() -> None:
+    """Закриває глобальний Telegram клієнт при завершенні роботи"""
+    global _telegram_client
+    if _telegram_client is not None:
+        await _telegram_client.aclose()
+        _telegram_client = None
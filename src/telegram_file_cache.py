@@ -0,0 +1,288 @@
+"""
+Кеш Telegram file_id для вкладень Jira (SQLite у режимі WAL).
+Після першого завантаження файлу в Telegram зберігається його file_id, і
+повторні відправки того ж вкладення (відновлення, повторні вебхуки, вкладення
+задачі в наступних коментарях) посилаються на file_id - без повторного
+завантаження з Jira і відправки байтів у Telegram.
+Ключ - ID вкладення Jira (вміст вкладення з ID не змінюється); SHA-256 вмісту
+дозволяє впізнати той самий файл, прикріплений повторно під іншим ID.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import (
+    TELEGRAM_FILE_CACHE_ENABLED,
+    TELEGRAM_FILE_CACHE_PATH,
+    TELEGRAM_FILE_CACHE_MAX_AGE_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+# Вид файлу в Telegram -> метод і параметр для відправки за file_id
+SEND_METHODS: Dict[str, Tuple[str, str]] = {
+    "photo": ("sendPhoto", "photo"),
+    "video": ("sendVideo", "video"),
+    "audio": ("sendAudio", "audio"),
+    "animation": ("sendAnimation", "animation"),
+    "document": ("sendDocument", "document"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS telegram_files (
+    attachment_id TEXT PRIMARY KEY,
+    content_sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    media_type TEXT NOT NULL,
+    file_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_telegram_files_sha256 ON telegram_files (content_sha256);
+"""
+
+
+class CachedTelegramFile:
+    """Файл, який уже є в Telegram: відправляється за file_id"""
+
+    def __init__(
+        self,
+        attachment_id: str,
+        content_sha256: str,
+        size: int,
+        media_type: str,
+        file_id: str,
+    ):
+        self.attachment_id = attachment_id
+        self.content_sha256 = content_sha256
+        self.size = size
+        self.media_type = media_type
+        self.file_id = file_id
+
+
+def extract_file_ref(message: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """
+    Дістає з відповіді Telegram (Message) вид файлу і його file_id.
+
+    Returns:
+        Optional[Tuple[str, str]]: (media_type, file_id) або None
+    """
+    photos = message.get("photo")
+    if photos:
+        # Найбільший розмір фото - останній у списку
+        return "photo", photos[-1]["file_id"]
+    # animation перевіряємо раніше за document: GIF приходить з обома полями
+    for media_type in ("video", "audio", "animation", "document"):
+        media = message.get(media_type)
+        if media and media.get("file_id"):
+            return media_type, media["file_id"]
+    return None
+
+
+class TelegramFileCache:
+    """Відповідність вкладення Jira -> Telegram file_id з копією в пам'яті"""
+
+    def __init__(
+        self,
+        path: str = TELEGRAM_FILE_CACHE_PATH,
+        max_age_days: float = TELEGRAM_FILE_CACHE_MAX_AGE_DAYS,
+    ):
+        self.path = path
+        self.max_age_seconds = max_age_days * 86400
+        # Один потік - одне з'єднання SQLite, всі записи послідовні
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="tg-file-cache"
+        )
+        self._conn: Optional[sqlite3.Connection] = None
+        self._by_attachment: Dict[str, CachedTelegramFile] = {}
+        self._by_sha256: Dict[str, CachedTelegramFile] = {}
+        self.stats = {
+            "hits": 0,
+            "hash_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "invalidated": 0,
+        }
+
+    # --- Синхронна частина (виконується в потоці кешу) ---
+
+    def _open(self) -> List[Tuple[str, str, int, str, str]]:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        with self._conn:
+            self._conn.execute(
+                "DELETE FROM telegram_files WHERE last_used < ?",
+                (time.time() - self.max_age_seconds,),
+            )
+        return self._conn.execute(
+            "SELECT attachment_id, content_sha256, size, media_type, file_id "
+            "FROM telegram_files"
+        ).fetchall()
+
+    def _execute(self, sql: str, args: tuple) -> None:
+        assert self._conn is not None
+        with self._conn:
+            self._conn.execute(sql, args)
+
+    # --- Асинхронний інтерфейс ---
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    async def open(self) -> None:
+        """Відкриває базу і завантажує записи в пам'ять"""
+        if self._conn is not None:
+            return
+        rows = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._open
+        )
+        for row in rows:
+            self._index(CachedTelegramFile(*row))
+        logger.info(f"Кеш Telegram file_id відкрито: {self.path} ({len(rows)} файлів)")
+
+    def _index(self, cached: CachedTelegramFile) -> None:
+        self._by_attachment[cached.attachment_id] = cached
+        self._by_sha256[cached.content_sha256] = cached
+
+    def _write(self, sql: str, args: tuple) -> None:
+        """Записує зміну у фоні: відправку файлу запис у базу не затримує"""
+        if self._conn is None:
+            return
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._execute, sql, args
+        )
+        future.add_done_callback(_log_write_error)
+
+    def lookup(self, attachment_id: Optional[str]) -> Optional[CachedTelegramFile]:
+        """Шукає file_id за ID вкладення Jira (до завантаження файлу)"""
+        cached = self._by_attachment.get(str(attachment_id)) if attachment_id else None
+        if cached is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        self._write(
+            "UPDATE telegram_files SET last_used = ? WHERE attachment_id = ?",
+            (time.time(), cached.attachment_id),
+        )
+        return cached
+
+    def lookup_content(
+        self, attachment_id: Optional[str], content_sha256: str
+    ) -> Optional[CachedTelegramFile]:
+        """
+        Шукає file_id за вмістом уже завантаженого файлу. Знайдений запис
+        запам'ятовується і під новим ID вкладення.
+        """
+        known = self._by_sha256.get(content_sha256)
+        if known is None:
+            return None
+        self.stats["hash_hits"] += 1
+        if not attachment_id:
+            return known
+        cached = CachedTelegramFile(
+            str(attachment_id),
+            content_sha256,
+            known.size,
+            known.media_type,
+            known.file_id,
+        )
+        self._store(cached)
+        return cached
+
+    def remember(
+        self,
+        attachment_id: Optional[str],
+        content_sha256: str,
+        size: int,
+        media_type: str,
+        file_id: str,
+    ) -> None:
+        """Зберігає file_id, отриманий у відповіді на відправку файлу"""
+        if not attachment_id or not file_id:
+            return
+        self._store(
+            CachedTelegramFile(
+                str(attachment_id), content_sha256, size, media_type, file_id
+            )
+        )
+        self.stats["stored"] += 1
+
+    def _store(self, cached: CachedTelegramFile) -> None:
+        self._index(cached)
+        now = time.time()
+        self._write(
+            "INSERT OR REPLACE INTO telegram_files "
+            "(attachment_id, content_sha256, size, media_type, file_id, "
+            "created_at, last_used) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                cached.attachment_id,
+                cached.content_sha256,
+                cached.size,
+                cached.media_type,
+                cached.file_id,
+                now,
+                now,
+            ),
+        )
+
+    def forget(self, cached: CachedTelegramFile) -> None:
+        """Видаляє file_id, який Telegram більше не приймає"""
+        self.stats["invalidated"] += 1
+        for attachment_id, entry in list(self._by_attachment.items()):
+            if entry.file_id == cached.file_id:
+                del self._by_attachment[attachment_id]
+        known = self._by_sha256.get(cached.content_sha256)
+        if known is not None and known.file_id == cached.file_id:
+            del self._by_sha256[cached.content_sha256]
+        self._write("DELETE FROM telegram_files WHERE file_id = ?", (cached.file_id,))
+
+    async def close(self) -> None:
+        """Дочікується фонових записів і закриває базу"""
+        if self._conn is None:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._conn.close)
+        self._conn = None
+        self._executor.shutdown(wait=True)
+        logger.info("Кеш Telegram file_id закрито")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан кешу для status endpoint"""
+        return {"path": self.path, "files": len(self._by_attachment), **self.stats}
+
+
+def _log_write_error(future: "asyncio.Future[None]") -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Помилка запису кешу Telegram file_id: {future.exception()}")
+
+
+# Глобальний кеш file_id
+_telegram_file_cache: Optional[TelegramFileCache] = None
+
+
+def get_telegram_file_cache() -> Optional[TelegramFileCache]:
+    """Повертає глобальний кеш або None, якщо його вимкнено в конфігурації"""
+    global _telegram_file_cache
+    if not TELEGRAM_FILE_CACHE_ENABLED:
+        return None
+    if _telegram_file_cache is None:
+        _telegram_file_cache = TelegramFileCache()
+    return _telegram_file_cache
+
+
+async def close_telegram_file_cache() -> None:
+    """Закриває глобальний кеш при завершенні роботи"""
+    global _telegram_file_cache
+    if _telegram_file_cache is not None:
+        await _telegram_file_cache.close()
+        _telegram_file_cache = None
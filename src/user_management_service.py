@@ -9,16 +9,16 @@ from typing import Any, Dict, Optional, Tuple
 
 from src.google_sheets_service import (
     GoogleSheetsError,
-    add_new_user,
-    find_user_by_phone,
-    find_user_by_telegram_id,
-    update_user_telegram,
+    aadd_new_user,
+    afind_user_by_phone,
+    afind_user_by_telegram_id,
+    aupdate_user_telegram,
 )
 from src.user_state_service import (
-    load_user_profile,
-    save_user_profile,
-    update_user_sync_status,
-    list_all_cached_users,
+    aload_user_profile,
+    asave_user_profile,
+    aupdate_user_sync_status,
+    alist_all_cached_users,
 )
 
 logger = logging.getLogger(__name__)
@@ -41,18 +41,18 @@ class UserManager:
         """
 
         # 1. Спочатку перевіряємо локальний кеш
-        cached_profile = load_user_profile(telegram_id)
+        cached_profile = await aload_user_profile(telegram_id)
         if cached_profile:
             logger.info(f"Користувач {telegram_id} знайдений в локальному кеші")
 
             # Спробуємо синхронізувати з Google Sheets для свіжих даних
             try:
-                google_result = find_user_by_telegram_id(str(telegram_id))
+                google_result = await afind_user_by_telegram_id(str(telegram_id))
                 if google_result:
                     record, row = google_result
                     # Оновлюємо кеш свіжими даними з Google
-                    save_user_profile(telegram_id, record, "active")
-                    update_user_sync_status(telegram_id, True)
+                    await asave_user_profile(telegram_id, record, "active")
+                    await aupdate_user_sync_status(telegram_id, True)
                     logger.info(
                         f"Кеш користувача {telegram_id} оновлено з Google Sheets"
                     )
@@ -64,23 +64,23 @@ class UserManager:
                     )
                     try:
                         # Спробуємо відновити користувача в Google Sheets з кешу
-                        row_num = add_new_user(cached_profile)
-                        update_user_sync_status(telegram_id, True)
+                        row_num = await aadd_new_user(cached_profile)
+                        await aupdate_user_sync_status(telegram_id, True)
                         logger.info(
                             f"✅ Користувача {telegram_id} відновлено в Google Sheets (рядок #{row_num})"
                         )
 
                         # Повторно отримуємо з Google для синхронізації
-                        google_result = find_user_by_telegram_id(str(telegram_id))
+                        google_result = await afind_user_by_telegram_id(str(telegram_id))
                         if google_result:
                             record, row = google_result
-                            save_user_profile(telegram_id, record, "active")
+                            await asave_user_profile(telegram_id, record, "active")
                             return record, "google"
                     except GoogleSheetsError as e:
                         logger.error(
                             f"❌ Не вдалось відновити користувача {telegram_id} в Google Sheets: {e}"
                         )
-                        update_user_sync_status(telegram_id, False)
+                        await aupdate_user_sync_status(telegram_id, False)
 
                     # Використовуємо кеш як резерв
                     return cached_profile, "cache"
@@ -94,11 +94,11 @@ class UserManager:
         # 2. Якщо в кеші немає, перевіряємо Google Sheets
         try:
             # Пошук за Telegram ID
-            google_result = find_user_by_telegram_id(str(telegram_id))
+            google_result = await afind_user_by_telegram_id(str(telegram_id))
             if google_result:
                 record, row = google_result
                 # Зберігаємо в кеш для майбутнього використання
-                save_user_profile(telegram_id, record, "active")
+                await asave_user_profile(telegram_id, record, "active")
                 logger.info(
                     f"Користувач {telegram_id} знайдений в Google Sheets і збережений в кеш"
                 )
@@ -106,11 +106,11 @@ class UserManager:
 
             # Пошук за номером телефону (якщо надано)
             if phone:
-                phone_result = find_user_by_phone(phone)
+                phone_result = await afind_user_by_phone(phone)
                 if phone_result:
                     record, row = phone_result
                     # Зберігаємо в кеш
-                    save_user_profile(telegram_id, record, "active")
+                    await asave_user_profile(telegram_id, record, "active")
                     logger.info(
                         f"Користувач знайдений за номером {phone} в Google Sheets"
                     )
@@ -133,21 +133,21 @@ class UserManager:
         """
         try:
             # Пошук за номером телефону
-            phone_result = find_user_by_phone(phone)
+            phone_result = await afind_user_by_phone(phone)
             if phone_result:
                 record, row = phone_result
 
                 # Оновлюємо Telegram дані в Google Sheets
                 tg_username = ""  # Буде оновлено пізніше з update object
-                update_user_telegram(row, str(telegram_id), tg_username)
+                await aupdate_user_telegram(row, str(telegram_id), tg_username)
 
                 # Оновлюємо запис з новими Telegram даними
                 record["telegram_id"] = str(telegram_id)
                 record["mobile_number"] = phone
 
                 # Зберігаємо в локальному кеші
-                save_user_profile(telegram_id, record, "active")
-                update_user_sync_status(telegram_id, True)
+                await asave_user_profile(telegram_id, record, "active")
+                await aupdate_user_sync_status(telegram_id, True)
 
                 logger.info(
                     f"Користувач авторизований: {record.get('full_name')}"
@@ -162,7 +162,7 @@ class UserManager:
             self.google_available = False
 
             # Перевіряємо кеш як резерв
-            all_cached = list_all_cached_users()
+            all_cached = await alist_all_cached_users()
             for cached_user in all_cached:
                 if cached_user.get("mobile_number") == phone:
                     logger.info(
@@ -185,11 +185,11 @@ class UserManager:
 
         try:
             # Спробуємо зберегти в Google Sheets
-            row_num = add_new_user(registration_data)
+            row_num = await aadd_new_user(registration_data)
 
             # Зберігаємо в локальному кеші
-            save_user_profile(telegram_id, registration_data, "active")
-            update_user_sync_status(telegram_id, True)
+            await asave_user_profile(telegram_id, registration_data, "active")
+            await aupdate_user_sync_status(telegram_id, True)
 
             logger.info(
                 f"Новий користувач зареєстрований: {registration_data.get('full_name')} (рядок #{row_num})"
@@ -205,8 +205,8 @@ class UserManager:
             self.google_available = False
 
             # Зберігаємо тільки в локальному кеші
-            if save_user_profile(telegram_id, registration_data, "active"):
-                update_user_sync_status(telegram_id, False)
+            if await asave_user_profile(telegram_id, registration_data, "active"):
+                await aupdate_user_sync_status(telegram_id, False)
                 logger.info(
                     "Користувач збережений тільки в локальному кеші через проблеми з Google Sheets"
                 )
@@ -218,10 +218,10 @@ class UserManager:
             else:
                 return False, "Помилка збереження користувача", 0
 
-    def get_user_cache_info(self, telegram_id: int) -> Dict[str, Any]:
+    async def get_user_cache_info(self, telegram_id: int) -> Dict[str, Any]:
         """Повертає інформацію про стан кешу користувача"""
         try:
-            user_info = load_user_profile(telegram_id)
+            user_info = await aload_user_profile(telegram_id)
             if user_info:
                 return {
                     "cached": True,
@@ -234,7 +234,7 @@ class UserManager:
             logger.error(f"Помилка отримання інформації про кеш {telegram_id}: {e}")
             return {"cached": False, "error": str(e)}
 
-    def sync_pending_users(self) -> Dict[str, Any]:
+    async def sync_pending_users(self) -> Dict[str, Any]:
         """Синхронізує користувачів, які не синхронізовані з Google Sheets"""
         result = {"synced": 0, "failed": 0, "errors": []}
 
@@ -243,15 +243,15 @@ class UserManager:
             return result
 
         try:
-            all_cached = list_all_cached_users()
+            all_cached = await alist_all_cached_users()
             for user in all_cached:
                 telegram_id = user.get("telegram_id")
                 if telegram_id and not user.get(
                     "sync_with_google", True
                 ):  # Потребує синхронізації
                     try:
-                        add_new_user(user)
-                        update_user_sync_status(int(telegram_id), True)
+                        await aadd_new_user(user)
+                        await aupdate_user_sync_status(int(telegram_id), True)
                         result["synced"] += 1
                         logger.info(
                             f"Синхронізовано користувача {telegram_id} з Google Sheets"
@@ -3,80 +3,533 @@
 Сервіс для збереження та відновлення стану користувачів
 """
 
+import asyncio
+import atexit
+import copy
+import functools
 import json
 import logging
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional, List, cast
+from typing import Dict, Any, Optional, List, Callable, Tuple, TypedDict, cast
+
+from config.config import (
+    USER_STATE_BACKEND,
+    USER_STATE_CACHE_SIZE,
+    USER_STATE_DB_PATH,
+    USER_STATE_FLUSH_DELAY,
+)
 
 logger = logging.getLogger(__name__)
 
+# Отримує поточний стан (None - користувача немає) і повертає новий стан
+# або None, якщо записувати нічого не треба
+StateMutator = Callable[[Optional[Dict[str, Any]]], Optional[Dict[str, Any]]]
 
-class UserStateManager:
-    """Менеджер для збереження стану користувачів у файли"""
 
-    def __init__(self, base_dir: str = "/home/Bot1/user_states"):
+class CurrentTask(TypedDict):
+    """Поточна задача користувача і останній відомий йому статус"""
+
+    task_key: str
+    status: Optional[str]
+
+
+def _normalize_phone(phone: Any) -> str:
+    return re.sub(r"\D", "", str(phone or ""))
+
+
+def _index_columns(record: Dict[str, Any]) -> Tuple[str, str]:
+    """Значення індексованих колонок запису: (телефон, поточна задача)"""
+    state = record.get("state") or {}
+    profile = state.get("profile") or {}
+    bot_state = state.get("bot_state") or {}
+    return (
+        _normalize_phone(profile.get("mobile_number")),
+        str(bot_state.get("current_task_key") or ""),
+    )
+
+
+def _current_task(record: Dict[str, Any]) -> Optional[CurrentTask]:
+    bot_state = (record.get("state") or {}).get("bot_state") or {}
+    task_key = bot_state.get("current_task_key")
+    if not task_key:
+        return None
+    return {"task_key": str(task_key), "status": bot_state.get("current_task_status")}
+
+
+class JsonFileStateBackend:
+    """Зберігання станів у файлах user_{id}.json (запис через атомарний rename)"""
+
+    def __init__(self, base_dir: Path):
         self.base_dir = Path(base_dir)
-        self.base_dir.mkdir(exist_ok=True)
+        self.location = str(self.base_dir)
 
-    def _get_user_file(self, telegram_id: int) -> Path:
-        """Повертає шлях до файлу користувача"""
+    def _path(self, telegram_id: int) -> Path:
         return self.base_dir / f"user_{telegram_id}.json"
 
-    def save_user_state(self, telegram_id: int, state_data: Dict[str, Any]) -> bool:
-        """Зберігає стан користувача у файл"""
+    def read(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        user_file = self._path(telegram_id)
+        if not user_file.exists():
+            return None
+        with open(user_file, "r", encoding="utf-8") as f:
+            return cast(Dict[str, Any], json.load(f))
+
+    def write(self, telegram_id: int, record: Dict[str, Any]) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self.base_dir, suffix=".tmp")
         try:
-            user_file = self._get_user_file(telegram_id)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self._path(telegram_id))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def write_many(self, records: Dict[int, Dict[str, Any]]) -> None:
+        for telegram_id, record in records.items():
+            self.write(telegram_id, record)
+
+    def delete(self, telegram_id: int) -> bool:
+        user_file = self._path(telegram_id)
+        if not user_file.exists():
+            return False
+        user_file.unlink()
+        return True
+
+    def list_ids(self) -> List[int]:
+        telegram_ids = []
+        for file_path in self.base_dir.glob("user_*.json"):
+            try:
+                # Витягуємо telegram_id з назви файлу (user_123456789)
+                telegram_ids.append(int(file_path.stem.split("_")[1]))
+            except (ValueError, IndexError):
+                logger.warning(f"Неправильна назва файлу: {file_path}")
+        return telegram_ids
+
+    def _records(self):
+        for telegram_id in self.list_ids():
+            try:
+                record = self.read(telegram_id)
+            except Exception as e:
+                logger.warning(f"Пропускаємо пошкоджений стан {telegram_id}: {e}")
+                continue
+            if record is not None:
+                yield telegram_id, record
+
+    def find_by_phone(self, phone: str) -> Optional[int]:
+        for telegram_id, record in self._records():
+            if _index_columns(record)[0] == phone:
+                return telegram_id
+        return None
 
-            # Додаємо метадані
-            data = {
-                "telegram_id": telegram_id,
-                "last_updated": datetime.now().isoformat(),
-                "state": state_data,
-            }
+    def list_current_tasks(self) -> Dict[int, CurrentTask]:
+        result = {}
+        for telegram_id, record in self._records():
+            task = _current_task(record)
+            if task:
+                result[telegram_id] = task
+        return result
+
+    def close(self) -> None:
+        pass
+
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_states (
+    telegram_id INTEGER PRIMARY KEY,
+    phone TEXT NOT NULL DEFAULT '',
+    current_task_key TEXT NOT NULL DEFAULT '',
+    last_updated TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_user_states_phone ON user_states (phone);
+CREATE INDEX IF NOT EXISTS idx_user_states_task ON user_states (current_task_key);
+"""
+
+
+class SQLiteStateBackend:
+    """
+    Зберігання станів у SQLite (режим WAL). Запис - JSON у колонці data,
+    телефон і поточна задача винесені в індексовані колонки.
+    """
+
+    def __init__(self, path: str):
+        self.location = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.RLock()
+        # isolation_level=None: транзакції відкриваються явно (BEGIN IMMEDIATE)
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SQLITE_SCHEMA)
+
+    def _read(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        row = self._conn.execute(
+            "SELECT data FROM user_states WHERE telegram_id = ?", (telegram_id,)
+        ).fetchone()
+        return cast(Dict[str, Any], json.loads(row[0])) if row else None
+
+    def _write(self, telegram_id: int, record: Dict[str, Any]) -> None:
+        phone, task_key = _index_columns(record)
+        self._conn.execute(
+            "INSERT INTO user_states "
+            "(telegram_id, phone, current_task_key, last_updated, data) "
+            "VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(telegram_id) DO UPDATE SET phone = excluded.phone, "
+            "current_task_key = excluded.current_task_key, "
+            "last_updated = excluded.last_updated, data = excluded.data",
+            (
+                telegram_id,
+                phone,
+                task_key,
+                record.get("last_updated", ""),
+                json.dumps(record, ensure_ascii=False),
+            ),
+        )
+
+    def read(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._read(telegram_id)
+
+    def write(self, telegram_id: int, record: Dict[str, Any]) -> None:
+        with self._lock:
+            self._write(telegram_id, record)
+
+    def write_many(self, records: Dict[int, Dict[str, Any]]) -> None:
+        """Записує пачку станів однією транзакцією"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for telegram_id, record in records.items():
+                    self._write(telegram_id, record)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def delete(self, telegram_id: int) -> bool:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM user_states WHERE telegram_id = ?", (telegram_id,)
+            )
+            return cursor.rowcount > 0
+
+    def list_ids(self) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT telegram_id FROM user_states").fetchall()
+        return [row[0] for row in rows]
+
+    def find_by_phone(self, phone: str) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT telegram_id FROM user_states WHERE phone = ? "
+                "ORDER BY last_updated DESC LIMIT 1",
+                (phone,),
+            ).fetchone()
+        return row[0] if row else None
+
+    def list_current_tasks(self) -> Dict[int, CurrentTask]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT telegram_id, data FROM user_states WHERE current_task_key != ''"
+            ).fetchall()
+        result = {}
+        for telegram_id, data in rows:
+            task = _current_task(json.loads(data))
+            if task:
+                result[telegram_id] = task
+        return result
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM user_states LIMIT 1").fetchone()
+        return row is None
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def migrate_json_states(
+    json_dir: str, backend: SQLiteStateBackend, overwrite: bool = False
+) -> Tuple[int, int]:
+    """
+    Переносить файли user_{id}.json у SQLite. Файли лишаються на місці.
+
+    Args:
+        json_dir: Папка зі станами у форматі JSON
+        backend: Сховище, куди переносяться стани
+        overwrite: Перезаписувати користувачів, які вже є в базі
+
+    Returns:
+        Tuple[int, int]: (перенесено, пропущено)
+    """
+    source = JsonFileStateBackend(Path(json_dir))
+    existing = set(backend.list_ids())
+    migrated = skipped = 0
+    for telegram_id in source.list_ids():
+        if telegram_id in existing and not overwrite:
+            skipped += 1
+            continue
+        try:
+            record = source.read(telegram_id)
+        except Exception as e:
+            logger.error(f"Не вдалося прочитати стан {telegram_id} для міграції: {e}")
+            skipped += 1
+            continue
+        if record is None:
+            continue
+        record.setdefault("telegram_id", telegram_id)
+        record.setdefault("last_updated", datetime.now().isoformat())
+        record.setdefault("state", {})
+        backend.write(telegram_id, record)
+        migrated += 1
+    logger.info(
+        f"Міграцію станів з {json_dir} завершено: перенесено {migrated}, "
+        f"пропущено {skipped}"
+    )
+    return migrated, skipped
+
+
+def create_state_backend(base_dir: Path):
+    """Створює сховище станів за USER_STATE_BACKEND ("sqlite" або "json")"""
+    if USER_STATE_BACKEND == "json":
+        return JsonFileStateBackend(base_dir)
+    if USER_STATE_BACKEND != "sqlite":
+        logger.warning(
+            f"Невідоме сховище станів '{USER_STATE_BACKEND}', використовуємо sqlite"
+        )
+    backend = SQLiteStateBackend(USER_STATE_DB_PATH or str(base_dir / "user_states.db"))
+    if backend.is_empty():
+        # Перший запуск з SQLite: одноразово переносимо наявні JSON-файли
+        migrate_json_states(str(base_dir), backend)
+    return backend
+
+
+class UserStateManager:
+    """
+    Менеджер для збереження стану користувачів (SQLite або файли JSON).
+    Стани кешуються в пам'яті (LRU): читання не звертаються до диска, а зміни
+    одного користувача об'єднуються і записуються фоновим потоком через
+    flush_delay секунд. flush() записує все негайно (викликається при зупинці).
+    """
+
+    def __init__(
+        self,
+        base_dir: str = "/home/Bot1/user_states",
+        backend=None,
+        cache_size: int = USER_STATE_CACHE_SIZE,
+        flush_delay: float = USER_STATE_FLUSH_DELAY,
+        io_workers: int = 2,
+    ):
+        self.base_dir = Path(base_dir)
+        self.base_dir.mkdir(exist_ok=True)
+        self.backend = backend or create_state_backend(self.base_dir)
+        self.cache_size = max(1, cache_size)
+        self.flush_delay = flush_delay
+        self._lock = threading.RLock()
+        # Запис на диск упорядковано: flush і видалення не перетинаються
+        self._flush_lock = threading.Lock()
+        # {telegram_id: запис або None, якщо користувача немає}
+        self._cache: "OrderedDict[int, Optional[Dict[str, Any]]]" = OrderedDict()
+        # Змінені записи, які ще не записані на диск
+        self._dirty: Dict[int, Dict[str, Any]] = {}
+        self._flush_requested = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        # Потоки для читання з диска, щоб async-обробники не блокували event loop
+        self._io_executor = ThreadPoolExecutor(
+            max_workers=io_workers, thread_name_prefix="user-state-io"
+        )
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "flushes": 0,
+            "flushed_records": 0,
+            "flush_errors": 0,
+        }
 
-            with open(user_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+    @staticmethod
+    def _make_record(telegram_id: int, state_data: Dict[str, Any]) -> Dict[str, Any]:
+        # Додаємо метадані
+        return {
+            "telegram_id": telegram_id,
+            "last_updated": datetime.now().isoformat(),
+            "state": state_data,
+        }
+
+    # --- Кеш у пам'яті (_get_record, _remember, _trim, _put - під self._lock) ---
+
+    def _load_into_cache(self, telegram_id: int) -> None:
+        """Підвантажує запис з диска, не утримуючи блокування на час читання"""
+        with self._lock:
+            if telegram_id in self._cache:
+                self.stats["hits"] += 1
+                return
+        record = self.backend.read(telegram_id)
+        with self._lock:
+            # Запис міг з'явитися під час читання - він новіший за дисковий
+            if telegram_id not in self._cache:
+                self.stats["misses"] += 1
+                self._remember(telegram_id, record)
+
+    def _get_record(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        if telegram_id not in self._cache:
+            # Витіснено після _load_into_cache - читаємо повторно
+            self._remember(telegram_id, self.backend.read(telegram_id))
+        self._cache.move_to_end(telegram_id)
+        return self._cache[telegram_id]
+
+    def _remember(self, telegram_id: int, record: Optional[Dict[str, Any]]) -> None:
+        self._cache[telegram_id] = record
+        self._cache.move_to_end(telegram_id)
+        self._trim()
+
+    def _trim(self) -> None:
+        while len(self._cache) > self.cache_size:
+            # Витісняємо найдавніший запис, який вже є на диску
+            evicted = next((key for key in self._cache if key not in self._dirty), None)
+            if evicted is None:
+                break
+            del self._cache[evicted]
+
+    def _put(self, telegram_id: int, state_data: Dict[str, Any]) -> None:
+        record = self._make_record(telegram_id, state_data)
+        self.stats["writes"] += 1
+        if self.flush_delay <= 0:
+            self.backend.write(telegram_id, copy.deepcopy(record))
+        else:
+            # Позначаємо до _remember, щоб свіжий запис не було витіснено
+            self._dirty[telegram_id] = record
+            self._schedule_flush()
+        self._remember(telegram_id, record)
+
+    # --- Фоновий запис ---
+
+    def _schedule_flush(self) -> None:
+        if self._flusher is None or not self._flusher.is_alive():
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="user-state-flush", daemon=True
+            )
+            self._flusher.start()
+        self._flush_requested.set()
+
+    def _flush_loop(self) -> None:
+        while True:
+            self._flush_requested.wait()
+            # Зміни, що надійдуть за час затримки, запишуться разом
+            time.sleep(self.flush_delay)
+            self._flush_requested.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """Записує всі незбережені зміни на диск. Повертає кількість записів"""
+        with self._flush_lock:
+            with self._lock:
+                # Записи лишаються в _dirty до кінця запису: поки вони не на
+                # диску, _trim не витісняє їх і читання не бере старий рядок
+                written = dict(self._dirty)
+                pending = {
+                    telegram_id: copy.deepcopy(record)
+                    for telegram_id, record in written.items()
+                }
+            if not pending:
+                return 0
+            try:
+                self.backend.write_many(pending)
+            except Exception as e:
+                self.stats["flush_errors"] += 1
+                logger.error(f"Помилка запису станів користувачів на диск: {e}")
+                self._flush_requested.set()
+                return 0
+            with self._lock:
+                for telegram_id, record in written.items():
+                    # Запис, змінений під час запису на диск, чекає наступного flush
+                    if self._dirty.get(telegram_id) is record:
+                        del self._dirty[telegram_id]
+                # Записи, що вже на диску, тепер можна витісняти
+                self._trim()
+        self.stats["flushes"] += 1
+        self.stats["flushed_records"] += len(pending)
+        logger.debug(
+            f"Записано {len(pending)} станів користувачів у {self.backend.location}"
+        )
+        return len(pending)
+
+    # --- Публічний API ---
 
-            logger.info(f"Збережено стан користувача {telegram_id} у файл {user_file}")
+    def save_user_state(self, telegram_id: int, state_data: Dict[str, Any]) -> bool:
+        """Зберігає стан користувача"""
+        try:
+            with self._lock:
+                self._put(telegram_id, copy.deepcopy(state_data))
+            logger.info(f"Збережено стан користувача {telegram_id}")
             return True
 
         except Exception as e:
             logger.error(f"Помилка збереження стану користувача {telegram_id}: {e}")
             return False
 
+    def update_user_state(self, telegram_id: int, mutator: StateMutator) -> bool:
+        """
+        Атомарно змінює стан користувача: читання, mutator і запис виконуються
+        як одна операція. Повертає True, якщо новий стан записано.
+        """
+        try:
+            self._load_into_cache(telegram_id)
+            with self._lock:
+                record = self._get_record(telegram_id)
+                current = copy.deepcopy(record.get("state", {})) if record else None
+                new_state = mutator(current)
+                if new_state is None:
+                    return False
+                self._put(telegram_id, new_state)
+                return True
+        except Exception as e:
+            logger.error(f"Помилка оновлення стану користувача {telegram_id}: {e}")
+            return False
+
     def load_user_state(self, telegram_id: int) -> Optional[Dict[str, Any]]:
-        """Завантажує стан користувача з файлу"""
+        """Завантажує стан користувача"""
         try:
-            user_file = self._get_user_file(telegram_id)
+            self._load_into_cache(telegram_id)
+            with self._lock:
+                record = self._get_record(telegram_id)
+                state = copy.deepcopy(record.get("state", {})) if record else None
 
-            if not user_file.exists():
-                logger.info(f"Файл стану для користувача {telegram_id} не знайдено")
+            if state is None:
+                logger.info(f"Стан для користувача {telegram_id} не знайдено")
                 return None
 
-            with open(user_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-
-            logger.info(
-                f"Завантажено стан користувача {telegram_id} з файлу {user_file}"
-            )
-            return cast(Dict[str, Any], data.get("state", {}))
+            return cast(Dict[str, Any], state)
 
         except Exception as e:
             logger.error(f"Помилка завантаження стану користувача {telegram_id}: {e}")
             return None
 
     def delete_user_state(self, telegram_id: int) -> bool:
-        """Видаляє файл стану користувача"""
+        """Видаляє стан користувача"""
         try:
-            user_file = self._get_user_file(telegram_id)
-
-            if user_file.exists():
-                user_file.unlink()
-                logger.info(f"Видалено файл стану користувача {telegram_id}")
+            with self._flush_lock, self._lock:
+                was_pending = self._dirty.pop(telegram_id, None) is not None
+                self._remember(telegram_id, None)
+                deleted = self.backend.delete(telegram_id) or was_pending
+            if deleted:
+                logger.info(f"Видалено стан користувача {telegram_id}")
                 return True
             else:
-                logger.info(f"Файл стану користувача {telegram_id} не існує")
+                logger.info(f"Стан користувача {telegram_id} не існує")
                 return False
 
         except Exception as e:
@@ -84,23 +537,10 @@ class UserStateManager:
             return False
 
     def list_all_users(self) -> list:
-        """Повертає список всіх користувачів з файлами стану"""
+        """Повертає список всіх користувачів зі збереженим станом"""
         try:
-            user_files = list(self.base_dir.glob("user_*.json"))
-            telegram_ids = []
-
-            for file_path in user_files:
-                try:
-                    # Витягуємо telegram_id з назви файлу
-                    filename = file_path.stem  # user_123456789
-                    telegram_id = int(filename.split("_")[1])
-                    telegram_ids.append(telegram_id)
-                except (ValueError, IndexError):
-                    logger.warning(f"Неправильна назва файлу: {file_path}")
-                    continue
-
-            return telegram_ids
-
+            self.flush()
+            return self.backend.list_ids()
         except Exception as e:
             logger.error(f"Помилка отримання списку користувачів: {e}")
             return []
@@ -108,29 +548,98 @@ class UserStateManager:
     def get_user_info(self, telegram_id: int) -> Optional[Dict[str, Any]]:
         """Повертає повну інформацію про користувача (включно з метаданими)"""
         try:
-            user_file = self._get_user_file(telegram_id)
-
-            if not user_file.exists():
-                return None
-
-            with open(user_file, "r", encoding="utf-8") as f:
-                return cast(Dict[str, Any], json.load(f))
-
+            self._load_into_cache(telegram_id)
+            with self._lock:
+                return copy.deepcopy(self._get_record(telegram_id))
         except Exception as e:
             logger.error(
                 f"Помилка отримання інформації про користувача {telegram_id}: {e}"
             )
             return None
 
+    def find_user_by_phone(self, phone: str) -> Optional[int]:
+        """Шукає Telegram ID користувача за номером телефону з профілю"""
+        normalized = _normalize_phone(phone)
+        if not normalized:
+            return None
+        try:
+            self.flush()
+            return self.backend.find_by_phone(normalized)
+        except Exception as e:
+            logger.error(f"Помилка пошуку користувача за телефоном: {e}")
+            return None
+
+    def list_current_tasks(self) -> Dict[int, CurrentTask]:
+        """{telegram_id: {"task_key", "status"}} для користувачів з поточною задачею"""
+        try:
+            self.flush()
+            return self.backend.list_current_tasks()
+        except Exception as e:
+            logger.error(f"Помилка отримання поточних задач користувачів: {e}")
+            return {}
+
+    # --- Async API: звернення до диска виконуються в окремих потоках ---
+
+    def serves_from_memory(self, telegram_id: int) -> bool:
+        """Чи обійдеться операція з цим користувачем без звернення до диска"""
+        with self._lock:
+            return self.flush_delay > 0 and telegram_id in self._cache
+
+    async def run_io(self, telegram_id: Optional[int], func: Callable, *args) -> Any:
+        """
+        Виконує синхронну операцію зі станом: одразу, якщо стан користувача
+        вже в пам'яті, інакше - в потоці вводу-виводу.
+        """
+        if telegram_id is not None and self.serves_from_memory(telegram_id):
+            return func(*args)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._io_executor, functools.partial(func, *args)
+        )
+
+    async def aload_user_state(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        return await self.run_io(telegram_id, self.load_user_state, telegram_id)
+
+    async def asave_user_state(
+        self, telegram_id: int, state_data: Dict[str, Any]
+    ) -> bool:
+        return await self.run_io(
+            telegram_id, self.save_user_state, telegram_id, state_data
+        )
+
+    async def aupdate_user_state(self, telegram_id: int, mutator: StateMutator) -> bool:
+        return await self.run_io(
+            telegram_id, self.update_user_state, telegram_id, mutator
+        )
+
+    async def adelete_user_state(self, telegram_id: int) -> bool:
+        return await self.run_io(None, self.delete_user_state, telegram_id)
+
+    async def aget_user_info(self, telegram_id: int) -> Optional[Dict[str, Any]]:
+        return await self.run_io(telegram_id, self.get_user_info, telegram_id)
+
+    async def alist_all_users(self) -> list:
+        return await self.run_io(None, self.list_all_users)
+
+    async def aflush(self) -> int:
+        return await self.run_io(None, self.flush)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан кешу для status endpoint"""
+        with self._lock:
+            return {
+                "backend": type(self.backend).__name__,
+                "cached": len(self._cache),
+                "dirty": len(self._dirty),
+                **self.stats,
+            }
+
 
 def save_user_profile(
     telegram_id: int, user_data: Dict[str, Any], status: str = "active"
 ) -> bool:
     """Зберігає повний профіль користувача як резервну копію та кеш"""
-    try:
-        # Завантажуємо існуючий стан, щоб зберегти bot_state
-        current_state = user_state_manager.load_user_state(telegram_id)
 
+    def _build_profile(current_state: Optional[Dict[str, Any]]) -> Dict[str, Any]:
         profile_data = {
             "profile": user_data,
             "status": status,  # active, registration_in_progress, inactive
@@ -144,8 +653,11 @@ def save_user_profile(
             logger.info(
                 f"Збережено існуючий bot_state для користувача {telegram_id}: {current_state['bot_state']}"
             )
+        return profile_data
 
-        return user_state_manager.save_user_state(telegram_id, profile_data)
+    try:
+        # Читання існуючого bot_state і запис профілю - одна атомарна операція
+        return user_state_manager.update_user_state(telegram_id, _build_profile)
     except Exception as e:
         logger.error(f"Помилка збереження профілю користувача {telegram_id}: {e}")
         return False
@@ -165,13 +677,16 @@ def load_user_profile(telegram_id: int) -> Optional[Dict[str, Any]]:
 
 def update_user_sync_status(telegram_id: int, synced: bool) -> bool:
     """Оновлює статус синхронізації з Google Sheets"""
+
+    def _mark_synced(state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not state or state.get("type") != "user_profile":
+            return None
+        state["sync_with_google"] = synced
+        state["last_sync"] = datetime.now().isoformat()
+        return state
+
     try:
-        state = user_state_manager.load_user_state(telegram_id)
-        if state and state.get("type") == "user_profile":
-            state["sync_with_google"] = synced
-            state["last_sync"] = datetime.now().isoformat()
-            return user_state_manager.save_user_state(telegram_id, state)
-        return False
+        return user_state_manager.update_user_state(telegram_id, _mark_synced)
     except Exception as e:
         logger.error(f"Помилка оновлення статусу синхронізації {telegram_id}: {e}")
         return False
@@ -199,6 +714,15 @@ def list_all_cached_users() -> List[Dict[str, Any]]:
 user_state_manager = UserStateManager()
 
 
+def flush_user_states() -> int:
+    """Негайно записує незбережені стани користувачів (при зупинці бота)"""
+    return user_state_manager.flush()
+
+
+# Страховка на випадок завершення процесу без штатної зупинки
+atexit.register(flush_user_states)
+
+
 def save_registration_state(
     telegram_id: int, registration_data: Dict[str, Any], registration_step: str
 ) -> bool:
@@ -322,14 +846,13 @@ def get_user_bot_state(telegram_id: int) -> str:
 
 def set_user_bot_state(telegram_id: int, bot_state: str, task_key: str = "") -> bool:
     """Встановлює стан бота для користувача"""
-    try:
-        # Завантажуємо поточний стан
-        current_state = user_state_manager.load_user_state(telegram_id)
+
+    def _apply(current_state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
         if not current_state:
             logger.warning(
                 f"Неможливо встановити стан бота для неіснуючого користувача {telegram_id}"
             )
-            return False
+            return None
 
         # Додаємо або оновлюємо bot_state
         if "bot_state" not in current_state:
@@ -339,15 +862,21 @@ def set_user_bot_state(telegram_id: int, bot_state: str, task_key: str = "") ->
         current_state["bot_state"]["last_updated"] = datetime.now().isoformat()
 
         if bot_state == BotState.AUTHORIZED_WITH_TASK and task_key:
+            if current_state["bot_state"].get("current_task_key") != task_key:
+                current_state["bot_state"].pop("current_task_status", None)
             current_state["bot_state"]["current_task_key"] = task_key
         elif bot_state == BotState.AUTHORIZED_NO_TASKS:
             current_state["bot_state"]["current_task_key"] = ""
+            current_state["bot_state"].pop("current_task_status", None)
+        return current_state
 
+    try:
         # Зберігаємо оновлений стан
-        result = user_state_manager.save_user_state(telegram_id, current_state)
-        logger.info(
-            f"Встановлено стан бота для користувача {telegram_id}: {bot_state} (задача: {task_key})"
-        )
+        result = user_state_manager.update_user_state(telegram_id, _apply)
+        if result:
+            logger.info(
+                f"Встановлено стан бота для користувача {telegram_id}: {bot_state} (задача: {task_key})"
+            )
         return result
 
     except Exception as e:
@@ -382,6 +911,33 @@ def clear_user_current_task(telegram_id: int) -> bool:
     return set_user_bot_state(telegram_id, BotState.AUTHORIZED_NO_TASKS)
 
 
+def clear_user_current_task_if(telegram_id: int, task_key: str) -> bool:
+    """
+    Очищає поточну задачу, лише якщо нею досі є task_key. Для фонових
+    перевірок: користувач міг створити нову задачу, поки йшов запит до Jira.
+    """
+
+    def _apply(state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        bot_state = (state or {}).get("bot_state") or {}
+        if not state or bot_state.get("current_task_key") != task_key:
+            return None
+        bot_state["state"] = BotState.AUTHORIZED_NO_TASKS
+        bot_state["last_updated"] = datetime.now().isoformat()
+        bot_state["current_task_key"] = ""
+        bot_state.pop("current_task_status", None)
+        state["bot_state"] = bot_state
+        return state
+
+    try:
+        result = user_state_manager.update_user_state(telegram_id, _apply)
+        if result:
+            logger.info(f"Задачу {task_key} користувача {telegram_id} закрито")
+        return result
+    except Exception as e:
+        logger.error(f"Помилка очищення задачі {task_key} для {telegram_id}: {e}")
+        return False
+
+
 def get_user_current_task(telegram_id: int) -> str:
     """Отримує ключ поточної задачі користувача"""
     try:
@@ -394,3 +950,149 @@ def get_user_current_task(telegram_id: int) -> str:
             f"Помилка отримання поточної задачі користувача {telegram_id}: {e}"
         )
         return ""
+
+
+def set_user_task_status(telegram_id: int, task_key: str, status: str) -> bool:
+    """
+    Запам'ятовує останній відомий користувачу статус поточної задачі, щоб
+    сповіщати лише про справжні зміни. Ігнорується, якщо задача вже не поточна.
+    """
+
+    def _apply(state: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        bot_state = (state or {}).get("bot_state") or {}
+        if not state or bot_state.get("current_task_key") != task_key:
+            return None
+        if bot_state.get("current_task_status") == status:
+            return None
+        bot_state["current_task_status"] = status
+        state["bot_state"] = bot_state
+        return state
+
+    try:
+        return user_state_manager.update_user_state(telegram_id, _apply)
+    except Exception as e:
+        logger.error(
+            f"Помилка збереження статусу задачі {task_key} для {telegram_id}: {e}"
+        )
+        return False
+
+
+def list_users_with_current_task() -> Dict[int, CurrentTask]:
+    """
+    Повертає користувачів з поточною задачею:
+    {telegram_id: {"task_key": str, "status": останній відомий статус або None}}
+    """
+    return user_state_manager.list_current_tasks()
+
+
+def find_cached_user_by_phone(phone: str) -> Optional[Dict[str, Any]]:
+    """Шукає профіль у локальному кеші за номером телефону"""
+    telegram_id = user_state_manager.find_user_by_phone(phone)
+    if telegram_id is None:
+        return None
+    profile = load_user_profile(telegram_id)
+    if profile is not None:
+        profile["telegram_id"] = telegram_id
+    return profile
+
+
+# === Async-варіанти для обробників ===
+# Стан користувача з кешу повертається без переходу в інший потік, а
+# операції, яким потрібен диск, виконуються в потоках вводу-виводу.
+
+
+async def aload_user_profile(telegram_id: int) -> Optional[Dict[str, Any]]:
+    return await user_state_manager.run_io(telegram_id, load_user_profile, telegram_id)
+
+
+async def asave_user_profile(
+    telegram_id: int, user_data: Dict[str, Any], status: str = "active"
+) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, save_user_profile, telegram_id, user_data, status
+    )
+
+
+async def aupdate_user_sync_status(telegram_id: int, synced: bool) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, update_user_sync_status, telegram_id, synced
+    )
+
+
+async def alist_all_cached_users() -> List[Dict[str, Any]]:
+    return await user_state_manager.run_io(None, list_all_cached_users)
+
+
+async def asave_registration_state(
+    telegram_id: int, registration_data: Dict[str, Any], registration_step: str
+) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id,
+        save_registration_state,
+        telegram_id,
+        registration_data,
+        registration_step,
+    )
+
+
+async def aload_registration_state(telegram_id: int) -> Optional[Dict[str, Any]]:
+    # Може видалити застарілу реєстрацію - завжди в потоці вводу-виводу
+    return await user_state_manager.run_io(None, load_registration_state, telegram_id)
+
+
+async def acomplete_registration(telegram_id: int) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, complete_registration, telegram_id
+    )
+
+
+async def aget_user_bot_state(telegram_id: int) -> str:
+    return await user_state_manager.run_io(telegram_id, get_user_bot_state, telegram_id)
+
+
+async def aset_user_bot_state(
+    telegram_id: int, bot_state: str, task_key: str = ""
+) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, set_user_bot_state, telegram_id, bot_state, task_key
+    )
+
+
+async def acomplete_user_registration_and_set_state(telegram_id: int) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, complete_user_registration_and_set_state, telegram_id
+    )
+
+
+async def aset_user_current_task(telegram_id: int, task_key: str) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, set_user_current_task, telegram_id, task_key
+    )
+
+
+async def aclear_user_current_task(telegram_id: int) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, clear_user_current_task, telegram_id
+    )
+
+
+async def aclear_user_current_task_if(telegram_id: int, task_key: str) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, clear_user_current_task_if, telegram_id, task_key
+    )
+
+
+async def aget_user_current_task(telegram_id: int) -> str:
+    return await user_state_manager.run_io(
+        telegram_id, get_user_current_task, telegram_id
+    )
+
+
+async def aset_user_task_status(telegram_id: int, task_key: str, status: str) -> bool:
+    return await user_state_manager.run_io(
+        telegram_id, set_user_task_status, telegram_id, task_key, status
+    )
+
+
+async def alist_users_with_current_task() -> Dict[int, CurrentTask]:
+    return await user_state_manager.run_io(None, list_users_with_current_task)
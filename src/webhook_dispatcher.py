@@ -0,0 +1,187 @@
+"""
+Черга обробки вебхуків Jira.
+HTTP endpoint лише валідує подію і ставить її в обмежену чергу, а пул
+воркерів обробляє події у фоні. Події однієї задачі обробляються строго
+по черзі, події різних задач - паралельно.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from config.config import WEBHOOK_WORKERS, WEBHOOK_QUEUE_MAX_SIZE
+
+logger = logging.getLogger(__name__)
+
+WebhookHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+class WebhookDispatcher:
+    """Обмежена черга вебхуків з пулом воркерів і впорядкуванням за задачею"""
+
+    def __init__(
+        self,
+        workers: int = WEBHOOK_WORKERS,
+        max_queue_size: int = WEBHOOK_QUEUE_MAX_SIZE,
+    ):
+        self.worker_count = max(1, workers)
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # Задачі, для яких вже є подія в обробці або в черзі:
+        # наступні події цієї задачі чекають тут, щоб зберегти порядок
+        self._issue_backlog: Dict[str, Deque[Dict[str, Any]]] = {}
+        self._pending = 0
+        self.stats = {"accepted": 0, "rejected": 0, "processed": 0, "failed": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    @property
+    def pending(self) -> int:
+        """Кількість подій, що очікують або обробляються"""
+        return self._pending
+
+    async def start(self) -> None:
+        """Запускає воркери"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker(idx), name=f"webhook-worker-{idx}")
+            for idx in range(self.worker_count)
+        ]
+        logger.info(
+            f"Запущено {self.worker_count} воркерів вебхуків (черга до {self.max_queue_size} подій)"
+        )
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Дає воркерам дообробити чергу і зупиняє їх"""
+        if not self.running or self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Черга вебхуків не спорожніла за {timeout} с, залишилось {self._pending} подій"
+            )
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Воркери вебхуків зупинено")
+
+    def submit(
+        self,
+        event_type: str,
+        webhook_data: Dict[str, Any],
+        handler: WebhookHandler,
+        ordering_key: Optional[str] = None,
+    ) -> bool:
+        """
+        Ставить подію в чергу без очікування обробки.
+
+        Args:
+            event_type: Тип події Jira
+            webhook_data: Дані вебхука
+            handler: Обробник події
+            ordering_key: Ключ задачі для впорядкування (None - без впорядкування)
+
+        Returns:
+            bool: False якщо черга заповнена (подію не прийнято)
+        """
+        if not self.running or self._queue is None:
+            raise RuntimeError("Webhook dispatcher is not started")
+
+        if self._pending >= self.max_queue_size:
+            self.stats["rejected"] += 1
+            logger.warning(
+                f"Черга вебхуків заповнена ({self._pending}), подію {event_type} відхилено"
+            )
+            return False
+
+        job = {
+            "event_type": event_type,
+            "data": webhook_data,
+            "handler": handler,
+            "ordering_key": ordering_key,
+        }
+        self._pending += 1
+        self.stats["accepted"] += 1
+
+        if ordering_key:
+            backlog = self._issue_backlog.get(ordering_key)
+            if backlog is not None:
+                # Задача вже обробляється - подія піде за попередніми
+                backlog.append(job)
+                return True
+            self._issue_backlog[ordering_key] = deque()
+
+        self._queue.put_nowait(job)
+        return True
+
+    async def _worker(self, idx: int) -> None:
+        assert self._queue is not None
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_ordered(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run_ordered(self, job: Dict[str, Any]) -> None:
+        """Обробляє подію і всі події тієї ж задачі, що надійшли за нею"""
+        ordering_key = job["ordering_key"]
+        next_job: Optional[Dict[str, Any]] = job
+        while next_job is not None:
+            await self._run_job(next_job)
+            next_job = None
+            if ordering_key:
+                backlog = self._issue_backlog.get(ordering_key)
+                if backlog:
+                    next_job = backlog.popleft()
+                else:
+                    self._issue_backlog.pop(ordering_key, None)
+
+    async def _run_job(self, job: Dict[str, Any]) -> None:
+        event_type = job["event_type"]
+        try:
+            await job["handler"](job["data"])
+            self.stats["processed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Error in {event_type} handler: {str(e)}", exc_info=True)
+        finally:
+            self._pending -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан черги для status endpoint"""
+        return {
+            "workers": len(self._workers),
+            "pending": self._pending,
+            "max_size": self.max_queue_size,
+            "active_issues": len(self._issue_backlog),
+            **self.stats,
+        }
+
+
+# Глобальний диспетчер вебхуків
+_webhook_dispatcher: Optional[WebhookDispatcher] = None
+
+
+def get_webhook_dispatcher() -> WebhookDispatcher:
+    """Повертає глобальний диспетчер (створює його при першому зверненні)"""
+    global _webhook_dispatcher
+    if _webhook_dispatcher is None:
+        _webhook_dispatcher = WebhookDispatcher()
+    return _webhook_dispatcher
+
+
+async def stop_webhook_dispatcher() -> None:
+    """Зупиняє глобальний диспетчер при завершенні роботи"""
+    global _webhook_dispatcher
+    if _webhook_dispatcher is not None:
+        await _webhook_dispatcher.stop()
+        _webhook_dispatcher = None
@@ -0,0 +1,342 @@
+"""
+Журнал прийнятих вебхуків Jira на диску (SQLite у режимі WAL).
+Кожна подія записується до відповіді Jira, а після обробки позначається
+виконаною. Після перезапуску бота незавершені події відтворюються.
+Записи групуються: всі операції, що накопичились за короткий інтервал,
+фіксуються одним commit, тому fsync виконується раз на групу, а не на подію.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.config import (
+    WEBHOOK_SPOOL_ENABLED,
+    WEBHOOK_SPOOL_PATH,
+    WEBHOOK_SPOOL_FLUSH_INTERVAL,
+    WEBHOOK_SPOOL_RETENTION_HOURS,
+    WEBHOOK_SPOOL_MAX_REPLAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+STATUS_PENDING = "pending"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_key TEXT NOT NULL UNIQUE,
+    event_type TEXT NOT NULL,
+    issue_key TEXT,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    received_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_webhook_events_status ON webhook_events (status, id);
+"""
+
+
+def make_event_key(webhook_data: Dict[str, Any]) -> str:
+    """Ключ ідемпотентності: повторна доставка тієї ж події дає той самий ключ"""
+    canonical = json.dumps(webhook_data, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class WebhookSpool:
+    """Журнал вебхуків з груповими commit-ами в окремому потоці"""
+
+    def __init__(
+        self,
+        path: str = WEBHOOK_SPOOL_PATH,
+        flush_interval: float = WEBHOOK_SPOOL_FLUSH_INTERVAL,
+        retention_hours: float = WEBHOOK_SPOOL_RETENTION_HOURS,
+        max_replays: int = WEBHOOK_SPOOL_MAX_REPLAYS,
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention_seconds = retention_hours * 3600
+        self.max_replays = max_replays
+        # Один потік - одне з'єднання SQLite, всі записи послідовні
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="spool")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._ops: List[Tuple[str, tuple, Optional[asyncio.Future]]] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._writer: Optional[asyncio.Task] = None
+        # Відтворюються лише події попередніх запусків (id <= межі), по порядку:
+        # курсор - останній відданий на відтворення id
+        self._replay_boundary = 0
+        self._replay_cursor = 0
+        self.stats = {"appended": 0, "duplicates": 0, "commits": 0, "replayed": 0}
+
+    # --- Синхронна частина (виконується в потоці журналу) ---
+
+    def _open(self) -> int:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SCHEMA)
+        cutoff = time.time() - self.retention_seconds
+        self._conn.execute(
+            "DELETE FROM webhook_events WHERE status != ? AND finished_at < ?",
+            (STATUS_PENDING, cutoff),
+        )
+        self._conn.commit()
+        row = self._conn.execute("SELECT MAX(id) FROM webhook_events").fetchone()
+        return row[0] or 0
+
+    def _apply_batch(
+        self, ops: List[Tuple[str, tuple, Optional[asyncio.Future]]]
+    ) -> List[Any]:
+        """Виконує всі операції групи в одній транзакції"""
+        assert self._conn is not None
+        results: List[Any] = []
+        now = time.time()
+        with self._conn:
+            for op, args, _ in ops:
+                if op == "append":
+                    cursor = self._conn.execute(
+                        "INSERT OR IGNORE INTO webhook_events "
+                        "(event_key, event_type, issue_key, payload, received_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (*args, now),
+                    )
+                    results.append(cursor.lastrowid if cursor.rowcount == 1 else None)
+                elif op == "finish":
+                    event_id, status = args
+                    self._conn.execute(
+                        "UPDATE webhook_events SET status = ?, finished_at = ? WHERE id = ?",
+                        (status, now, event_id),
+                    )
+                    results.append(None)
+                elif op == "release":
+                    self._conn.executemany(
+                        "UPDATE webhook_events SET attempts = attempts - 1 "
+                        "WHERE id = ? AND attempts > 0",
+                        [(event_id,) for event_id in args],
+                    )
+                    results.append(None)
+                elif op == "discard":
+                    self._conn.execute(
+                        "DELETE FROM webhook_events WHERE id = ?", (args[0],)
+                    )
+                    results.append(None)
+        return results
+
+    def _load_pending(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Повертає до limit незавершених подій після курсора і збільшує лічильник
+        спроб лише для повернутих подій
+        """
+        assert self._conn is not None
+        rows = self._conn.execute(
+            "SELECT id, event_type, payload, attempts FROM webhook_events "
+            "WHERE status = ? AND id > ? AND id <= ? ORDER BY id",
+            (STATUS_PENDING, self._replay_cursor, self._replay_boundary),
+        ).fetchall()
+        events: List[Dict[str, Any]] = []
+        with self._conn:
+            for event_id, event_type, payload, attempts in rows:
+                if len(events) >= limit:
+                    break
+                self._replay_cursor = event_id
+                if attempts >= self.max_replays:
+                    # Подія вже кілька разів валила бота - не відтворюємо її знову
+                    self._conn.execute(
+                        "UPDATE webhook_events SET status = ?, finished_at = ? WHERE id = ?",
+                        (STATUS_FAILED, time.time(), event_id),
+                    )
+                    logger.error(
+                        f"Подію {event_id} ({event_type}) пропущено після {attempts} спроб"
+                    )
+                    continue
+                self._conn.execute(
+                    "UPDATE webhook_events SET attempts = attempts + 1 WHERE id = ?",
+                    (event_id,),
+                )
+                events.append(
+                    {
+                        "id": event_id,
+                        "event_type": event_type,
+                        "data": json.loads(payload),
+                    }
+                )
+            else:
+                # Переглянуто всі події до межі
+                self._replay_cursor = self._replay_boundary
+        return events
+
+    # --- Асинхронний інтерфейс ---
+
+    @property
+    def running(self) -> bool:
+        return self._writer is not None
+
+    async def open(self) -> None:
+        """Відкриває базу і запускає фоновий запис груп"""
+        if self._writer is not None:
+            return
+        self._replay_boundary = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._open
+        )
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._writer_loop(), name="webhook-spool")
+        logger.info(f"Журнал вебхуків відкрито: {self.path}")
+
+    async def _writer_loop(self) -> None:
+        assert self._wakeup is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # Коротка пауза, щоб зібрати в групу події, що надходять одночасно
+            await asyncio.sleep(self.flush_interval)
+            await self._flush(loop)
+
+    async def _flush(self, loop: asyncio.AbstractEventLoop) -> None:
+        ops, self._ops = self._ops, []
+        if not ops:
+            return
+        try:
+            results = await loop.run_in_executor(
+                self._executor, self._apply_batch, ops
+            )
+            self.stats["commits"] += 1
+            for (_, _, future), result in zip(ops, results):
+                if future is not None and not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logger.error(f"Помилка запису журналу вебхуків: {e}", exc_info=True)
+            for _, _, future in ops:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+
+    def _enqueue(
+        self, op: str, args: tuple, future: Optional[asyncio.Future] = None
+    ) -> None:
+        """Додає операцію до наступної групи, не чекаючи на її запис"""
+        if self._wakeup is None:
+            raise RuntimeError("Webhook spool is not open")
+        self._ops.append((op, args, future))
+        self._wakeup.set()
+
+    def _schedule_and_wait(self, op: str, args: tuple) -> asyncio.Future:
+        """Додає операцію до наступної групи; future завершиться після запису"""
+        future = asyncio.get_running_loop().create_future()
+        self._enqueue(op, args, future)
+        return future
+
+    async def append(
+        self, event_type: str, issue_key: Optional[str], webhook_data: Dict[str, Any]
+    ) -> Optional[int]:
+        """
+        Записує подію і чекає, поки її група буде зафіксована на диску.
+
+        Returns:
+            Optional[int]: ID події або None, якщо це повторна доставка
+        """
+        payload = json.dumps(webhook_data, ensure_ascii=False)
+        event_id = await self._schedule_and_wait(
+            "append", (make_event_key(webhook_data), event_type, issue_key, payload)
+        )
+        if event_id is None:
+            self.stats["duplicates"] += 1
+        else:
+            self.stats["appended"] += 1
+        return event_id
+
+    def mark_done(self, event_id: int, failed: bool = False) -> None:
+        """Позначає подію обробленою (буде зафіксовано з наступною групою)"""
+        status = STATUS_FAILED if failed else STATUS_DONE
+        self._enqueue("finish", (event_id, status))
+
+    async def discard(self, event_id: int) -> None:
+        """Видаляє подію, яку не вдалося поставити в чергу"""
+        await self._schedule_and_wait("discard", (event_id,))
+
+    async def load_pending(self, limit: int) -> List[Dict[str, Any]]:
+        """
+        Повертає наступні незавершені події попередніх запусків для відтворення.
+        Події, які не вдалося поставити в чергу, треба повернути через release().
+
+        Args:
+            limit: Скільки подій поміститься в чергу обробки
+        """
+        if limit <= 0:
+            return []
+        events = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._load_pending, limit
+        )
+        self.stats["replayed"] += len(events)
+        return events
+
+    async def release(self, events: List[Dict[str, Any]]) -> None:
+        """
+        Повертає події, не поставлені в чергу: спроба не зараховується, і
+        наступне відтворення почнеться з першої з них
+        """
+        if not events:
+            return
+        self._replay_cursor = min(self._replay_cursor, events[0]["id"] - 1)
+        self.stats["replayed"] -= len(events)
+        await self._schedule_and_wait(
+            "release", tuple(event["id"] for event in events)
+        )
+
+    @property
+    def has_replay_backlog(self) -> bool:
+        """Чи могли лишитися події попередніх запусків, які ще не відтворено"""
+        return self._replay_cursor < self._replay_boundary
+
+    async def close(self) -> None:
+        """Фіксує залишок операцій і закриває базу"""
+        if self._writer is None:
+            return
+        self._writer.cancel()
+        await asyncio.gather(self._writer, return_exceptions=True)
+        self._writer = None
+        loop = asyncio.get_running_loop()
+        await self._flush(loop)
+        if self._conn is not None:
+            await loop.run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+        logger.info("Журнал вебхуків закрито")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Стан журналу для status endpoint"""
+        return {"path": self.path, "buffered": len(self._ops), **self.stats}
+
+
+# Глобальний журнал вебхуків
+_webhook_spool: Optional[WebhookSpool] = None
+
+
+def get_webhook_spool() -> Optional[WebhookSpool]:
+    """Повертає глобальний журнал або None, якщо його вимкнено в конфігурації"""
+    global _webhook_spool
+    if not WEBHOOK_SPOOL_ENABLED:
+        return None
+    if _webhook_spool is None:
+        _webhook_spool = WebhookSpool()
+    return _webhook_spool
+
+
+async def close_webhook_spool() -> None:
+    """Закриває глобальний журнал при завершенні роботи"""
+    global _webhook_spool
+    if _webhook_spool is not None:
+        await _webhook_spool.close()
+        _webhook_spool = None
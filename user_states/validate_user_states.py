@@ -1,29 +1,50 @@
 #!/usr/bin/env python3
 """
-Валідатор для JSON файлів станів користувачів.
+Валідатор збережених станів користувачів.
 Використовується для перевірки структури та цілісності даних.
+Стани читаються з того сховища, з яким працює бот (USER_STATE_BACKEND):
+SQLite (user_states.db) або файли user_{id}.json.
 """
 
-import json
 import os
+import sys
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from datetime import datetime
 
+# Додаємо шлях до модулів проекту
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from src.user_state_service import create_state_backend  # noqa: E402
+
 
 class UserStateValidator:
-    """Валідатор для перевірки JSON файлів станів користувачів."""
+    """Валідатор для перевірки збережених станів користувачів."""
     
-    def __init__(self, user_states_dir: str = "user_states"):
+    def __init__(self, user_states_dir: str = "user_states", backend=None):
         """
         Ініціалізація валідатора.
         
         Args:
             user_states_dir: Папка зі станами користувачів
+            backend: Сховище станів (за замовчуванням - як у бота)
         """
         self.user_states_dir = Path(user_states_dir)
+        self.backend = backend
         self.errors: List[str] = []
         self.warnings: List[str] = []
+
+    def _records(self) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+        """Повертає (назва запису, дані або None, якщо запис не прочитано)"""
+        if self.backend is None:
+            self.backend = create_state_backend(self.user_states_dir)
+        for telegram_id in self.backend.list_ids():
+            source = f"{self.backend.location}: {telegram_id}"
+            try:
+                yield source, self.backend.read(telegram_id)
+            except Exception as e:
+                self.errors.append(f"Не вдалося прочитати стан {source}: {e}")
+                yield source, None
     
     def validate_user_state_structure(self, user_data: Dict[str, Any]) -> bool:
         """
@@ -65,35 +86,32 @@ class UserStateValidator:
         
         return True
     
-    def validate_file(self, file_path: Path) -> Optional[Dict[str, Any]]:
+    def validate_record(
+        self, source: str, user_data: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
         """
-        Валідація одного JSON файлу.
+        Валідація одного збереженого стану.
         
         Args:
-            file_path: Шлях до файлу
+            source: Назва запису для повідомлень про помилки
+            user_data: Прочитаний стан
             
         Returns:
-            Дані користувача якщо файл валідний, None інакше
+            Дані користувача якщо стан валідний, None інакше
         """
+        if user_data is None:
+            return None
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                user_data = json.load(f)
-            
             if self.validate_user_state_structure(user_data):
                 return user_data
-            
-        except json.JSONDecodeError as e:
-            self.errors.append(f"Помилка JSON у файлі {file_path}: {e}")
-        except FileNotFoundError:
-            self.errors.append(f"Файл не знайдено: {file_path}")
         except Exception as e:
-            self.errors.append(f"Невідома помилка у файлі {file_path}: {e}")
+            self.errors.append(f"Невідома помилка у стані {source}: {e}")
         
         return None
     
-    def validate_all_files(self) -> Dict[str, Any]:
+    def validate_all_states(self) -> Dict[str, Any]:
         """
-        Валідація всіх JSON файлів у папці user_states.
+        Валідація всіх збережених станів користувачів.
         
         Returns:
             Словник з результатами валідації
@@ -104,27 +122,27 @@ class UserStateValidator:
                 'error': f"Папка {self.user_states_dir} не існує"
             }
         
-        json_files = list(self.user_states_dir.glob("*.json"))
-        valid_files = []
-        invalid_files = []
+        valid_states = []
+        invalid_states = []
         
-        for file_path in json_files:
-            user_data = self.validate_file(file_path)
+        for source, record in self._records():
+            user_data = self.validate_record(source, record)
             if user_data:
-                valid_files.append({
-                    'file': str(file_path),
+                valid_states.append({
+                    'source': source,
                     'telegram_id': user_data['telegram_id'],
                     'last_updated': user_data['last_updated']
                 })
             else:
-                invalid_files.append(str(file_path))
+                invalid_states.append(source)
         
         return {
             'success': len(self.errors) == 0,
-            'total_files': len(json_files),
-            'valid_files': len(valid_files),
-            'invalid_files': len(invalid_files),
-            'files_details': valid_files,
+            'location': self.backend.location if self.backend else None,
+            'total_states': len(valid_states) + len(invalid_states),
+            'valid_states': len(valid_states),
+            'invalid_states': len(invalid_states),
+            'states_details': valid_states,
             'errors': self.errors,
             'warnings': self.warnings
         }
@@ -145,10 +163,8 @@ class UserStateValidator:
             'last_activity': None
         }
         
-        json_files = list(self.user_states_dir.glob("*.json"))
-        
-        for file_path in json_files:
-            user_data = self.validate_file(file_path)
+        for source, record in self._records():
+            user_data = self.validate_record(source, record)
             if user_data:
                 stats['total_users'] += 1
                 
@@ -186,12 +202,14 @@ def main():
     """Основна функція для запуску валідації."""
     validator = UserStateValidator()
     
-    print("🔍 Валідація JSON файлів станів користувачів...")
-    results = validator.validate_all_files()
+    print("🔍 Валідація збережених станів користувачів...")
+    results = validator.validate_all_states()
     
-    if results['success']:
-        print("✅ Всі файли валідні!")
-        print(f"📊 Статистика: {results['valid_files']}/{results['total_files']} файлів")
+    if 'error' in results:
+        print(f"❌ {results['error']}")
+    elif results['success']:
+        print(f"✅ Всі стани валідні! ({results['location']})")
+        print(f"📊 Статистика: {results['valid_states']}/{results['total_states']} станів")
         
         # Показуємо статистику користувачів
         stats = validator.get_user_statistics()
@@ -209,7 +227,7 @@ def main():
         for error in results['errors']:
             print(f"   • {error}")
     
-    if results['warnings']:
+    if results.get('warnings'):
         print("\n⚠️ Попередження:")
         for warning in results['warnings']:
             print(f"   • {warning}")